@@ -11,25 +11,64 @@ class MiniMotorwaysGame:
         # Initial setup: one shopping center and one house of the same color
         self.growth_manager.spawn_shopping_center()
         
+    def reset(self):
+        """
+        Starts a new game on the existing simulation objects instead of rebuilding them.
+
+        Returns:
+            WorldState of the fresh game.
+        """
+        self.sim.reset()  # Also drops the pending growth event
+        self.growth_manager.reset()
+        self.is_running = True
+        self.growth_manager.spawn_shopping_center()
+        return self.sim.get_world_state()
+
+    def load_scenario(self, scenario):
+        """
+        Starts a new game from a Scenario instead of the default single shopping center.
+
+        Args:
+            scenario: nm_core.simulation.scenario.Scenario with the same map size.
+
+        Returns:
+            WorldState of the loaded game.
+        """
+        scenario.apply(self.sim)  # Resets the simulation, dropping the pending growth event
+        self.growth_manager.growth_interval = scenario.growth_interval
+        self.growth_manager.difficulty = scenario.difficulty
+        self.growth_manager.reset()
+        self.growth_manager.active_colors.extend(scenario.active_colors())
+        self.is_running = True
+        return self.sim.get_world_state()
+
     def step(self, action=None, dt=0.0):
         if not self.is_running:
             return None, 0, True, {}
             
-        # Execute simulation step
+        # Execute simulation step (growth spawns are scheduled simulation events)
         world_state, reward, done, info = self.sim.step(action, dt=dt)
         
-        # Update growth
-        self.growth_manager.update(dt=dt)
-        
         if done:
             self.is_running = False
             
         return world_state, reward, done, info
 
-    def add_road(self, start, end):
-        action = Action(action_type='add_road', params={'start': start, 'end': end})
-        self.sim.step(action)
+    def apply_actions(self, batch) -> int:
+        """Applies a batch of road edits immediately, without advancing simulated time."""
+        return self.sim.apply_actions(batch)
+
+    def add_road(self, start, end) -> bool:
+        """Adds the road segment start -> end; False if it is not allowed (e.g. between two buildings)."""
+        return self._edit_road('add_road', start, end)
+
+    def remove_road(self, start, end) -> bool:
+        """Removes the road segment start -> end; False if it is not a valid edit."""
+        return self._edit_road('remove_road', start, end)
 
-    def remove_road(self, start, end):
-        action = Action(action_type='remove_road', params={'start': start, 'end': end})
-        self.sim.step(action)
+    def _edit_road(self, action_type, start, end) -> bool:
+        try:
+            self.sim.apply_actions(Action(action_type=action_type, params={'start': start, 'end': end}))
+        except ValueError:  # Player input is not trusted to be valid, unlike apply_actions batches
+            return False
+        return True
@@ -1,7 +1,7 @@
 import random
 from typing import Tuple, List
 
-from nm_common.constants import ESTIMATED_RTT
+from nm_common.constants import ESTIMATED_RTT, SIMULATION_TICK_RATE
 
 class GrowthManager:
     def __init__(self, simulation_core, difficulty: str = 'medium'):
@@ -9,7 +9,6 @@ class GrowthManager:
         self.difficulty = difficulty
         self.colors = ["red", "blue", "green", "yellow", "purple"]
         self.active_colors = []
-        self.time_accumulator = 0.0
         self.growth_interval = 13.0 # Spawn something every 13 seconds roughly
         
         # Difficulty multipliers for "need"
@@ -18,13 +17,24 @@ class GrowthManager:
             'medium': 1.2,
             'hard': 1.0
         }
-        
-    def update(self, dt=0.0):
-        self.time_accumulator += dt
-        if self.time_accumulator >= self.growth_interval:
-            self.time_accumulator -= self.growth_interval
-            self.spawn_new_building()
-            
+        self._schedule_growth()
+
+    def reset(self):
+        """Forgets the active colors and schedules the first spawn of a new episode."""
+        self.active_colors.clear()
+        self._schedule_growth()
+
+    def _schedule_growth(self):
+        # Growth spawns are simulation events, so they follow simulated ticks (and fast-forwarding)
+        if self.growth_interval <= 0:
+            return  # Growth disabled (e.g. fixed benchmark scenarios)
+        growth_ticks = self.growth_interval * SIMULATION_TICK_RATE
+        self.sim.events.schedule(self.sim.time_elapsed + growth_ticks, self._on_growth)
+
+    def _on_growth(self):
+        self.spawn_new_building()
+        self._schedule_growth()
+
     def _calculate_needs(self) -> dict:
         """
         Calculates how many houses are needed for each active color.
@@ -48,7 +58,7 @@ class GrowthManager:
             house_count = sum(1 for h in self.sim.houses if h.color == color)
             
             if sc_count == 0:
-                needs[color] = 0
+                needs[color] = {'needed': 0, 'current': house_count, 'demand': 0.0}
                 continue
             
             # For each house, we assume default 2 cars (this matches SimulationCore.add_house default)
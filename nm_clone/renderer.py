@@ -0,0 +1,176 @@
+import math
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pygame
+
+from nm_common.constants import GRID_SIZE, COLOR_MAP, FAILURE_THRESHOLD_SECONDS
+
+
+def draw_world(surface: pygame.Surface, sim, cars: List[Dict], tile_size: int = GRID_SIZE,
+               font: Optional[pygame.font.Font] = None):
+    """
+    Draws the roads, buildings, pins and cars of a simulation onto a surface.
+
+    Sizes are those of the game window (GRID_SIZE pixels per tile) scaled to tile_size,
+    so the window and the low resolution offscreen renderers share one drawing routine.
+
+    Args:
+        surface: Target surface, tile_size pixels per tile.
+        sim: SimulationCore to draw.
+        cars: Car dictionaries, as in WorldState.cars.
+        tile_size: Pixels per tile.
+        font: Font for the idle car counts of houses. Text is skipped without one
+            (blitting needs an unlocked surface, see OffscreenRenderer).
+    """
+    def scaled(size):
+        return max(1, round(size * tile_size / GRID_SIZE))
+
+    half = tile_size // 2
+
+    # Draw roads
+    road_width = scaled(6)
+    for start, end in sim.road_network.roads:
+        start_px = (start[0] * tile_size + half, start[1] * tile_size + half)
+        end_px = (end[0] * tile_size + half, end[1] * tile_size + half)
+        pygame.draw.line(surface, COLOR_MAP["gray"], start_px, end_px, road_width)
+
+    # Draw houses
+    inset = scaled(4)
+    for house in sim.houses:
+        x, y = house.location
+        rect = pygame.Rect(x * tile_size + inset, y * tile_size + inset, tile_size - 2 * inset, tile_size - 2 * inset)
+        pygame.draw.rect(surface, COLOR_MAP.get(house.color, (0, 0, 0)), rect)
+        if font is not None:
+            # Draw idle cars count
+            txt = font.render(str(house.idle_count), True, COLOR_MAP["white"])
+            surface.blit(txt, (x * tile_size + scaled(8), y * tile_size + scaled(8)))
+
+    # Draw shopping centers
+    pin_spacing, pin_offset, pin_radius = scaled(10), scaled(5), scaled(4)
+    for sc in sim.shopping_centers:
+        x, y = sc.location
+        rect = pygame.Rect(x * tile_size, y * tile_size, tile_size, tile_size)
+        pygame.draw.rect(surface, COLOR_MAP.get(sc.color, (0, 0, 0)), rect)
+        # Draw pins
+        for i in range(len(sc.pins)):
+            px = x * tile_size + (i % 3) * pin_spacing + pin_offset
+            py = y * tile_size + (i // 3) * pin_spacing + pin_offset
+            pygame.draw.circle(surface, COLOR_MAP["white"], (px, py), pin_radius)
+
+        # Draw failure timer circle if failing
+        if sc.is_failing:
+            progress = sc.failure_timer / FAILURE_THRESHOLD_SECONDS
+            margin = scaled(10)
+            pygame.draw.arc(surface, (0, 0, 0), rect.inflate(margin, margin), 0, progress * 2 * math.pi, scaled(3))
+
+    # Draw cars
+    car_size, offset_scale = scaled(10), scaled(6)
+    for car_data in cars:
+        pos = car_data['position']
+        prev_pos = car_data.get('previous_position', pos)
+        next_pos = car_data.get('next_position')
+
+        # Determine direction for offset
+        # We want to draw the car on the "right" side of the road
+        # Based on the vector (prev_pos -> pos) or (pos -> next_pos)
+        if next_pos:
+            direction = (next_pos[0] - pos[0], next_pos[1] - pos[1])
+        elif pos != prev_pos:
+            direction = (pos[0] - prev_pos[0], pos[1] - prev_pos[1])
+        else:
+            direction = (0, 0)
+
+        # Perpendicular vector for offset (right side)
+        # If dir is (dx, dy), right-hand perpendicular is (-dy, dx)
+        offset_x = -direction[1] * offset_scale
+        offset_y = direction[0] * offset_scale
+
+        # Waiting cars are drawn darker with an outline
+        car_color = COLOR_MAP.get(car_data.get('color', 'green'), (0, 200, 0))
+        if car_data.get('waiting', False):
+            car_color = tuple(max(0, c - 50) for c in car_color)
+
+        px = pos[0] * tile_size + half - car_size // 2 + offset_x
+        py = pos[1] * tile_size + half - car_size // 2 + offset_y
+
+        pygame.draw.rect(surface, car_color, (px, py, car_size, car_size))
+        if car_data.get('waiting', False):
+            pygame.draw.rect(surface, (255, 255, 255), (px, py, car_size, car_size), 1)
+
+
+def _render_frame(surface: pygame.Surface, sim, tile_size: int):
+    surface.fill(COLOR_MAP["bg"])
+    draw_world(surface, sim, sim.traffic_manager.get_cars(), tile_size)
+
+
+class OffscreenRenderer:
+    def __init__(self, width: int, height: int, tile_size: int = 4):
+        """
+        Headless renderer drawing a simulation into a reusable offscreen surface.
+
+        Needs no window, display flip or event pump. `pixels` is a (height * tile_size,
+        width * tile_size, 3) uint8 RGB view of the surface memory obtained through
+        pygame.surfarray.pixels3d, so a render costs the drawing alone. The view is
+        overwritten by the next render; copy frames that must be kept.
+
+        Args:
+            width: Width of the map in tiles.
+            height: Height of the map in tiles.
+            tile_size: Pixels per tile.
+        """
+        self.tile_size = tile_size
+        self.surface = pygame.Surface((width * tile_size, height * tile_size), depth=24)
+        # pixels3d is indexed (x, y, channel) and keeps the surface locked for as long as it lives
+        self.pixels = pygame.surfarray.pixels3d(self.surface).transpose(1, 0, 2)
+
+    def render(self, sim) -> np.ndarray:
+        """
+        Draws the current state of a simulation.
+
+        Returns:
+            The pixels view.
+        """
+        _render_frame(self.surface, sim, self.tile_size)
+        return self.pixels
+
+
+class BatchRenderer:
+    def __init__(self, count: int, width: int, height: int, tile_size: int = 4):
+        """
+        Renders several simulations of the same map size into one offscreen surface.
+
+        The frames are stacked vertically in a single surface and `frames` is a
+        (count, height * tile_size, width * tile_size, 3) uint8 view of it, so a batch of
+        environments produces its observation tensor without a copy.
+
+        Args:
+            count: Number of simulations per batch.
+            width: Width of the maps in tiles.
+            height: Height of the maps in tiles.
+            tile_size: Pixels per tile.
+        """
+        self.tile_size = tile_size
+        frame_width, frame_height = width * tile_size, height * tile_size
+        self.surface = pygame.Surface((frame_width, count * frame_height), depth=24)
+        self._frame_surfaces = [
+            self.surface.subsurface((0, i * frame_height, frame_width, frame_height)) for i in range(count)
+        ]
+        pixels = pygame.surfarray.pixels3d(self.surface).transpose(1, 0, 2)
+        self.frames = pixels.reshape(count, frame_height, frame_width, 3)
+
+    def render(self, sims: Sequence) -> np.ndarray:
+        """
+        Draws one simulation per frame.
+
+        Args:
+            sims: SimulationCores, at most `count` of them.
+
+        Returns:
+            The frames view (frames past len(sims) keep their previous content).
+        """
+        if len(sims) > len(self._frame_surfaces):
+            raise ValueError(f"Got {len(sims)} simulations for {len(self._frame_surfaces)} frames")
+        for surface, sim in zip(self._frame_surfaces, sims):
+            _render_frame(surface, sim, self.tile_size)
+        return self.frames
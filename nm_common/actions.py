@@ -1,4 +1,16 @@
-from typing import Dict
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+from nm_common.constants import DIRECTIONS, DIRECTION_INDEX
+
+# Compiled action encoding: each road edit is one integer row (op, x, y, direction),
+# the segment running from tile (x, y) to its neighbour in DIRECTIONS[direction].
+OP_NOOP = 0
+OP_ADD_ROAD = 1
+OP_REMOVE_ROAD = 2
+ACTION_OPS = {'add_road': OP_ADD_ROAD, 'remove_road': OP_REMOVE_ROAD}
+ACTION_TYPES = {op: action_type for action_type, op in ACTION_OPS.items()}
 
 
 class Action:
@@ -9,4 +21,51 @@ class Action:
             params: A dictionary of parameters for performing the action.
         """
         self.action_type = action_type
-        self.params = params
\ No newline at end of file
+        self.params = params
+
+
+def encode_action(action: Action) -> np.ndarray:
+    """
+    Compiles a road Action into its (op, x, y, direction) row.
+
+    Args:
+        action: An 'add_road' or 'remove_road' action between two adjacent tiles.
+
+    Returns:
+        int32 array of shape (4,).
+
+    Raises:
+        ValueError: If the action type is unknown or the tiles are not adjacent.
+    """
+    op = ACTION_OPS.get(action.action_type)
+    if op is None:
+        raise ValueError(f"Unknown action type: {action.action_type}")
+    start, end = action.params['start'], action.params['end']
+    direction = DIRECTION_INDEX.get((end[0] - start[0], end[1] - start[1]))
+    if direction is None:
+        raise ValueError(f"Road segment {start} -> {end} does not join adjacent tiles")
+    return np.array((op, start[0], start[1], direction), dtype=np.int32)
+
+
+def encode_actions(actions: Iterable[Action]) -> np.ndarray:
+    """
+    Compiles many road Actions into an (N, 4) batch for SimulationCore.apply_actions.
+    """
+    rows = [encode_action(action) for action in actions]
+    if not rows:
+        return np.zeros((0, 4), dtype=np.int32)
+    return np.stack(rows)
+
+
+def decode_action(row) -> Optional[Action]:
+    """
+    Expands an (op, x, y, direction) row back into an Action.
+
+    Returns:
+        The Action, or None for a no-op row.
+    """
+    op, x, y, direction = (int(value) for value in row)
+    if op == OP_NOOP:
+        return None
+    dx, dy = DIRECTIONS[direction]
+    return Action(action_type=ACTION_TYPES[op], params={'start': (x, y), 'end': (x + dx, y + dy)})
@@ -1,4 +1,5 @@
 # nm_common/constants.py
+from enum import IntEnum
 
 # Grid and Screen Settings
 GRID_SIZE = 40
@@ -20,9 +21,49 @@ COLOR_MAP = {
     "bg": (230, 230, 220)
 }
 
+# Building / Car Colors (entities store the integer value; names match COLOR_MAP keys)
+class Color(IntEnum):
+    RED = 0
+    BLUE = 1
+    GREEN = 2
+    YELLOW = 3
+    PURPLE = 4
+
+    @classmethod
+    def parse(cls, value) -> "Color":
+        """Accepts a Color, its integer value or its COLOR_MAP name ("red", ...)."""
+        if isinstance(value, str):
+            return cls[value.upper()]
+        return cls(value)
+
+
+COLOR_NAMES = tuple(color.name.lower() for color in Color)
+
 # Simulation Settings
 DEFAULT_CAR_LIMIT = 2
 PIN_GENERATION_INTERVAL = 10
 FAILURE_THRESHOLD_SECONDS = 60.0
 MAX_PINS_LIMIT = 10
 ESTIMATED_RTT = 40.0
+
+# Congestion-Aware Routing
+CONGESTION_UPDATE_INTERVAL = 15  # Ticks between edge cost refreshes / re-routing batches
+CONGESTION_SMOOTHING = 0.3  # EMA factor applied to per-segment load at each refresh
+CONGESTION_OCCUPANCY_WEIGHT = 1.0  # Cost penalty per car occupying a segment
+CONGESTION_WAIT_WEIGHT = 2.0  # Extra cost penalty per car waiting on a segment
+REROUTE_BATCH_SIZE = 32  # Cars re-routed per refresh
+
+# Grid Directions (index order is shared by per-direction arrays)
+DIRECTIONS = ((0, -1), (1, 0), (0, 1), (-1, 0))  # up, right, down, left
+DIRECTION_INDEX = {direction: index for index, direction in enumerate(DIRECTIONS)}
+# Direction codes of route steps: 0-3 index DIRECTIONS, plus a step that stays on its tile
+# and a jump between non-adjacent tiles. OPPOSITE_DIRECTION[d] is d ^ 2 for grid directions.
+NO_DIRECTION = 4
+OTHER_DIRECTION = 5
+OPPOSITE_DIRECTION = (2, 3, 0, 1, NO_DIRECTION, -1)
+END_OF_ROUTE = 6  # Pseudo direction after a route's last tile
+SEGMENT_CODES = END_OF_ROUTE + 1  # Segment keys are flat tile * SEGMENT_CODES + direction code
+DEFAULT_TILE_STRIDE = 1 << 16  # Row stride of flat tile indices when the map width is unknown
+
+# Route Caching / Pooling
+PATH_CACHE_SIZE = 4096  # Cached routes kept between road network changes
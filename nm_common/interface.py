@@ -1,8 +1,8 @@
 from abc import ABC, abstractmethod
 from typing import Tuple, Dict, List
 
-from action_parameters_handler import Action
-from world_state_initialization import WorldState
+from nm_common.actions import Action
+from nm_core.simulation.world_state import WorldState
 
 
 class Environment(ABC):
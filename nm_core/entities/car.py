@@ -1,30 +1,55 @@
-from typing import Tuple, List, Optional
+from typing import Tuple, Sequence, Optional
+
+from nm_common.constants import Color, COLOR_NAMES
 
 
 class Car:
-    def __init__(self, car_id: str, start: Tuple[int, int], destination: Optional[Tuple[int, int]], path: List[Tuple[int, int]]):
+    __slots__ = (
+        'car_id', 'position', 'previous_position', 'destination', 'path', 'path_index',
+        'active', 'state', 'origin', 'color_id', 'waiting', 'path_tiles', 'path_dirs'
+    )
+
+    def __init__(self, car_id: int, start: Tuple[int, int], destination: Optional[Tuple[int, int]], path: Sequence[Tuple[int, int]]):
         """
         Initialize a car object.
 
         Args:
-            car_id: Unique identifier for this car.
+            car_id: Unique identifier for this car (dense integer allocated by the traffic manager).
             start: (x, y) coordinate of the starting position.
             destination: (x, y) coordinate of the destination.
-            path: List of (x, y) tuples representing the car's planned path.
+            path: Sequence of (x, y) tuples representing the car's planned path.
         """
         self.car_id = car_id
+        self.reset(start, destination, path)
+
+    def reset(self, start: Tuple[int, int], destination: Optional[Tuple[int, int]], path: Sequence[Tuple[int, int]]):
+        """
+        Re-initialize every field except the id, so a pooled car can start a new trip.
+        """
         self.position = start
         self.previous_position = start
         self.destination = destination
         self.path = path
         self.path_index = 0  # Index in the path that the car is currently following.
+        # Integer encoding of the path (see Route), filled in by the traffic manager
+        self.path_tiles: Optional[Tuple[int, ...]] = None
+        self.path_dirs: Optional[Tuple[int, ...]] = None
         self.active = True  # Whether the car is active (reaching the destination or despawned).
         self.state = "Idle"  # Tracks the car's task-based state
         self.origin = start  # To know where to return
-        self.color = "red"  # Default color
+        self.color_id = Color.RED  # Default color
         self.waiting = False
 
-    def set_route(self, path: List[Tuple[int, int]]):
+    @property
+    def color(self) -> str:
+        """Color name, as used by COLOR_MAP."""
+        return COLOR_NAMES[self.color_id]
+
+    @color.setter
+    def color(self, value):
+        self.color_id = Color.parse(value)
+
+    def set_route(self, path: Sequence[Tuple[int, int]]):
         """
         Assign a route for the car to follow.
         """
@@ -33,6 +58,16 @@ class Car:
         self.active = True
         self.waiting = False
 
+    def reroute(self, path: Sequence[Tuple[int, int]]):
+        """
+        Replace the remaining route of a car that is already on the road.
+
+        Args:
+            path: New path starting at the car's current position.
+        """
+        self.path = path
+        self.path_index = 1  # path[0] is the current position
+
     def get_next_position(self) -> Optional[Tuple[int, int]]:
         """
         Returns the next position in the path without moving the car.
@@ -1,33 +1,44 @@
 # entities/house.py
-from typing import Tuple, List, Optional, TYPE_CHECKING
+from typing import Tuple, TYPE_CHECKING
 from nm_core.entities.car import Car
-from nm_common.constants import DEFAULT_CAR_LIMIT
+from nm_common.constants import DEFAULT_CAR_LIMIT, Color, COLOR_NAMES
 
 if TYPE_CHECKING:
     from nm_core.simulation.traffic import TrafficFlowManager
 
 class House:
-    def __init__(self, house_id: str, location: Tuple[int, int], traffic_manager: 'TrafficFlowManager', color: str = "red", car_count: int = DEFAULT_CAR_LIMIT):
+    __slots__ = ('house_id', 'location', 'traffic_manager', 'color_id', 'car_count', 'idle_count')
+
+    def __init__(self, house_id: int, location: Tuple[int, int], traffic_manager: 'TrafficFlowManager', color: str = "red", car_count: int = DEFAULT_CAR_LIMIT):
         """
         Initialize a house object (garage).
 
+        The garage is a counter: cars only exist as objects while they are on the road,
+        and are borrowed from the traffic manager's pool when dispatched.
+
         Args:
             house_id: Unique identifier for this house.
             location: (x, y) location of the house on the grid.
             traffic_manager: Reference to the traffic flow manager for task coordination.
-            color: Color of the house. Should match shopping center color for car dispatch.
+            color: Color of the house (name or Color). Should match shopping center color for car dispatch.
             car_count: Number of cars available in the house. Default is 2.
         """
         self.house_id = house_id
         self.location = location
         self.traffic_manager = traffic_manager
-        self.color = color
-        self.cars = [Car(car_id=f"{house_id}_{i}", start=location, destination=None, path=[]) for i in range(car_count)]
-        for car in self.cars:
-            car.color = color # Cars inherit house color
-        self.idle_cars: List[Car] = list(self.cars)  # Track idle cars
-        for car in self.cars:
-            car.active = False # Cars in house are initially inactive
+        self.color_id = Color.parse(color)
+        self.car_count = car_count
+        self.idle_count = car_count  # Cars currently parked in the garage
+
+    @property
+    def color(self) -> str:
+        """Color name, as used by COLOR_MAP."""
+        return COLOR_NAMES[self.color_id]
+
+    @property
+    def idle_cars(self) -> range:
+        """Sized stand-in for the former idle car list; len() gives the parked car count."""
+        return range(self.idle_count)
 
     def dispatch_car(self, target_location: Tuple[int, int]) -> bool:
         """
@@ -39,19 +50,18 @@ class House:
         Returns:
             True if a car was dispatched, False if no car is available.
         """
-        if not self.idle_cars:
+        if not self.idle_count:
             return False  # No cars available
 
-        # Check if path exists before popping
+        # Check if path exists before taking a car out
         route = self.traffic_manager.road_network.find_path(self.location, target_location)
         if not route:
             return False
 
-        car = self.idle_cars.pop()
-        car.set_route(route)
-        car.destination = target_location
+        car = self.traffic_manager.acquire_car(self.location, target_location, route)
+        car.color_id = self.color_id  # Cars inherit house color
         car.state = "ToShoppingCenter"  # Update the car state
-        car.active = True
+        self.idle_count -= 1
         self.traffic_manager.add_car_to_simulation(car)  # Register the car as active in the simulation
         return True
 
@@ -60,12 +70,8 @@ class House:
         Return a car to the house after completing its task.
 
         Args:
-            car: The car that has returned.
+            car: The car that has returned. The traffic manager recycles the object itself.
         """
         car.state = "Idle"
-        car.path = []
-        car.path_index = 0
-        car.position = self.location
-        car.destination = None
         car.active = False
-        self.idle_cars.append(car)
\ No newline at end of file
+        self.idle_count += 1
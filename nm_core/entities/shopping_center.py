@@ -1,28 +1,43 @@
 # entities/shopping_center.py
-from typing import Tuple, List
+from collections import deque
+from typing import Tuple, Optional, Callable, Deque
 
-from nm_common.constants import MAX_PINS_LIMIT, FAILURE_THRESHOLD_SECONDS
+from nm_common.constants import MAX_PINS_LIMIT, FAILURE_THRESHOLD_SECONDS, Color, COLOR_NAMES
 
 class ShoppingCenter:
-    def __init__(self, center_id: str, location: Tuple[int, int], color: str = "red"):
+    __slots__ = (
+        'center_id', 'location', 'color_id', 'pins', 'dispatched_pins_count', 'pin_counter',
+        'fulfilled_counter', 'failure_timer', 'max_pins', 'is_failing', 'pin_rate', 'on_failing_changed'
+    )
+
+    def __init__(self, center_id: int, location: Tuple[int, int], color: str = "red", pin_rate: Optional[float] = None):
         """
         Initialize a shopping center object.
 
         Args:
             center_id: Unique identifier for this shopping center.
             location: (x, y) location of the center on the grid.
-            color: Color of the shopping center and its pins.
+            color: Color of the shopping center and its pins (name or Color).
+            pin_rate: Mean pin arrivals per tick (Poisson). None shares the global pin interval.
         """
         self.center_id = center_id
         self.location = location
-        self.color = color
-        self.pins: List[int] = []  # List of active pins
+        self.color_id = Color.parse(color)
+        self.pins: Deque[int] = deque()  # Active pins, oldest first
         self.dispatched_pins_count = 0 # Number of pins that have a car en route
         self.pin_counter = 0
         self.fulfilled_counter = 0
         self.failure_timer = 0.0
         self.max_pins = MAX_PINS_LIMIT
         self.is_failing = False
+        self.pin_rate = pin_rate
+        # Called with this center whenever is_failing flips
+        self.on_failing_changed: Optional[Callable[['ShoppingCenter'], None]] = None
+
+    @property
+    def color(self) -> str:
+        """Color name, as used by COLOR_MAP."""
+        return COLOR_NAMES[self.color_id]
 
     def generate_pin(self) -> int:
         """
@@ -33,9 +48,11 @@ class ShoppingCenter:
         """
         self.pin_counter += 1
         self.pins.append(self.pin_counter)
-        if len(self.pins) > self.max_pins // 2:
+        if len(self.pins) > self.max_pins // 2 and not self.is_failing:
             self.is_failing = True
-        print(f"ShoppingCenter {self.center_id} ({self.color}) generated a pin! Current pins: {self.pins}")
+            if self.on_failing_changed is not None:
+                self.on_failing_changed(self)
+        print(f"ShoppingCenter {self.center_id} ({self.color}) generated a pin! Current pins: {len(self.pins)}")
         return self.pin_counter
 
     def fulfill_pin(self) -> bool:
@@ -46,12 +63,15 @@ class ShoppingCenter:
             bool: True if a pin was fulfilled, False if there were no pins.
         """
         if self.pins:
-            fulfilled_pin = self.pins.pop(0)
+            fulfilled_pin = self.pins.popleft()
             self.dispatched_pins_count = max(0, self.dispatched_pins_count - 1)
             self.fulfilled_counter += 1
             if len(self.pins) <= self.max_pins // 2:
+                was_failing = self.is_failing
                 self.is_failing = False
                 self.failure_timer = 0.0
+                if was_failing and self.on_failing_changed is not None:
+                    self.on_failing_changed(self)
             print(f"Pin {fulfilled_pin} fulfilled at ShoppingCenter {self.center_id}!")
             return True
         return False
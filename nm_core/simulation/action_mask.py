@@ -0,0 +1,122 @@
+from typing import Tuple
+
+import numpy as np
+
+from nm_common.actions import OP_ADD_ROAD, OP_REMOVE_ROAD
+from nm_common.constants import DIRECTIONS, DIRECTION_INDEX
+from nm_core.simulation.map import BUILDING_TILE, GameMap
+from nm_core.simulation.road_network import RoadNetworkManager
+
+# Direction code of each unit step, indexed by [dy + 1, dx + 1]
+_DIRECTION_CODES = np.full((3, 3), -1, dtype=np.int64)
+_DIRECTION_CODES[[dy + 1 for _, dy in DIRECTIONS], [dx + 1 for dx, _ in DIRECTIONS]] = np.arange(len(DIRECTIONS))
+
+
+class ActionMask:
+    def __init__(self, game_map: GameMap, road_network: RoadNetworkManager):
+        """
+        Valid road actions, kept up to date incrementally.
+
+        mask[plane, y, x, d] is True when the action is valid. Plane 0 adds and plane 1 removes
+        (plane = op - 1 for the OP_* codes of nm_common.actions) the segment from tile (x, y) to its neighbour in DIRECTIONS[d]. A segment can be added
+        when both tiles are on the map, it does not exist yet and it does not join two
+        buildings; it can be removed when it exists. refresh() consumes the tiles and segments
+        reported to the map's and network's change trackers and rewrites only the entries
+        around them, so maintaining the mask costs O(changes).
+
+        `flat` is the same memory with a leading always-valid no-op entry, laid out like the
+        flat action space of nm_env.gym_env.NeuroMotorwaysEnv.
+
+        Args:
+            game_map: Map whose building tiles restrict road placement.
+            road_network: Network whose segments decide add/remove validity.
+        """
+        self.map = game_map
+        self.road_network = road_network
+        height, width = game_map.height, game_map.width
+        self.flat = np.zeros(1 + 2 * height * width * len(DIRECTIONS), dtype=bool)
+        self.mask = self.flat[1:].reshape(2, height, width, len(DIRECTIONS))
+        trackers = [game_map.changes]
+        if road_network.changes is not game_map.changes:
+            trackers.append(road_network.changes)
+        self._subscriptions = [tracker.subscribe() for tracker in trackers]
+        self.refresh()
+
+    def refresh(self):
+        """Brings the mask up to date with the changes reported since the last refresh."""
+        changes = [subscription.consume() for subscription in self._subscriptions if subscription.dirty]
+        if any(full for full, _, _ in changes):
+            self.recompute()
+            return
+        for _, tiles, edges in changes:
+            for x, y in tiles:
+                self._update_tile(x, y)
+            for start, end in edges:
+                self._update_edge(start, end)
+
+    def close(self):
+        """Stops receiving change reports."""
+        self.map.changes.unsubscribe(self._subscriptions[0])
+        self.road_network.changes.unsubscribe(self._subscriptions[-1])
+
+    def recompute(self):
+        """Rebuilds the whole mask from the map and road network."""
+        height, width = self.map.height, self.map.width
+        buildings = self.map.grid == BUILDING_TILE
+        self.flat[0] = True
+        add, remove = self.mask
+        for d, (dx, dy) in enumerate(DIRECTIONS):
+            add[:, :, d] = False
+            ys = slice(max(0, -dy), height - max(0, dy))
+            xs = slice(max(0, -dx), width - max(0, dx))
+            neighbour_ys = slice(max(0, dy), height + min(0, dy))
+            neighbour_xs = slice(max(0, dx), width + min(0, dx))
+            add[ys, xs, d] = ~(buildings[ys, xs] & buildings[neighbour_ys, neighbour_xs])
+        remove.fill(False)
+
+        # Existing segments, gathered into arrays so large networks are marked in bulk
+        steps = np.array([(x, y, ex - x, ey - y) for (x, y), (ex, ey) in self.road_network.graph.edges], dtype=np.int64)
+        if not len(steps):
+            return
+        xs, ys, dxs, dys = steps.T
+        adjacent = (np.abs(dxs) + np.abs(dys) == 1)
+        inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+        inside &= (xs + dxs >= 0) & (xs + dxs < width) & (ys + dys >= 0) & (ys + dys < height)
+        keep = adjacent & inside
+        xs, ys = xs[keep], ys[keep]
+        ds = _DIRECTION_CODES[dys[keep] + 1, dxs[keep] + 1]
+        remove[ys, xs, ds] = True
+        add[ys, xs, ds] = False
+
+    def _update_edge(self, start: Tuple[int, int], end: Tuple[int, int]):
+        (x, y), (ex, ey) = start, end
+        d = DIRECTION_INDEX.get((ex - x, ey - y))
+        width, height = self.map.width, self.map.height
+        if d is None or not (0 <= x < width and 0 <= y < height and 0 <= ex < width and 0 <= ey < height):
+            return  # Not part of the action space
+        present = self.road_network.graph.has_edge(start, end)
+        grid = self.map.grid
+        self.mask[0, y, x, d] = not present and not (grid[y, x] == BUILDING_TILE and grid[ey, ex] == BUILDING_TILE)
+        self.mask[1, y, x, d] = present
+
+    def _update_tile(self, x: int, y: int):
+        """Refreshes the entries of all segments leaving or entering a retyped tile."""
+        for dx, dy in DIRECTIONS:
+            neighbour = (x + dx, y + dy)
+            self._update_edge((x, y), neighbour)
+            self._update_edge(neighbour, (x, y))
+
+    def is_valid(self, op: int, x: int, y: int, direction: int) -> bool:
+        """
+        Args:
+            op: OP_ADD_ROAD or OP_REMOVE_ROAD (see nm_common.actions).
+
+        Returns:
+            True if the (op, x, y, direction) action is currently valid. OP_NOOP and unknown ops are never valid.
+        """
+        if op not in (OP_ADD_ROAD, OP_REMOVE_ROAD):
+            return False
+        self.refresh()
+        if 0 <= x < self.map.width and 0 <= y < self.map.height and 0 <= direction < len(DIRECTIONS):
+            return bool(self.mask[op - 1, y, x, direction])
+        return False
@@ -0,0 +1,121 @@
+from typing import Dict, List
+
+import numpy as np
+
+from nm_common.constants import DIRECTIONS, SEGMENT_CODES
+
+
+class TrafficAnalytics:
+    def __init__(self, width: int, height: int):
+        """
+        Running traffic counters laid out like GameMap.grid.
+
+        Per tile:
+            cars_passed: Number of times a car entered the tile.
+            ticks_waited: Car-ticks spent blocked on the tile.
+        Per directed segment (tile, outgoing direction in DIRECTIONS order):
+            segment_passed: Number of cars that left the tile in that direction.
+            segment_waited: Car-ticks spent blocked on the tile while heading in that direction.
+
+        Args:
+            width: Width of the map in tiles.
+            height: Height of the map in tiles.
+        """
+        self.width = width
+        self.height = height
+        self.cars_passed = np.zeros((height, width), dtype=np.int64)
+        self.ticks_waited = np.zeros((height, width), dtype=np.int64)
+        self.segment_passed = np.zeros((height, width, 4), dtype=np.int64)
+        self.segment_waited = np.zeros((height, width, 4), dtype=np.int64)
+
+        # Flat views so the hot path does one integer index per update
+        self._passed = self.cars_passed.reshape(-1)
+        self._waited = self.ticks_waited.reshape(-1)
+        self._segment_passed = self.segment_passed.reshape(-1)
+        self._segment_waited = self.segment_waited.reshape(-1)
+
+        # Segment keys / flat tiles queued by record_move and record_wait until the next flush()
+        self._moved: List[int] = []
+        self._entered: List[int] = []
+        self._blocked: List[int] = []
+
+        # Live arrays, built once so exporting them costs nothing per step
+        self.heatmaps: Dict[str, np.ndarray] = {
+            'cars_passed': self.cars_passed,
+            'ticks_waited': self.ticks_waited,
+            'segment_passed': self.segment_passed,
+            'segment_waited': self.segment_waited,
+        }
+
+    def record_move(self, segment: int, entered: int):
+        """
+        Queues a car leaving a tile; counted by the next flush().
+
+        Args:
+            segment: Segment key (flat tile * SEGMENT_CODES + direction code) of the step taken.
+            entered: Flat tile the car moved into.
+        """
+        self._moved.append(segment)
+        self._entered.append(entered)
+
+    def record_wait(self, segment: int):
+        """Queues one tick of a car blocked on a tile, by the segment key of the step it wants to take."""
+        self._blocked.append(segment)
+
+    def flush(self):
+        """Adds the moves and waits queued since the last flush to the counters, in bulk."""
+        if self._moved:
+            entered = np.array(self._entered, dtype=np.int64)
+            np.add.at(self._passed, entered[(entered >= 0) & (entered < self._passed.size)], 1)
+            self._add_segments(self._segment_passed, None, self._moved)
+            self._moved = []
+            self._entered = []
+        if self._blocked:
+            self._add_segments(self._segment_waited, self._waited, self._blocked)
+            self._blocked = []
+
+    def _add_segments(self, segment_counts: np.ndarray, tile_counts, segments: List[int]):
+        """Counts segment keys per grid direction, and per tile whatever the direction."""
+        tiles, directions = np.divmod(np.array(segments, dtype=np.int64), SEGMENT_CODES)
+        on_map = (tiles >= 0) & (tiles < self._passed.size)
+        if tile_counts is not None:
+            np.add.at(tile_counts, tiles[on_map], 1)
+        grid = on_map & (directions < len(DIRECTIONS))
+        np.add.at(segment_counts, tiles[grid] * len(DIRECTIONS) + directions[grid], 1)
+
+    def record_waits(self, tile_counts: np.ndarray, segment_counts: np.ndarray):
+        """
+        Counts one tick of waiting for many cars at once.
+
+        Args:
+            tile_counts: Flat (height * width,) number of blocked cars per tile.
+            segment_counts: Flat (height * width * 4,) number of blocked cars per tile and direction.
+        """
+        self._waited += tile_counts
+        self._segment_waited += segment_counts
+
+    def average_speed(self) -> np.ndarray:
+        """
+        Returns:
+            Per-tile fraction of car-ticks spent moving (tiles per tick, 0 where no car has been).
+        """
+        passed = self.cars_passed.astype(np.float64)
+        total = passed + self.ticks_waited
+        return np.divide(passed, total, out=np.zeros_like(passed), where=total > 0)
+
+    def as_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Returns:
+            Copies of all counters plus the derived average speed, safe to keep across steps.
+        """
+        arrays = {name: array.copy() for name, array in self.heatmaps.items()}
+        arrays['average_speed'] = self.average_speed()
+        return arrays
+
+    def reset(self):
+        """Zeroes all counters in place and drops queued updates."""
+        self._moved = []
+        self._entered = []
+        self._blocked = []
+        for array in self.heatmaps.values():
+            array.fill(0)
@@ -0,0 +1,91 @@
+from typing import List, Set, Tuple, Iterable
+
+Tile = Tuple[int, int]
+Edge = Tuple[Tile, Tile]
+
+
+class ChangeSubscription:
+    def __init__(self):
+        """
+        Changes accumulated for one consumer since it last called consume().
+
+        A new subscription starts with `full` set, since the consumer has not seen anything yet.
+        """
+        self.full = True  # Everything may have changed (new subscriber or reset)
+        self.tiles: Set[Tile] = set()
+        self.edges: Set[Edge] = set()
+
+    @property
+    def dirty(self) -> bool:
+        return self.full or bool(self.tiles) or bool(self.edges)
+
+    def consume(self) -> Tuple[bool, Set[Tile], Set[Edge]]:
+        """
+        Takes the pending changes and starts accumulating anew.
+
+        Returns:
+            (full, tiles, edges): whether everything must be rebuilt, plus the retyped tiles
+            and the added/removed road segments. The sets are handed over, not copied.
+        """
+        changes = (self.full, self.tiles, self.edges)
+        self.full = False
+        self.tiles = set()
+        self.edges = set()
+        return changes
+
+
+class ChangeTracker:
+    def __init__(self):
+        """
+        Records which tiles and road segments changed, for caches that update incrementally.
+
+        GameMap and RoadNetworkManager report every edit here. Version counters tell whether
+        anything changed at all; each subscriber additionally receives the dirty tile and edge
+        sets since its own last consume(), so consumers running at different rates (observation
+        encoder, action mask, renderer, path cache) never miss or double-count a change.
+        """
+        self.tile_version = 0
+        self.road_version = 0
+        self._subscriptions: List[ChangeSubscription] = []
+
+    @property
+    def version(self) -> int:
+        """Combined version, bumped by any change."""
+        return self.tile_version + self.road_version
+
+    def subscribe(self) -> ChangeSubscription:
+        """
+        Returns:
+            A new subscription, initially marked as fully dirty.
+        """
+        subscription = ChangeSubscription()
+        self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: ChangeSubscription):
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+
+    def mark_tile(self, x: int, y: int):
+        """Records a tile whose type changed."""
+        self.tile_version += 1
+        for subscription in self._subscriptions:
+            subscription.tiles.add((x, y))
+
+    def mark_edges(self, edges: Iterable[Edge]):
+        """Records road segments added or removed together (one version bump)."""
+        edges = list(edges)
+        if not edges:
+            return
+        self.road_version += 1
+        for subscription in self._subscriptions:
+            subscription.edges.update(edges)
+
+    def mark_all(self):
+        """Records that everything changed (e.g. a reset)."""
+        self.tile_version += 1
+        self.road_version += 1
+        for subscription in self._subscriptions:
+            subscription.full = True
+            subscription.tiles.clear()
+            subscription.edges.clear()
@@ -1,30 +1,140 @@
-from typing import Tuple, Dict, Optional, List
+import math
+import random
+from typing import Tuple, Dict, Optional, List, Union, Sequence
 
-from nm_common.actions import Action
-from nm_core.simulation.map import GameMap
+import numpy as np
+
+from nm_common.actions import Action, encode_action, encode_actions, OP_NOOP, OP_ADD_ROAD, OP_REMOVE_ROAD
+from nm_core.simulation.action_mask import ActionMask
+from nm_core.simulation.changes import ChangeTracker
+from nm_core.simulation.events import EventScheduler, ScheduledEvent
+from nm_core.simulation.map import BUILDING_TILE, GameMap, HOUSE, SHOPPING_CENTER
 from nm_core.simulation.road_network import RoadNetworkManager
 from nm_core.simulation.traffic import TrafficFlowManager
 from nm_core.simulation.world_state import WorldState
 from nm_core.entities.house import House
 from nm_core.entities.shopping_center import ShoppingCenter
-from nm_common.constants import PIN_GENERATION_INTERVAL, SIMULATION_TICK_RATE
+from nm_common.constants import PIN_GENERATION_INTERVAL, SIMULATION_TICK_RATE, FAILURE_THRESHOLD_SECONDS, DIRECTIONS
+
+ActionBatch = Union[Action, Sequence[Action], np.ndarray]
 
 
 class SimulationCore:
-    def __init__(self, width: int, height: int):
-        """Initialize the simulation core."""
-        self.map = GameMap(width, height)
-        self.road_network = RoadNetworkManager()
-        self.traffic_manager = TrafficFlowManager(self.road_network)
+    def __init__(self, width: int, height: int, congestion_routing: bool = False, segment_queues: bool = False):
+        """
+        Initialize the simulation core.
+
+        Args:
+            width: Width of the map in tiles.
+            height: Height of the map in tiles.
+            congestion_routing: If True, cars route around congested road segments.
+            segment_queues: If True, traffic uses the segment-queue engine, whose per-tick cost
+                follows the moving cars rather than all cars (see TrafficFlowManager).
+        """
+        # Map and road edits are reported to one tracker that downstream caches subscribe to
+        self.changes = ChangeTracker()
+        self.map = GameMap(width, height, changes=self.changes)
+        self.road_network = RoadNetworkManager(changes=self.changes, tile_stride=width)
+        self.map.track_roads(self.road_network)
+        self.traffic_manager = TrafficFlowManager(
+            self.road_network, congestion_routing=congestion_routing, grid_size=(width, height),
+            segment_queues=segment_queues
+        )
+        # Valid road actions, refreshed only where tiles or segments change
+        self.action_mask = ActionMask(self.map, self.road_network)
         self.houses: List[House] = []
         self.shopping_centers: List[ShoppingCenter] = []
         self.score = 0
         self.time_elapsed = 0.0
         self.is_game_over = False
-        self.pin_generation_interval = PIN_GENERATION_INTERVAL  # Generate a pin every 10 steps
         self.tick_accumulator = 0.0
         self.tick_duration = 1.0 / SIMULATION_TICK_RATE
 
+        # Scheduled events (pin arrivals, growth spawns, failure deadlines), keyed by tick
+        self.events = EventScheduler()
+        self._pin_event: Optional[ScheduledEvent] = None
+        self._center_pin_events: Dict[int, ScheduledEvent] = {}
+        self._failure_deadlines: Dict[int, ScheduledEvent] = {}
+        self.failing_centers: Dict[int, ShoppingCenter] = {}  # Centers whose failure timer is running
+        self.pin_generation_interval = PIN_GENERATION_INTERVAL  # Generate a pin every 10 steps
+        self.gridlock_termination_ticks: Optional[int] = None  # End the episode after this many gridlocked ticks
+
+    @property
+    def pin_generation_interval(self) -> int:
+        """Ticks between pins for centers without their own pin rate (0 disables them)."""
+        return self._pin_generation_interval
+
+    @pin_generation_interval.setter
+    def pin_generation_interval(self, interval: int):
+        self._pin_generation_interval = interval
+        if self._pin_event is not None:
+            self._pin_event.cancel()
+            self._pin_event = None
+        if interval > 0:
+            self._pin_event = self.events.schedule(self._next_pin_tick(self.time_elapsed), self._on_pin_interval)
+
+    def _next_pin_tick(self, now: float) -> int:
+        """First positive multiple of the pin interval at or after `now`."""
+        interval = self._pin_generation_interval
+        return max(interval, -(-int(now) // interval) * interval)
+
+    def _on_pin_interval(self):
+        """Global pin arrival: one random center without its own rate gets a pin."""
+        centers = [sc for sc in self.shopping_centers if sc.pin_rate is None]
+        if centers:
+            random.choice(centers).generate_pin()
+        self._pin_event = self.events.schedule(self._next_pin_tick(self.time_elapsed + 1), self._on_pin_interval)
+
+    def set_pin_rate(self, shopping_center: ShoppingCenter, pin_rate: Optional[float]):
+        """
+        Gives a shopping center its own Poisson pin arrivals.
+
+        Args:
+            shopping_center: The center to configure.
+            pin_rate: Mean pins per tick, or None to put it back on the global interval.
+        """
+        event = self._center_pin_events.pop(shopping_center.center_id, None)
+        if event is not None:
+            event.cancel()
+        shopping_center.pin_rate = pin_rate
+        if pin_rate:
+            self._schedule_center_pin(shopping_center)
+
+    def _schedule_center_pin(self, shopping_center: ShoppingCenter):
+        arrival = self.time_elapsed + random.expovariate(shopping_center.pin_rate)
+        self._center_pin_events[shopping_center.center_id] = self.events.schedule(
+            arrival, self._on_center_pin, shopping_center
+        )
+
+    def _on_center_pin(self, shopping_center: ShoppingCenter):
+        shopping_center.generate_pin()
+        self._schedule_center_pin(shopping_center)
+
+    def _on_failing_changed(self, shopping_center: ShoppingCenter):
+        """Tracks a center whose failing state flipped and arms or cancels its failure deadline."""
+        event = self._failure_deadlines.pop(shopping_center.center_id, None)
+        if event is not None:
+            event.cancel()
+        if shopping_center.is_failing:
+            self.failing_centers[shopping_center.center_id] = shopping_center
+            self._schedule_failure_deadline(shopping_center)
+        else:
+            self.failing_centers.pop(shopping_center.center_id, None)
+
+    def _schedule_failure_deadline(self, shopping_center: ShoppingCenter):
+        remaining = FAILURE_THRESHOLD_SECONDS - shopping_center.failure_timer
+        deadline = self.time_elapsed + max(1, math.ceil(remaining / self.tick_duration))
+        self._failure_deadlines[shopping_center.center_id] = self.events.schedule(
+            deadline, self._on_failure_deadline, shopping_center
+        )
+
+    def _on_failure_deadline(self, shopping_center: ShoppingCenter):
+        """Ends the game if the center's timer ran out, otherwise re-arms for the time still left."""
+        if shopping_center.update_failure_timer(0.0):
+            self.is_game_over = True
+        else:
+            self._schedule_failure_deadline(shopping_center)
+
     def spawn_car(self, start: Tuple[int, int], destination: Tuple[int, int]) -> bool:
         """
         Spawns a car in the simulation.
@@ -40,46 +150,214 @@ class SimulationCore:
 
     def add_house(self, position: Tuple[int, int], color: str = "red", car_limit: int = 2):
         """Adds a house (garage) to the simulation."""
-        house_id = f"house_{len(self.houses)}"
+        house_id = len(self.houses)
         house = House(house_id, position, self.traffic_manager, color, car_limit)
         self.houses.append(house)
-        self.traffic_manager.houses.append(house)
+        self.traffic_manager.register_house(house)
+        self.map.set_building(*position, HOUSE, house.color_id, house_id)
 
-    def add_shopping_center(self, position: Tuple[int, int], color: str = "red"):
-        """Adds a shopping center to the simulation."""
-        sc_id = f"sc_{len(self.shopping_centers)}"
+    def add_shopping_center(self, position: Tuple[int, int], color: str = "red", pin_rate: Optional[float] = None):
+        """
+        Adds a shopping center to the simulation.
+
+        Args:
+            position: (x, y) location of the center.
+            color: Color of the center and its pins.
+            pin_rate: Optional mean pins per tick for Poisson arrivals at this center.
+        """
+        sc_id = len(self.shopping_centers)
         shopping_center = ShoppingCenter(sc_id, position, color)
+        shopping_center.on_failing_changed = self._on_failing_changed
         self.shopping_centers.append(shopping_center)
-        self.traffic_manager.shopping_centers.append(shopping_center)
+        self.traffic_manager.register_shopping_center(shopping_center)
+        self.map.set_building(*position, SHOPPING_CENTER, shopping_center.color_id, sc_id)
+        if pin_rate:
+            self.set_pin_rate(shopping_center, pin_rate)
+
+    def reset(self):
+        """
+        Returns the simulation to an empty map at time zero for a new episode.
+
+        The map grid, road graph, traffic indexes and analytics counters are cleared in place
+        and cars go back to the traffic manager's pool, so nothing is re-allocated.
+        """
+        self.map.reset()
+        self.road_network.reset()
+        self.traffic_manager.reset()
+        self.houses.clear()
+        self.shopping_centers.clear()
+        self.score = 0
+        self.time_elapsed = 0.0
+        self.is_game_over = False
+        self.tick_accumulator = 0.0
+
+        self.events.clear()
+        self._pin_event = None
+        self._center_pin_events.clear()
+        self._failure_deadlines.clear()
+        self.failing_centers.clear()
+        self.pin_generation_interval = self._pin_generation_interval  # Re-arms the global pin event
+
+    def get_world_state(self) -> WorldState:
+        """
+        Builds a WorldState snapshot of the current simulation.
 
-    def step(self, action: Optional[Action], dt: Optional[float] = None) -> Tuple[WorldState, float, bool, Dict]:
+        Returns:
+            WorldState: The current state (the map grid and heatmaps are live arrays, not copies).
+        """
+        return WorldState(
+            map_data=self.map.grid,
+            cars=self.traffic_manager.get_cars(),
+            destinations=[
+                {
+                    'id': sc.center_id,
+                    'location': sc.location,
+                    'pins': len(sc.pins)
+                }
+                for sc in self.shopping_centers
+            ],
+            score=self.score,
+            time_elapsed=self.time_elapsed,
+            is_game_over=self.is_game_over,
+            traffic_heatmaps=self.traffic_manager.analytics.heatmaps
+        )
+
+    def apply_actions(self, batch: ActionBatch) -> int:
+        """
+        Applies a batch of road edits atomically, without advancing time.
+
+        Rows take effect in order, so an edge added and removed within the batch cancels out.
+        The whole batch is validated before anything changes, then the road network is edited
+        with a single version bump and cache invalidation, and the affected cars are re-routed
+        together on the next tick.
+
+        Args:
+            batch: (N, 4) integer array of (op, x, y, direction) rows (see nm_common.actions),
+                a single row, an Action or a sequence of Actions.
+
+        Returns:
+            Number of road segments that actually changed.
+
+        Raises:
+            ValueError: If any row has an unknown op or direction, leaves the map or joins two
+                buildings. Nothing is applied.
+        """
+        if isinstance(batch, Action):
+            rows = encode_actions([batch])
+        elif isinstance(batch, (list, tuple)) and batch and isinstance(batch[0], Action):
+            rows = encode_actions(batch)
+        else:
+            rows = np.asarray(batch, dtype=np.int64).reshape(-1, 4)
+
+        invalid = self._invalid_rows(rows)
+        if invalid.any():
+            raise ValueError(f"Invalid action row {rows[np.argmax(invalid)].tolist()}")
+        return self._apply_rows(rows)
+
+    def _apply_valid_actions(self, batch: ActionBatch) -> List:
+        """
+        Applies the valid edits of a batch and skips the rest (the lenient path of step()).
+
+        Returns:
+            The rejected edits: rows as [op, x, y, direction] lists, and Actions that have no
+            row encoding (unknown type or tiles that are not adjacent) as they were given.
+        """
+        rejected = []
+        if isinstance(batch, Action) or (isinstance(batch, (list, tuple)) and batch and isinstance(batch[0], Action)):
+            encoded = []
+            for action in ([batch] if isinstance(batch, Action) else batch):
+                try:
+                    encoded.append(encode_action(action))
+                except ValueError:
+                    rejected.append(action)
+            rows = np.array(encoded, dtype=np.int64).reshape(-1, 4)
+        else:
+            rows = np.asarray(batch, dtype=np.int64).reshape(-1, 4)
+
+        invalid = self._invalid_rows(rows)
+        if invalid.any():
+            rejected.extend(rows[invalid].tolist())
+            rows = rows[~invalid]
+        self._apply_rows(rows)
+        return rejected
+
+    def _invalid_rows(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Returns:
+            Boolean mask of the rows with an unknown op or direction, that leave the map or
+            that add a segment joining two buildings.
+        """
+        if len(rows) == 0:
+            return np.zeros(0, dtype=bool)
+        ops, xs, ys, directions = rows.T
+        dirs = np.asarray(DIRECTIONS)[np.clip(directions, 0, len(DIRECTIONS) - 1)]
+        end_xs, end_ys = xs + dirs[:, 0], ys + dirs[:, 1]
+        width, height = self.map.width, self.map.height
+        invalid = (
+            (ops < OP_NOOP) | (ops > OP_REMOVE_ROAD)
+            | (directions < 0) | (directions >= len(DIRECTIONS))
+            | (xs < 0) | (xs >= width) | (ys < 0) | (ys >= height)
+            | (end_xs < 0) | (end_xs >= width) | (end_ys < 0) | (end_ys >= height)
+        ) & (ops != OP_NOOP)
+        inside = ~invalid & (ops != OP_NOOP)
+        grid = self.map.grid
+        invalid[inside] = (
+            (ops[inside] == OP_ADD_ROAD)
+            & (grid[ys[inside], xs[inside]] == BUILDING_TILE) & (grid[end_ys[inside], end_xs[inside]] == BUILDING_TILE)
+        )
+        return invalid
+
+    def _apply_rows(self, rows: np.ndarray) -> int:
+        """Applies validated rows as one road network edit (see apply_actions)."""
+        if len(rows) == 0:
+            return 0
+        ops, xs, ys, directions = rows.T
+        dirs = np.asarray(DIRECTIONS)[directions % len(DIRECTIONS)]
+        end_xs, end_ys = xs + dirs[:, 0], ys + dirs[:, 1]
+
+        # Net effect of the batch: {edge: present after the batch}
+        graph = self.road_network.graph
+        final_state = {}
+        for op, x, y, end_x, end_y in zip(ops.tolist(), xs.tolist(), ys.tolist(), end_xs.tolist(), end_ys.tolist()):
+            if op == OP_NOOP:
+                continue
+            final_state[((x, y), (end_x, end_y))] = op == OP_ADD_ROAD
+
+        added = [edge for edge, present in final_state.items() if present and not graph.has_edge(*edge)]
+        removed = [edge for edge, present in final_state.items() if not present and graph.has_edge(*edge)]
+        if not self.road_network.apply_edits(added, removed):
+            return 0
+        if removed:
+            self.traffic_manager.handle_roads_removed(removed)
+        if added:
+            self.traffic_manager.handle_roads_added()
+        return len(added) + len(removed)
+
+    def step(self, action: Optional[ActionBatch], dt: Optional[float] = None) -> Tuple[WorldState, float, bool, Dict]:
         """
         Executes simulation steps based on elapsed time.
 
         Args:
-            action: Action object specifying the player's or AI's move. Could be None.
+            action: The player's or AI's move: an Action or an encoded batch (see apply_actions). Could be None.
+                Unlike apply_actions, invalid edits are skipped as no-ops and the valid ones still apply.
             dt: Time elapsed since the last step in seconds. If None, exactly one logic tick is executed.
 
         Returns:
-            Tuple: WorldState, Reward, Done, Info.
+            Tuple: WorldState, Reward, Done, Info. Info lists skipped edits under 'invalid_actions'.
         """
         # Process player/AI action if provided (actions happen immediately)
-        if action is not None:
-            if action.action_type == 'add_road':
-                self.road_network.add_road(action.params['start'], action.params['end'])
-            elif action.action_type == 'remove_road':
-                self.road_network.remove_road(action.params['start'], action.params['end'])
+        rejected = self._apply_valid_actions(action) if action is not None else []
 
         if dt is None:
             # Legacy/Test mode: execute exactly one logic tick
             self._logic_tick()
             # Still update failure timers with a default tick duration
-            for sc in self.shopping_centers:
+            for sc in self.failing_centers.values():
                 if sc.update_failure_timer(self.tick_duration):
                     self.is_game_over = True
         else:
             # Real-time mode: accumulate and execute ticks
-            for sc in self.shopping_centers:
+            for sc in self.failing_centers.values():
                 if sc.update_failure_timer(dt):
                     self.is_game_over = True
 
@@ -97,36 +375,29 @@ class SimulationCore:
             if ticks_processed >= max_ticks_per_frame:
                 self.tick_accumulator = 0.0
 
-        # Prepare the next WorldState
-        world_state = WorldState(
-            map_data=self.map.grid,
-            cars=self.traffic_manager.get_cars(),
-            destinations=[
-                {
-                    'id': sc.center_id,
-                    'location': sc.location,
-                    'pins': len(sc.pins)
-                }
-                for sc in self.shopping_centers
-            ],
-            score=self.score,
-            time_elapsed=self.time_elapsed,
-            is_game_over=self.is_game_over
-        )
+        world_state = self.get_world_state()
 
-        return world_state, 0, self.is_game_over, {}
+        info = {}
+        if rejected:
+            info['invalid_actions'] = rejected
+        if self.traffic_manager.newly_stranded:
+            info['stranded_cars'] = self.traffic_manager.newly_stranded
+            self.traffic_manager.newly_stranded = []
+        if self.traffic_manager.gridlock.cycles:
+            info['gridlock'] = self.traffic_manager.gridlock.metrics()
+
+        return world_state, 0, self.is_game_over, info
 
     def _logic_tick(self):
         """Internal logic tick executed at SIMULATION_TICK_RATE."""
         # Update traffic flow
         self.traffic_manager.update()
+        if self.gridlock_termination_ticks and self.traffic_manager.gridlock.gridlock_ticks >= self.gridlock_termination_ticks:
+            self.is_game_over = True
+
+        # Fire due events: pin arrivals, growth spawns, failure deadlines
+        self.events.run_due(self.time_elapsed)
 
-        # Update pins and dispatch cars
-        if self.pin_generation_interval > 0 and int(self.time_elapsed) > 0 and int(self.time_elapsed) % self.pin_generation_interval == 0 and self.shopping_centers:
-            import random
-            sc = random.choice(self.shopping_centers)
-            sc.generate_pin()
-            
         # Dispatch cars for pending pins
         for sc in self.shopping_centers:
             # Calculate how many cars need to be dispatched
@@ -135,8 +406,8 @@ class SimulationCore:
             for _ in range(needed_dispatches):
                 dispatched = False
                 # Try to dispatch a car from a house of the SAME color
-                for house in self.houses:
-                    if house.color == sc.color and house.dispatch_car(sc.location):
+                for house in self.traffic_manager.houses_by_color.get(sc.color_id, ()):
+                    if house.dispatch_car(sc.location):
                         sc.dispatched_pins_count += 1
                         dispatched = True
                         break
@@ -149,3 +420,37 @@ class SimulationCore:
         # Calculate score based on total fulfilled pins
         self.score = sum(sc.fulfilled_counter for sc in self.shopping_centers)
 
+    def fast_forward(self, max_ticks: int) -> int:
+        """
+        Advances up to max_ticks logic ticks, jumping over quiet stretches.
+
+        After a tick that leaves no car on the road, the dispatch pass has just run and nothing
+        can change until the next scheduled event, so the clock jumps straight to it. Failure
+        timers advance by the skipped time exactly as if every tick had been stepped.
+
+        Args:
+            max_ticks: Maximum number of ticks to advance.
+
+        Returns:
+            Number of ticks advanced (fewer than max_ticks only if the game ended).
+        """
+        remaining = max_ticks
+        while remaining > 0 and not self.is_game_over:
+            self.step(None)
+            remaining -= 1
+
+            if remaining > 0 and not self.traffic_manager.cars and not self.is_game_over:
+                next_time = self.events.next_time()
+                quiet = remaining if next_time is None else min(remaining, math.ceil(next_time) - int(self.time_elapsed))
+                if quiet > 0:
+                    self._skip_ticks(quiet)
+                    remaining -= quiet
+        return max_ticks - remaining
+
+    def _skip_ticks(self, ticks: int):
+        """Advances the clock over ticks in which nothing happens."""
+        self.time_elapsed += ticks
+        for sc in self.failing_centers.values():
+            if sc.update_failure_timer(ticks * self.tick_duration):
+                self.is_game_over = True
+
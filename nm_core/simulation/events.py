@@ -0,0 +1,81 @@
+import heapq
+import itertools
+from typing import Callable, List, Optional, Tuple
+
+
+class ScheduledEvent:
+    def __init__(self, time: float, callback: Callable, args: Tuple):
+        """
+        A future event in the simulation schedule.
+
+        Args:
+            time: Simulation time (in ticks) at which the event is due.
+            callback: Function called when the event fires.
+            args: Positional arguments passed to the callback.
+        """
+        self.time = time
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        """Prevents the event from firing. It is dropped lazily when it reaches the front of the queue."""
+        self.cancelled = True
+
+
+class EventScheduler:
+    def __init__(self):
+        """
+        Priority queue of future simulation events, ordered by due time.
+
+        Events due at the same time fire in the order they were scheduled, which keeps
+        the simulation deterministic.
+        """
+        self._queue: List[Tuple[float, int, ScheduledEvent]] = []
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def schedule(self, time: float, callback: Callable, *args) -> ScheduledEvent:
+        """
+        Schedules callback(*args) to fire once the simulation time reaches `time`.
+
+        Returns:
+            The event handle, which can be cancelled.
+        """
+        event = ScheduledEvent(time, callback, args)
+        heapq.heappush(self._queue, (time, next(self._counter), event))
+        return event
+
+    def next_time(self) -> Optional[float]:
+        """
+        Returns:
+            Due time of the earliest pending event, or None if nothing is scheduled.
+        """
+        queue = self._queue
+        while queue and queue[0][2].cancelled:
+            heapq.heappop(queue)
+        return queue[0][0] if queue else None
+
+    def run_due(self, now: float) -> int:
+        """
+        Fires every event due at or before `now`, including events scheduled by the
+        callbacks themselves if they are already due.
+
+        Returns:
+            Number of events fired.
+        """
+        queue = self._queue
+        fired = 0
+        while queue and queue[0][0] <= now:
+            _, _, event = heapq.heappop(queue)
+            if event.cancelled:
+                continue
+            event.callback(*event.args)
+            fired += 1
+        return fired
+
+    def clear(self):
+        """Drops all pending events."""
+        self._queue.clear()
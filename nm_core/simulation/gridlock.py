@@ -0,0 +1,86 @@
+from typing import Dict, List, Hashable
+
+
+class GridlockDetector:
+    def __init__(self):
+        """
+        Tracks the wait-for graph between blocked cars and finds circular waits.
+
+        Every blocked car waits on exactly one other car (the one occupying the segment or tile it
+        wants to enter), so the wait-for graph is a functional graph and all of its cycles can be
+        found in a single linear walk. The walk is only repeated when an edge actually changes,
+        which keeps a stable jam (or a stable deadlock) free to monitor.
+        """
+        self.waits_for: Dict[Hashable, Hashable] = {}  # {blocked_car_id: blocking_car_id}
+        self.cycles: List[List[Hashable]] = []  # Circular waits found by the last detection
+        self.gridlock_ticks = 0  # Consecutive ticks with at least one circular wait
+        self._dirty = False
+
+    def set_wait(self, car_id: Hashable, blocker_id: Hashable):
+        """Records that car_id could not move because of blocker_id."""
+        if self.waits_for.get(car_id) != blocker_id:
+            self.waits_for[car_id] = blocker_id
+            self._dirty = True
+
+    def clear_wait(self, car_id: Hashable):
+        """Records that car_id is no longer waiting (it moved or left the simulation)."""
+        if car_id in self.waits_for:
+            del self.waits_for[car_id]
+            self._dirty = True
+
+    def detect(self) -> List[List[Hashable]]:
+        """
+        Finishes a tick: refreshes the cycle list if the wait-for graph changed.
+
+        Returns:
+            List of cycles, each a list of car ids in wait order.
+        """
+        if self._dirty:
+            self.cycles = self._find_cycles()
+            self._dirty = False
+        self.gridlock_ticks = self.gridlock_ticks + 1 if self.cycles else 0
+        return self.cycles
+
+    def _find_cycles(self) -> List[List[Hashable]]:
+        waits_for = self.waits_for
+        visited_in: Dict[Hashable, int] = {}  # car_id -> index of the walk that first reached it
+        cycles = []
+        for walk, start in enumerate(waits_for):
+            node = start
+            while node in waits_for and node not in visited_in:
+                visited_in[node] = walk
+                node = waits_for[node]
+
+            # Only a walk that runs into its own trail has closed a new cycle
+            if visited_in.get(node) == walk and node in waits_for:
+                cycle = [node]
+                follower = waits_for[node]
+                while follower != node:
+                    cycle.append(follower)
+                    follower = waits_for[follower]
+                cycles.append(cycle)
+        return cycles
+
+    @property
+    def deadlocked_count(self) -> int:
+        """Number of cars that are part of a circular wait."""
+        return sum(len(cycle) for cycle in self.cycles)
+
+    def metrics(self) -> Dict:
+        """
+        Returns:
+            Dictionary with the deadlocked car count, the size of each cycle and
+            how many consecutive ticks the gridlock has lasted.
+        """
+        return {
+            'deadlocked_cars': self.deadlocked_count,
+            'cycle_sizes': [len(cycle) for cycle in self.cycles],
+            'gridlock_ticks': self.gridlock_ticks,
+        }
+
+    def reset(self):
+        """Clears all tracked waits."""
+        self.waits_for.clear()
+        self.cycles = []
+        self.gridlock_ticks = 0
+        self._dirty = False
@@ -1,21 +1,54 @@
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 
 import numpy as np
 
+from nm_common.constants import DIRECTION_INDEX
+from nm_core.simulation.changes import ChangeTracker
+
+if TYPE_CHECKING:
+    from nm_core.simulation.road_network import RoadNetworkManager
+
+# One packed record per tile (6 bytes), see GameMap.cells
+CELL_DTYPE = np.dtype([
+    ('tile', np.uint8),       # 0 = empty, ROAD_TILE or BUILDING_TILE
+    ('roads', np.uint8),      # Bit d set if a road segment leads to the neighbour in DIRECTIONS[d]
+    ('kind', np.uint8),       # Building kind: NO_BUILDING, HOUSE or SHOPPING_CENTER
+    ('color', np.uint8),      # Color of the building (meaningful where kind != NO_BUILDING)
+    ('building', np.uint16),  # Index of the building among those of its kind, plus one (0 = none)
+])
+ROAD_TILE = 1
+BUILDING_TILE = 2
+NO_BUILDING = 0
+HOUSE = 1
+SHOPPING_CENTER = 2
+
 
 class GameMap:
-    def __init__(self, width: int, height: int):
+    def __init__(self, width: int, height: int, changes: Optional[ChangeTracker] = None):
         """
-        Initializes the map as a 2D grid.
+        Initializes the map as a 2D grid of packed cells.
+
+        `cells` is a (height, width) structured array of CELL_DTYPE holding the tile type,
+        outgoing road directions, building kind, color and id of every tile. A snapshot is one
+        contiguous copy that pickles or ships as raw bytes, and per-layer planes are views
+        (e.g. cells['roads']) that vectorized code can decode with bit operations.
+        `grid` is the view of the tile type layer.
+
+        The road layer mirrors a road network attached with track_roads() and is brought
+        up to date by refresh().
 
         Args:
             width: Width of the map in tiles.
             height: Height of the map in tiles.
+            changes: Change tracker to report edited tiles to. A private one is created if None.
         """
-        # 2D NumPy array to represent the map grid
-        self.grid = np.zeros((height, width), dtype=int)  # 0 = empty, 1 = road, 2 = building
+        self.cells = np.zeros((height, width), dtype=CELL_DTYPE)
+        self.grid = self.cells['tile']  # 0 = empty, 1 = road, 2 = building
         self.width = width
         self.height = height
+        self.changes = changes if changes is not None else ChangeTracker()
+        self._road_network: Optional['RoadNetworkManager'] = None
+        self._road_changes = None
 
     def add_tile(self, x: int, y: int, tile_type: int) -> bool:
         """
@@ -31,6 +64,7 @@ class GameMap:
         """
         if 0 <= x < self.width and 0 <= y < self.height:
             self.grid[y][x] = tile_type
+            self.changes.mark_tile(x, y)
             return True
         return False  # Out of bounds
 
@@ -46,7 +80,35 @@ class GameMap:
             True if the tile is removed successfully, else False (e.g., out of bounds).
         """
         if 0 <= x < self.width and 0 <= y < self.height:
-            self.grid[y][x] = 0  # Set to empty
+            cell = self.cells[y, x]
+            cell['tile'] = 0  # Set to empty
+            cell['kind'] = NO_BUILDING
+            cell['color'] = 0
+            cell['building'] = 0
+            self.changes.mark_tile(x, y)
+            return True
+        return False  # Out of bounds
+
+    def set_building(self, x: int, y: int, kind: int, color_id: int, building_id: int) -> bool:
+        """
+        Records the building standing on a tile (the tile type itself is set with add_tile).
+
+        Args:
+            x: X-coordinate of the tile.
+            y: Y-coordinate of the tile.
+            kind: HOUSE or SHOPPING_CENTER.
+            color_id: Color of the building.
+            building_id: Index of the building among those of its kind.
+
+        Returns:
+            True if the building was recorded, else False (out of bounds).
+        """
+        if 0 <= x < self.width and 0 <= y < self.height:
+            cell = self.cells[y, x]
+            cell['kind'] = kind
+            cell['color'] = color_id
+            cell['building'] = building_id + 1
+            self.changes.mark_tile(x, y)
             return True
         return False  # Out of bounds
 
@@ -63,4 +125,78 @@ class GameMap:
         """
         if 0 <= x < self.width and 0 <= y < self.height:
             return self.grid[y][x]
-        return None  # Out of bounds
\ No newline at end of file
+        return None  # Out of bounds
+
+    def load_grid(self, grid: np.ndarray):
+        """
+        Replaces every tile at once with a bulk copy.
+
+        Args:
+            grid: (height, width) array of tile types.
+        """
+        if grid.shape != self.grid.shape:
+            raise ValueError(f"Grid shape {grid.shape} does not match the map {self.grid.shape}")
+        np.copyto(self.grid, grid, casting='unsafe')
+        self.changes.mark_all()
+
+    def reset(self):
+        """
+        Clears every tile in place, keeping the grid allocation.
+        """
+        self.cells.fill(0)
+        self.changes.mark_all()
+
+    def track_roads(self, road_network: 'RoadNetworkManager'):
+        """
+        Mirrors the segments of a road network in the road layer of the cells.
+
+        Args:
+            road_network: Network whose change tracker reports the road edits.
+        """
+        if self._road_changes is not None:
+            self._road_network.changes.unsubscribe(self._road_changes)
+        self._road_network = road_network
+        self._road_changes = road_network.changes.subscribe()
+        self.refresh()
+
+    def refresh(self):
+        """Brings the road layer up to date with the segments edited since the last refresh."""
+        if self._road_changes is None or not self._road_changes.dirty:
+            return
+        full, _, edges = self._road_changes.consume()
+        graph = self._road_network.graph
+        roads = self.cells['roads']
+        if full:
+            self._rebuild_roads()
+            return
+        for (x, y), (ex, ey) in edges:
+            direction = DIRECTION_INDEX.get((ex - x, ey - y))
+            if direction is None or not (0 <= x < self.width and 0 <= y < self.height):
+                continue  # Cannot be stored in the road layer
+            if graph.has_edge((x, y), (ex, ey)):
+                roads[y, x] |= 1 << direction
+            else:
+                roads[y, x] &= ~(1 << direction) & 0xFF
+
+    def _rebuild_roads(self):
+        """Rewrites the whole road layer from the network's segments in bulk."""
+        roads = self.cells['roads']
+        roads.fill(0)
+        steps = np.array([(x, y, ex - x, ey - y) for (x, y), (ex, ey) in self._road_network.graph.edges], dtype=np.int64)
+        if not len(steps):
+            return
+        xs, ys, dxs, dys = steps.T
+        directions = np.full(len(steps), -1)
+        for direction, (dx, dy) in enumerate(DIRECTION_INDEX):
+            directions[(dxs == dx) & (dys == dy)] = direction
+        keep = (directions >= 0) & (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        np.bitwise_or.at(roads, (ys[keep], xs[keep]), (1 << directions[keep]).astype(np.uint8))
+
+    def snapshot(self) -> np.ndarray:
+        """
+        Returns:
+            An up-to-date copy of the cells.
+        """
+        self.refresh()
+        return self.cells.copy()
+
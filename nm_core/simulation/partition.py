@@ -0,0 +1,545 @@
+import multiprocessing
+import random
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from nm_core.simulation.core import SimulationCore
+from nm_core.simulation.road_network import RoadNetworkManager
+from nm_core.simulation.scenario import Scenario
+from nm_core.simulation.traffic import TrafficFlowManager
+from nm_core.simulation.world_state import WorldState
+
+# Car states carried through the mailboxes, by code
+CAR_STATES = ('Idle', 'ToShoppingCenter', 'ReturningHome')
+_STATE_CODES = {state: code for code, state in enumerate(CAR_STATES)}
+
+# One car handed over to a neighbouring partition. The sender fills everything but `accepted`
+# and `blocker`, which the receiver writes back in the same row.
+MAIL_DTYPE = np.dtype([
+    ('car_id', np.int64),
+    ('blocker', np.int64),       # Car that kept a rejected car out
+    ('origin', np.int32),        # Flat tile of the car's house
+    ('destination', np.int32),   # Flat tile of the trip's destination
+    ('path_start', np.int32),    # Offset of the remaining route in the mailbox's tile pool
+    ('path_length', np.int32),
+    ('color', np.uint8),
+    ('state', np.uint8),
+    ('accepted', np.uint8),
+])
+_HEADER = 2  # int64 slots before the records: record count, tile pool fill
+
+
+def partition_grid(width: int, height: int, columns: int, rows: int) -> np.ndarray:
+    """
+    Splits a map into a grid of near-equal rectangles.
+
+    Args:
+        width: Width of the map in tiles.
+        height: Height of the map in tiles.
+        columns: Rectangles per row.
+        rows: Rectangles per column.
+
+    Returns:
+        (height, width) int array of owning partition indices, row-major over the rectangles.
+    """
+    if not (1 <= columns <= width and 1 <= rows <= height):
+        raise ValueError(f"Cannot split a {width}x{height} map into {columns}x{rows} partitions")
+    column = np.arange(width) * columns // width
+    row = np.arange(height) * rows // height
+    return row[:, None] * columns + column[None, :]
+
+
+def neighbour_pairs(owner: np.ndarray) -> List[Tuple[int, int]]:
+    """
+    Returns:
+        Sorted (source, destination) pairs of partitions that share an edge, in both directions.
+    """
+    pairs = set()
+    for a, b in ((owner[:, :-1], owner[:, 1:]), (owner[:-1, :], owner[1:, :])):
+        border = a != b
+        for src, dst in zip(a[border].tolist(), b[border].tolist()):
+            pairs.add((src, dst))
+            pairs.add((dst, src))
+    return sorted(pairs)
+
+
+class Mailbox:
+    def __init__(self, buffer, offset: int, capacity: int, path_capacity: int):
+        """
+        Cars handed from one partition to another during a tick, in a shared buffer.
+
+        Layout: two int64 header slots, `capacity` MAIL_DTYPE records and an int32 pool of
+        route tiles. Only the sender writes the header, pool and car fields; only the receiver
+        writes `accepted` and `blocker`, and the coordinator's barriers order the two.
+
+        Args:
+            buffer: Shared memory buffer holding all mailboxes.
+            offset: Byte offset of this mailbox.
+            capacity: Maximum cars per tick.
+            path_capacity: Maximum route tiles per tick, summed over the cars.
+        """
+        self.header = np.ndarray(_HEADER, dtype=np.int64, buffer=buffer, offset=offset)
+        offset += self.header.nbytes
+        self.records = np.ndarray(capacity, dtype=MAIL_DTYPE, buffer=buffer, offset=offset)
+        offset += self.records.nbytes
+        self.paths = np.ndarray(path_capacity, dtype=np.int32, buffer=buffer, offset=offset)
+
+    @staticmethod
+    def size(capacity: int, path_capacity: int) -> int:
+        """Bytes taken by one mailbox, rounded up to 8 so the next one stays aligned."""
+        size = _HEADER * 8 + capacity * MAIL_DTYPE.itemsize + path_capacity * 4
+        return -(-size // 8) * 8
+
+    def clear(self):
+        self.header[:] = 0
+
+    def post(self, car_id: int, tiles, origin: int, destination: int, color: int, state: int) -> bool:
+        """
+        Appends a car and its remaining route (starting at the tile it stands on).
+
+        Returns:
+            False if the mailbox is full; the car must then stay where it is this tick.
+        """
+        count, used = self.header.tolist()
+        if count >= len(self.records) or used + len(tiles) > len(self.paths):
+            return False
+        self.paths[used:used + len(tiles)] = tiles
+        self.records[count] = (car_id, -1, origin, destination, used, len(tiles), color, state, 0)
+        self.header[:] = (count + 1, used + len(tiles))
+        return True
+
+    def posted(self) -> np.ndarray:
+        """Records written since the last clear (a view)."""
+        return self.records[:self.header[0]]
+
+    def route(self, record) -> List[int]:
+        start = int(record['path_start'])
+        return self.paths[start:start + int(record['path_length'])].tolist()
+
+
+class _CenterProxy:
+    __slots__ = ('center_id', 'events')
+
+    def __init__(self, center_id: int, events: List[int]):
+        """Stands in for a shopping center inside a partition: fulfilled pins are reported."""
+        self.center_id = center_id
+        self.events = events
+
+    def fulfill_pin(self) -> bool:
+        self.events.append(self.center_id)
+        return True
+
+
+class _HouseProxy:
+    __slots__ = ('house_id', 'events')
+
+    def __init__(self, house_id: int, events: List[int]):
+        """Stands in for a house inside a partition: returned cars are reported."""
+        self.house_id = house_id
+        self.events = events
+
+    def return_car(self, car):
+        car.state = "Idle"
+        car.active = False
+        self.events.append(self.house_id)
+
+
+class Partition:
+    def __init__(self, index: int, scenario: Scenario, owner: np.ndarray, buffer, layout: Dict[Tuple[int, int], int],
+                 capacity: int, path_capacity: int, seed: int):
+        """
+        One spatial partition: moves the cars on its tiles with the default traffic engine.
+
+        The partition keeps a full copy of the road network (routes cross partitions), but only
+        simulates cars standing on the tiles it owns. A tick runs in three phases separated by
+        barriers: move() advances the local cars and posts the ones stepping onto another
+        partition's tile to that partition's mailbox; admit() lets the posted cars in, in car id
+        order, against the post-move occupancy; settle() drops the admitted cars, records the
+        rejected ones as blocked and reports arrivals to the coordinator.
+
+        Args:
+            index: Partition index (its value in `owner`).
+            scenario: Starting position shared by all partitions.
+            owner: (height, width) partition index of every tile.
+            buffer: Shared memory buffer holding the mailboxes.
+            layout: Byte offset of the mailbox of each (source, destination) pair.
+            capacity: Cars per mailbox and tick.
+            path_capacity: Route tiles per mailbox and tick.
+            seed: Seed of this partition's own random number generator.
+        """
+        self.index = index
+        self.width = scenario.width
+        self.owner = owner.ravel()
+        self.road_network = RoadNetworkManager(tile_stride=self.width)
+        self.road_network.bulk_add_roads(scenario.road_edges())
+        self.traffic = TrafficFlowManager(self.road_network)
+        self.traffic.region = self.owner == index
+        self.outboxes = {dst: Mailbox(buffer, offset, capacity, path_capacity)
+                         for (src, dst), offset in layout.items() if src == index}
+        self.inboxes = {src: Mailbox(buffer, offset, capacity, path_capacity)
+                        for (src, dst), offset in layout.items() if dst == index}
+        self._random_state = random.Random(seed).getstate()
+
+        # Arrivals are reported to the coordinator, which owns the buildings
+        self.fulfilled: List[int] = []
+        self.returned: List[int] = []
+        self.houses = scenario.houses[:, :3].tolist()  # (x, y, color)
+        self.centers = scenario.shopping_centers[:, :2].tolist()
+        for house_id, (x, y, _) in enumerate(self.houses):
+            if self.owner[y * self.width + x] == index:
+                self.traffic.house_at.setdefault((x, y), _HouseProxy(house_id, self.returned))
+        for center_id, (x, y, color) in enumerate(scenario.shopping_centers.tolist()):
+            if self.owner[y * self.width + x] == index:
+                self.traffic.shopping_center_at.setdefault(((x, y), color), _CenterProxy(center_id, self.fulfilled))
+        self._failed: List[int] = []
+        self._overflow = 0
+
+    @contextmanager
+    def _own_random(self):
+        """Runs with this partition's random state, so inline and process runs match."""
+        outer = random.getstate()
+        random.setstate(self._random_state)
+        try:
+            yield
+        finally:
+            self._random_state = random.getstate()
+            random.setstate(outer)
+
+    def _point(self, tile: int) -> Tuple[int, int]:
+        return tile % self.width, tile // self.width
+
+    def move(self, added: List, removed: List, orders: List[Tuple[int, int, int]]):
+        """
+        First phase: applies road edits and dispatch orders, then moves the local cars.
+
+        Args:
+            added: Road segments added since the last tick.
+            removed: Road segments removed since the last tick.
+            orders: (car_id, house_id, center_id) dispatches for houses on this partition.
+        """
+        traffic = self.traffic
+        if added or removed:
+            self.road_network.apply_edits(added, removed)
+            if removed:
+                traffic.handle_roads_removed(removed)
+            if added:
+                traffic.handle_roads_added()
+
+        for car_id, house_id, center_id in orders:
+            x, y, color = self.houses[house_id]
+            destination = tuple(self.centers[center_id])
+            route = self.road_network.find_path((x, y), destination)
+            if not route:
+                self._failed.append(car_id)
+                continue
+            car = traffic.acquire_car((x, y), destination, route, car_id)
+            car.color_id = color  # Cars inherit house color
+            car.state = "ToShoppingCenter"
+            traffic.add_car_to_simulation(car)
+
+        with self._own_random():
+            traffic.move_cars()
+
+        for box in self.outboxes.values():
+            box.clear()
+        width = self.width
+        for car_id in sorted(traffic.departures):
+            car = traffic.cars[car_id]
+            pi = car.path_index
+            box = self.outboxes.get(self.owner[car.path_tiles[pi]])
+            origin = car.origin[1] * width + car.origin[0]
+            destination = car.destination[1] * width + car.destination[0]
+            if box is None or not box.post(car_id, car.path_tiles[pi - 1:], origin, destination,
+                                           car.color_id, _STATE_CODES[car.state]):
+                self._overflow += 1
+                traffic.hold_car(car_id)
+
+    def admit(self):
+        """Second phase: admits the cars posted to this partition, in car id order."""
+        arrivals = [(int(record['car_id']), box, i)
+                    for box in self.inboxes.values() for i, record in enumerate(box.posted())]
+        for car_id, box, i in sorted(arrivals, key=lambda arrival: arrival[0]):
+            record = box.records[i]
+            route = self.road_network.make_route([self._point(tile) for tile in box.route(record)])
+            blocker = self.traffic.admit_car(
+                car_id, route, self._point(int(record['destination'])), self._point(int(record['origin'])),
+                int(record['color']), CAR_STATES[record['state']],
+            )
+            if blocker is None:
+                record['accepted'] = 1
+            else:
+                record['blocker'] = blocker
+
+    def settle(self) -> Dict[str, Any]:
+        """
+        Third phase: hands over the admitted cars, blocks the rejected ones and ends the tick.
+
+        Returns:
+            Report for the coordinator: fulfilled center ids, house ids that got a car back,
+            car ids of dispatches without a route, cars on the partition and mailbox overflows.
+        """
+        traffic = self.traffic
+        handed_over = []
+        for box in self.outboxes.values():
+            for record in box.posted():
+                car_id = int(record['car_id'])
+                if record['accepted']:
+                    handed_over.append(car_id)
+                else:
+                    traffic.hold_car(car_id, int(record['blocker']))
+        traffic.end_tick(handed_over)
+
+        report = {
+            'fulfilled': self.fulfilled[:],
+            'returned': self.returned[:],
+            'failed': self._failed,
+            'cars': len(traffic.cars),
+            'handoffs': len(handed_over),
+            'overflow': self._overflow,
+        }
+        self.fulfilled.clear()
+        self.returned.clear()
+        self._failed = []
+        self._overflow = 0
+        return report
+
+    def get_cars(self) -> List[Dict]:
+        return self.traffic.get_cars()
+
+
+def _worker(conn, index: int, scenario: Scenario, owner: np.ndarray, memory_name: str,
+            layout: Dict[Tuple[int, int], int], capacity: int, path_capacity: int, seed: int):
+    """Subprocess loop: owns one partition and serves (command, argument) requests in order."""
+    memory = shared_memory.SharedMemory(name=memory_name)
+    partition = Partition(index, scenario, owner, memory.buf, layout, capacity, path_capacity, seed)
+    while True:
+        try:
+            command, argument = conn.recv()
+        except EOFError:
+            break
+        try:
+            if command == 'close':
+                conn.send(('ok', None))
+                break
+            conn.send(('ok', getattr(partition, command)(*argument)))
+        except Exception as error:  # Report instead of killing the worker
+            conn.send(('error', error))
+    del partition  # Drop the views into the buffer before unmapping it
+    memory.close()
+    conn.close()
+
+
+class PartitionedSimulation:
+    def __init__(self, scenario: Scenario, columns: int = 2, rows: int = 1, processes: bool = True,
+                 context: Optional[str] = None, mailbox_capacity: int = 256, path_capacity: Optional[int] = None):
+        """
+        Simulates one map split into a grid of partitions, each moving its own cars.
+
+        The coordinator keeps a SimulationCore with the map, roads and buildings: it applies road
+        edits, fires pin and failure events, dispatches cars and keeps the score. Partitions own
+        the cars on their tiles (see Partition). A car stepping onto another partition's tile is
+        posted to that partition's mailbox in shared memory and admitted or turned away at the
+        tick boundary, in car id order, so border conflicts resolve the same way every run, in
+        or out of process. Inside a partition the movement rules are those of the default
+        engine; a car entering from a neighbour goes after the neighbour's own cars have moved.
+
+        Dispatch orders reach the house's partition with the next tick, as in SimulationCore,
+        where a car dispatched at the end of a tick first moves on the next one. Only the
+        partition searches the route; a house with none is skipped for that center until the
+        roads change.
+
+        Args:
+            scenario: Starting position (buildings must stay as in the scenario).
+            columns: Partitions per row of the map.
+            rows: Partitions per column of the map.
+            processes: If True, every partition runs in its own process. Otherwise they run
+                inline, one after another (same results, for debugging and tests).
+            context: multiprocessing start method ('fork', 'spawn', ...). None uses the default.
+            mailbox_capacity: Cars one partition can hand to a neighbour per tick. Further cars
+                wait for the next tick (counted in info['mailbox_overflow']).
+            path_capacity: Route tiles per mailbox and tick. Defaults to mailbox_capacity
+                routes of width + height tiles.
+        """
+        self.sim = SimulationCore(scenario.width, scenario.height)
+        scenario.apply(self.sim)
+        self.owner = partition_grid(scenario.width, scenario.height, columns, rows)
+        self.partition_count = columns * rows
+        self._road_changes = self.sim.road_network.changes.subscribe()
+        self._road_changes.consume()
+        self._next_car_id = 0
+        self._orders: List[List[Tuple[int, int, int]]] = [[] for _ in range(self.partition_count)]
+        self._dispatched: Dict[int, Tuple[int, int]] = {}  # Car id -> (house id, center id) of the last orders
+        self._unroutable = set()  # (house id, center id) pairs without a route on the current roads
+        self.cars_on_road = 0
+
+        if path_capacity is None:
+            path_capacity = mailbox_capacity * (scenario.width + scenario.height)
+        box_size = Mailbox.size(mailbox_capacity, path_capacity)
+        layout = {pair: i * box_size for i, pair in enumerate(neighbour_pairs(self.owner))}
+        self._memory = shared_memory.SharedMemory(create=True, size=max(1, len(layout) * box_size))
+        settings = (layout, mailbox_capacity, path_capacity)
+        seeds = [scenario.seed * self.partition_count + index for index in range(self.partition_count)]
+
+        self._partitions: List[Partition] = []
+        self._conns = []
+        self._processes = []
+        if processes:
+            ctx = multiprocessing.get_context(context)
+            for index in range(self.partition_count):
+                conn, child_conn = ctx.Pipe()
+                process = ctx.Process(target=_worker, daemon=True, args=(
+                    child_conn, index, scenario, self.owner, self._memory.name, *settings, seeds[index]
+                ))
+                process.start()
+                child_conn.close()
+                self._conns.append(conn)
+                self._processes.append(process)
+        else:
+            self._partitions = [
+                Partition(index, scenario, self.owner, self._memory.buf, *settings, seeds[index])
+                for index in range(self.partition_count)
+            ]
+
+    def _run(self, command: str, arguments: Optional[List[Tuple]] = None) -> List[Any]:
+        """Runs one phase on every partition and waits for all of them (the tick barrier)."""
+        if arguments is None:
+            arguments = [()] * self.partition_count
+        if self._partitions:
+            return [getattr(partition, command)(*args) for partition, args in zip(self._partitions, arguments)]
+        for conn, args in zip(self._conns, arguments):
+            conn.send((command, args))
+        results = []
+        for conn in self._conns:
+            status, payload = conn.recv()
+            if status == 'error':
+                raise payload
+            results.append(payload)
+        return results
+
+    @property
+    def score(self) -> int:
+        return self.sim.score
+
+    @property
+    def is_game_over(self) -> bool:
+        return self.sim.is_game_over
+
+    def step(self, action=None) -> Tuple[float, bool, Dict]:
+        """
+        Applies road edits and advances every partition by one logic tick.
+
+        Args:
+            action: Road edits as accepted by SimulationCore.apply_actions, or None.
+
+        Returns:
+            (pins fulfilled during the tick, game over, info). info holds the cars on the road,
+            the cars handed between partitions and any mailbox overflow.
+        """
+        sim = self.sim
+        if action is not None:
+            sim.apply_actions(action)
+        _, _, edges = self._road_changes.consume()
+        graph = sim.road_network.graph
+        added = sorted(edge for edge in edges if graph.has_edge(*edge))
+        removed = sorted(edge for edge in edges if not graph.has_edge(*edge))
+        if edges:
+            self._unroutable.clear()
+
+        orders = self._orders
+        self._run('move', [(added, removed, partition_orders) for partition_orders in orders])
+        self._run('admit')
+        reports = self._run('settle')
+
+        previous_score = sim.score
+        for report in reports:
+            for car_id in report['failed']:
+                house_id, center_id = self._dispatched[car_id]
+                sim.houses[house_id].idle_count += 1
+                sim.shopping_centers[center_id].dispatched_pins_count -= 1
+                self._unroutable.add((house_id, center_id))
+            for center_id in report['fulfilled']:
+                sim.shopping_centers[center_id].fulfill_pin()
+            for house_id in report['returned']:
+                sim.houses[house_id].idle_count += 1
+        self.cars_on_road = sum(report['cars'] for report in reports)
+
+        sim.events.run_due(sim.time_elapsed)
+        self._dispatch()
+        sim.time_elapsed += 1
+        sim.score = sum(sc.fulfilled_counter for sc in sim.shopping_centers)
+        for sc in sim.failing_centers.values():
+            if sc.update_failure_timer(sim.tick_duration):
+                sim.is_game_over = True
+
+        info = {
+            'cars': self.cars_on_road,
+            'handoffs': sum(report['handoffs'] for report in reports),
+        }
+        overflow = sum(report['overflow'] for report in reports)
+        if overflow:
+            info['mailbox_overflow'] = overflow
+        return float(sim.score - previous_score), sim.is_game_over, info
+
+    def _dispatch(self):
+        """Matches pending pins with idle houses as SimulationCore does, into per-partition orders."""
+        sim = self.sim
+        self._orders = [[] for _ in range(self.partition_count)]
+        self._dispatched = {}
+        houses_by_color = sim.traffic_manager.houses_by_color
+        for sc in sim.shopping_centers:
+            for _ in range(len(sc.pins) - sc.dispatched_pins_count):
+                for house in houses_by_color.get(sc.color_id, ()):
+                    if house.idle_count and (house.house_id, sc.center_id) not in self._unroutable:
+                        break
+                else:
+                    break  # No more cars available to dispatch for this center right now
+                car_id = self._next_car_id
+                self._next_car_id += 1
+                house.idle_count -= 1
+                sc.dispatched_pins_count += 1
+                x, y = house.location
+                self._orders[self.owner[y, x]].append((car_id, house.house_id, sc.center_id))
+                self._dispatched[car_id] = (house.house_id, sc.center_id)
+
+    def get_cars(self) -> List[Dict]:
+        """Cars of all partitions, ordered by id (see TrafficFlowManager.get_cars)."""
+        cars = [car for cars in self._run('get_cars') for car in cars]
+        return sorted(cars, key=lambda car: car['car_id'])
+
+    def get_world_state(self) -> WorldState:
+        """Builds a WorldState snapshot, collecting the cars from every partition."""
+        sim = self.sim
+        return WorldState(
+            map_data=sim.map.grid,
+            cars=self.get_cars(),
+            destinations=[{'id': sc.center_id, 'location': sc.location, 'pins': len(sc.pins)}
+                          for sc in sim.shopping_centers],
+            score=sim.score,
+            time_elapsed=sim.time_elapsed,
+            is_game_over=sim.is_game_over,
+        )
+
+    def close(self):
+        """Stops the worker processes and releases the mailboxes."""
+        for conn, process in zip(self._conns, self._processes):
+            if process.is_alive():
+                conn.send(('close', ()))
+                conn.recv()
+            conn.close()
+            process.join(timeout=5)
+        self._conns = []
+        self._processes = []
+        self._partitions = []
+        if self._memory is not None:
+            self._memory.close()
+            self._memory.unlink()
+            self._memory = None
+
+    def __enter__(self) -> "PartitionedSimulation":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,15 +1,60 @@
 import networkx as nx
 import numpy as np
-from typing import Tuple, List, Optional
+from typing import Tuple, List, Optional, Dict, Iterable
+
+from nm_common.constants import (
+    PATH_CACHE_SIZE, DIRECTION_INDEX, NO_DIRECTION, OTHER_DIRECTION, DEFAULT_TILE_STRIDE
+)
+from nm_core.simulation.changes import ChangeTracker
+
+
+class Route(tuple):
+    """
+    Immutable path of (x, y) points that also carries its integer encoding:
+
+        tiles[i]: Flat index y * stride + x of path[i].
+        dirs[i]: Direction code of the step from path[i - 1] to path[i] (NO_DIRECTION for i = 0).
+    """
+    tiles: Tuple[int, ...]
+    dirs: Tuple[int, ...]
+
+
+def encode_path(path, stride: int) -> Tuple[Tuple[int, ...], Tuple[int, ...]]:
+    """
+    Computes the flat tile indices and step direction codes of a path (see Route).
+    """
+    tiles = tuple(y * stride + x for x, y in path)
+    dirs = [NO_DIRECTION]
+    for (x0, y0), (x1, y1) in zip(path, path[1:]):
+        step = (x1 - x0, y1 - y0)
+        dirs.append(NO_DIRECTION if step == (0, 0) else DIRECTION_INDEX.get(step, OTHER_DIRECTION))
+    return tiles, tuple(dirs)
 
 
 class RoadNetworkManager:
-    def __init__(self):
+    def __init__(self, changes: Optional[ChangeTracker] = None, tile_stride: int = DEFAULT_TILE_STRIDE):
         """
         Initializes the road network manager.
+
+        Args:
+            changes: Change tracker to report added/removed segments to. A private one is created if None.
+            tile_stride: Row stride of the flat tile indices in route encodings (the map width).
         """
         # Underlying graph representing the road network
         self.graph = nx.DiGraph()  # Directed graph for one-way road segments
+        # Edge attribute used by pathfinding: 'weight' (length) or 'cost' (length + congestion)
+        self.weight_key = 'weight'
+        self._congested_edges = set()  # Edges whose 'cost' currently differs from 'weight'
+        # Shared read-only routes {(start, destination): route}, valid until the roads or costs change
+        self._path_cache: Dict[Tuple[Tuple[int, int], Tuple[int, int]], Route] = {}
+        self.tile_stride = tile_stride
+        self.changes = changes if changes is not None else ChangeTracker()
+        self._cache_changes = self.changes.subscribe()  # Road edits not yet applied to the path cache
+
+    @property
+    def version(self) -> int:
+        """Road layout version, bumped once per edit or batch of edits."""
+        return self.changes.road_version
 
     @property
     def roads(self) -> List[Tuple[Tuple[int, int], Tuple[int, int]]]:
@@ -36,7 +81,8 @@ class RoadNetworkManager:
             return False  # Road already exists
         # Add edge with default weight (e.g., distance between tiles)
         distance = np.linalg.norm(np.array(end) - np.array(start))  # Euclidean distance
-        self.graph.add_edge(start, end, weight=distance)
+        self.graph.add_edge(start, end, weight=distance, cost=distance)
+        self.changes.mark_edges([(start, end)])
         return True
 
     def remove_road(self, start: Tuple[int, int], end: Tuple[int, int]) -> bool:
@@ -53,27 +99,195 @@ class RoadNetworkManager:
         if not self.graph.has_edge(start, end):
             return False  # Road does not exist
         self.graph.remove_edge(start, end)
+        self._congested_edges.discard((start, end))
+        self.changes.mark_edges([(start, end)])
         return True
 
-    def find_path(self, start: Tuple[int, int], destination: Tuple[int, int]) -> Optional[List[Tuple[int, int]]]:
+    def apply_edits(self, added: Iterable[Tuple[Tuple[int, int], Tuple[int, int]]],
+                    removed: Iterable[Tuple[Tuple[int, int], Tuple[int, int]]]) -> bool:
+        """
+        Adds and removes many road segments as one change.
+
+        The caller is expected to pass only edges that are absent (added) or present (removed).
+        The whole batch is reported to the change tracker as one version bump.
+
+        Args:
+            added: Road segments (start, end) to add.
+            removed: Road segments (start, end) to remove.
+
+        Returns:
+            True if the network changed.
+        """
+        edges = []
+        for start, end in removed:
+            self.graph.remove_edge(start, end)
+            self._congested_edges.discard((start, end))
+            edges.append((start, end))
+        for start, end in added:
+            distance = float(np.hypot(end[0] - start[0], end[1] - start[1]))
+            self.graph.add_edge(start, end, weight=distance, cost=distance)
+            edges.append((start, end))
+        self.changes.mark_edges(edges)
+        return bool(edges)
+
+    def bulk_add_roads(self, edges: Iterable[Tuple[Tuple[int, int], Tuple[int, int]]]):
+        """
+        Adds many unit-length segments between adjacent tiles in one pass, e.g. when loading a map.
+
+        Existing segments are overwritten. The change is reported as a full change, so
+        subscribers rebuild in bulk instead of replaying every segment.
+
+        Args:
+            edges: Road segments (start, end) joining adjacent tiles.
+        """
+        self.graph.add_edges_from(edges, weight=1.0, cost=1.0)
+        self.changes.mark_all()
+
+    def _sync_path_cache(self):
+        """
+        Applies road edits reported since the last lookup to the path cache.
+
+        A new segment can shorten any route, so it empties the cache; removed segments
+        only invalidate the cached routes that run over them.
+        """
+        if not self._cache_changes.dirty:
+            return
+        full, _, edges = self._cache_changes.consume()
+        if full or any(self.graph.has_edge(*edge) for edge in edges):
+            self._path_cache.clear()
+            return
+        self._path_cache = {
+            key: route for key, route in self._path_cache.items()
+            if edges.isdisjoint(zip(route, route[1:]))
+        }
+
+    def find_path(self, start: Tuple[int, int], destination: Tuple[int, int]) -> Optional[Route]:
         """
         Finds the shortest path between two points in the road network.
 
+        Routes are cached and shared between callers until the network changes, so repeated
+        trips (house -> shopping center and back) reuse the same immutable tuple.
+
         Args:
             start: Starting point (x, y).
             destination: Endpoint (x, y).
 
         Returns:
-            List of tuples representing the shortest path if one exists, else None.
+            Tuple of points representing the shortest path if one exists, else None.
         """
+        self._sync_path_cache()
+        key = (start, destination)
+        route = self._path_cache.get(key)
+        if route is not None:
+            return route
+
         if start not in self.graph or destination not in self.graph:
             return None
 
         try:
-            path = nx.shortest_path(self.graph, source=start, target=destination, weight='weight')
-            return path
+            path = nx.shortest_path(self.graph, source=start, target=destination, weight=self.weight_key)
         except nx.NetworkXNoPath:
             return None
+        return self._cache_route(key, path)
+
+    def make_route(self, path) -> Route:
+        """Freezes a list of points into an encoded Route."""
+        route = Route(path)
+        route.tiles, route.dirs = encode_path(route, self.tile_stride)
+        return route
+
+    def encode_route(self, path) -> Tuple[Tuple[int, ...], Tuple[int, ...]]:
+        """
+        Returns:
+            (tiles, dirs) of any path: precomputed for Routes, computed on the fly otherwise.
+        """
+        if isinstance(path, Route):
+            return path.tiles, path.dirs
+        return encode_path(path, self.tile_stride)
+
+    def _cache_route(self, key: Tuple[Tuple[int, int], Tuple[int, int]], path) -> Route:
+        route = self.make_route(path)
+        if len(self._path_cache) >= PATH_CACHE_SIZE:
+            self._path_cache.clear()
+        self._path_cache[key] = route
+        return route
+
+    def find_paths_to(self, destination: Tuple[int, int], sources) -> Dict[Tuple[int, int], Route]:
+        """
+        Finds shortest paths from many sources to a single destination with one search.
+
+        Runs Dijkstra once from the destination over the reversed graph, so re-routing a
+        batch of cars that share a destination costs a single search instead of one per car.
+
+        Args:
+            destination: Common endpoint (x, y).
+            sources: Iterable of starting points (x, y).
+
+        Returns:
+            Dictionary {source: path} for every source that can reach the destination.
+        """
+        if destination not in self.graph:
+            return {}
+
+        self._sync_path_cache()
+        paths = {}
+        missing = []
+        for source in sources:
+            route = self._path_cache.get((source, destination))
+            if route is not None:
+                paths[source] = route
+            else:
+                missing.append(source)
+        if not missing:
+            return paths
+
+        pred, _ = nx.dijkstra_predecessor_and_distance(self.graph.reverse(copy=False), destination, weight=self.weight_key)
+        for source in missing:
+            if source not in pred:
+                continue
+            # In the reversed graph, a node's predecessor is its next hop towards the destination
+            path = [source]
+            node = source
+            while node != destination:
+                node = pred[node][0]
+                path.append(node)
+            paths[source] = self._cache_route((source, destination), path)
+        return paths
+
+    def set_congestion_routing(self, enabled: bool):
+        """
+        Switches pathfinding between plain road length and congestion-adjusted costs.
+
+        Args:
+            enabled: If True, paths minimise the 'cost' edge attribute maintained by apply_congestion.
+        """
+        self.weight_key = 'cost' if enabled else 'weight'
+
+    def apply_congestion(self, penalties: Dict[Tuple[Tuple[int, int], Tuple[int, int]], float]):
+        """
+        Updates edge costs from congestion penalties.
+
+        Each listed edge gets cost = length * (1 + penalty). Edges penalised by the previous
+        call but missing from this one fall back to their plain length, so only edges that
+        actually carry traffic are touched.
+
+        Args:
+            penalties: Dictionary {(start, end): penalty} of non-negative congestion penalties.
+        """
+        edges = self.graph.edges
+        for edge in self._congested_edges.difference(penalties):
+            if edge in edges:
+                data = edges[edge]
+                data['cost'] = data['weight']
+
+        congested = set()
+        for edge, penalty in penalties.items():
+            if edge in edges:
+                data = edges[edge]
+                data['cost'] = data['weight'] * (1.0 + penalty)
+                congested.add(edge)
+        self._congested_edges = congested
+        self._path_cache.clear()
 
     def is_connected(self, start: Tuple[int, int], end: Tuple[int, int]) -> bool:
         """
@@ -93,3 +307,6 @@ class RoadNetworkManager:
         Resets the road network, clearing all roads and intersections.
         """
         self.graph.clear()
+        self._congested_edges.clear()
+        self._path_cache.clear()
+        self.changes.mark_all()
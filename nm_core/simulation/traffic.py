@@ -1,4 +1,8 @@
-from typing import Tuple, List, Dict, TYPE_CHECKING
+import random
+from collections import deque
+from typing import Tuple, List, Dict, Set, Iterable, Optional, Deque, TYPE_CHECKING
+
+import numpy as np
 
 if TYPE_CHECKING:
     from nm_core.entities.house import House
@@ -6,26 +10,255 @@ if TYPE_CHECKING:
 
 from nm_core.entities.car import Car
 from nm_core.simulation.road_network import RoadNetworkManager
+from nm_core.simulation.gridlock import GridlockDetector
+from nm_core.simulation.analytics import TrafficAnalytics
+from nm_common.constants import (
+    CONGESTION_UPDATE_INTERVAL, CONGESTION_SMOOTHING, CONGESTION_OCCUPANCY_WEIGHT,
+    CONGESTION_WAIT_WEIGHT, REROUTE_BATCH_SIZE, DIRECTIONS, NO_DIRECTION, OPPOSITE_DIRECTION, END_OF_ROUTE,
+    SEGMENT_CODES
+)
 
 
 class TrafficFlowManager:
-    def __init__(self, road_network: RoadNetworkManager):
+    def __init__(self, road_network: RoadNetworkManager, congestion_routing: bool = False,
+                 grid_size: Optional[Tuple[int, int]] = None, segment_queues: bool = False):
         """
         Initialize the traffic flow manager.
 
         Args:
             road_network: Instance of the RoadNetworkManager to handle pathfinding.
+            congestion_routing: If True, edge costs follow smoothed segment load and cars
+                on the road are periodically re-routed in batches.
+            grid_size: (width, height) of the map. Enables per-tile traffic analytics; the road
+                network must then encode tiles with tile_stride equal to the width.
+            segment_queues: If True, blocked cars sleep in per-segment queues and a tick skips
+                them instead of re-evaluating them (requires grid_size). Cars move exactly as
+                with the default engine.
         """
+        if segment_queues and grid_size is None:
+            raise ValueError("segment_queues requires grid_size")
+        if grid_size is not None and road_network.tile_stride != grid_size[0]:
+            # Route tiles index the per-tile counters and queues, which are laid out y * width + x
+            raise ValueError(f"road_network.tile_stride ({road_network.tile_stride}) must equal the grid width ({grid_size[0]})")
         self.road_network = road_network
-        self.cars: Dict[str, Car] = {}  # A dictionary of active cars {car_id: Car}
+        self.cars: Dict[int, Car] = {}  # A dictionary of active cars {car_id: Car}
+        self._next_car_id = 0
+        self._car_pool: List[Car] = []  # Cars off the road, recycled by acquire_car
         self.houses: List['House'] = []
         self.shopping_centers: List['ShoppingCenter'] = []
+        # Building indexes for arrivals and dispatch (the first building registered wins a location)
+        self.house_at: Dict[Tuple[int, int], 'House'] = {}
+        self.shopping_center_at: Dict[Tuple[Tuple[int, int], int], 'ShoppingCenter'] = {}  # {(location, color_id): center}
+        self.houses_by_color: Dict[int, List['House']] = {}
+
+        # Congestion-aware routing
+        self.congestion_routing = congestion_routing
+        self.congestion_update_interval = CONGESTION_UPDATE_INTERVAL
+        self.reroute_batch_size = REROUTE_BATCH_SIZE
+        self.road_network.set_congestion_routing(congestion_routing)
+        self._segment_load: Dict[Tuple, float] = {}  # Load accumulated since the last refresh
+        self._smoothed_penalty: Dict[Tuple, float] = {}  # EMA of per-tick load per segment
+        self._ticks_since_refresh = 0
+        self._reroute_cursor = 0
+
+        # Reverse index of the road segments still ahead of each car {(start, end): {car_id}}
+        self.edge_index: Dict[Tuple, Set[int]] = {}
+        self._pending_reroute: Set[int] = set()  # Cars whose route lost an edge since the last tick
+        self.stranded_cars: Set[int] = set()  # Cars with no route left; they hold position until roads change
+        self._retry_stranded = False
+        self.newly_stranded: List[int] = []  # Cars stranded since the owner last consumed this list
+
+        # Gridlock detection over the wait-for graph of blocked cars
+        self.gridlock = GridlockDetector()
+        # None: only detect; 'yield': one car per cycle squeezes forward on the next tick
+        self.gridlock_policy: Optional[str] = None
+        self._yielding: Set[int] = set()
+
+        # Per-tile / per-segment traffic counters
+        self.grid_size = grid_size
+        self.analytics: Optional[TrafficAnalytics] = TrafficAnalytics(*grid_size) if grid_size else None
+
+        # Segment-queue engine (see _update_queues); occupancy and queues persist across ticks
+        self.segment_queues = segment_queues
+        self._occupied_segments: Dict[int, int] = {}  # Segment key -> car_id, as _update_all sees it
+        self._tile_occupied_by: Dict[int, int] = {}  # Tile -> car_id, as _update_all sees it
+        self._car_keys: Dict[int, Tuple[int, int]] = {}  # car_id -> (segment key, tile) it stands on
+        self._segment_holders: Dict[int, Set[int]] = {}  # Segment key -> cars standing on it
+        self._tile_holders: Dict[int, Set[int]] = {}  # Tile -> cars standing on it
+        self._dirty_segments: Set[int] = set()  # Keys to settle at the next tick start (see _settle_keys)
+        self._dirty_tiles: Set[int] = set()
+        self._insertion: Dict[int, int] = {}  # car_id -> insertion count, i.e. the order of self.cars
+        self._insertions = 0
+        self._asleep: Dict[int, List] = {}  # Cars parked in wait queues (see _sleep)
+        self._segment_waiters: Dict[int, Deque[int]] = {}  # Segment key -> FIFO of cars waiting for it
+        self._tile_waiters: Dict[int, Deque[int]] = {}  # Tile -> FIFO of cars waiting for it
+        self._queue_tick = 0
+        self._running = False  # Inside the car loop of _update_queues
+        self._woken_late: List[List] = []  # Sleepers woken after their turn in the running tick
+        self._new_sleepers: List[int] = []
+        self._counted_sleepers = 0
+        cells = grid_size[0] * grid_size[1] if segment_queues else 0
+        self._sleep_tiles = np.zeros(cells, dtype=np.int64)  # Sleeping cars per flat tile
+        self._sleep_segments = np.zeros(cells * len(DIRECTIONS), dtype=np.int64)  # ... per flat segment
+        self._sleep_load = np.zeros(cells * len(DIRECTIONS), dtype=np.int64)  # Sleeping car-ticks since the last refresh
+
+        # Spatial partitioning (see nm_core.simulation.partition): cars whose next tile is outside
+        # the owned flat tiles hold position and are listed in departures for the owner to admit
+        self.region: Optional[np.ndarray] = None
+        self.departures: List[int] = []
+        self.tile_claims: Dict[int, int] = {}  # Tiles entered during the last tick
+        self._finished: List[int] = []  # Cars that finished their trip this tick (see end_tick)
+        self._admission: Optional[Tuple[Dict[int, int], Dict[int, int]]] = None  # Occupancy for admit_car
+
+    def register_house(self, house: 'House'):
+        """Adds a house to the building list and the location / color indexes."""
+        self.houses.append(house)
+        self.house_at.setdefault(house.location, house)
+        self.houses_by_color.setdefault(house.color_id, []).append(house)
+
+    def register_shopping_center(self, shopping_center: 'ShoppingCenter'):
+        """Adds a shopping center to the building list and the location index."""
+        self.shopping_centers.append(shopping_center)
+        self.shopping_center_at.setdefault((shopping_center.location, shopping_center.color_id), shopping_center)
+
+    def allocate_car_id(self) -> int:
+        """Returns the next dense integer car id."""
+        car_id = self._next_car_id
+        self._next_car_id += 1
+        return car_id
+
+    def acquire_car(self, start: Tuple[int, int], destination: Tuple[int, int], path,
+                    car_id: Optional[int] = None) -> Car:
+        """
+        Returns a car ready for a new trip, recycled from the pool when possible.
+
+        Args:
+            start: (x, y) coordinate of the starting position.
+            destination: (x, y) coordinate of the destination.
+            path: Route from start to destination (shared, not copied).
+            car_id: Id to give the car when the caller numbers cars itself (e.g. a partition
+                of a larger map); None keeps a recycled car's id or allocates the next one.
+        """
+        if self._car_pool:
+            car = self._car_pool.pop()
+            car.reset(start, destination, path)
+            if car_id is not None:
+                car.car_id = car_id
+            return car
+        return Car(car_id=self.allocate_car_id() if car_id is None else car_id, start=start,
+                   destination=destination, path=path)
 
     def add_car_to_simulation(self, car: Car):
         """
         Adds a car to the active simulation tracking.
         """
+        self._encode_route(car)
         self.cars[car.car_id] = car
+        self._index_route(car)
+        if self.segment_queues:
+            self._insertion[car.car_id] = self._insertions
+            self._insertions += 1
+            self._rehold(car)
+
+    def _encode_route(self, car: Car):
+        """Attaches the integer encoding of the car's current path."""
+        car.path_tiles, car.path_dirs = self.road_network.encode_route(car.path)
+
+    def _remaining_edges(self, car: Car):
+        """Yields the road segments of the car's path that it has not traversed yet."""
+        path = car.path
+        for i in range(max(car.path_index - 1, 0), len(path) - 1):
+            if path[i] != path[i + 1]:
+                yield path[i], path[i + 1]
+
+    def _index_route(self, car: Car):
+        """Registers the car under every segment still ahead on its path."""
+        for edge in self._remaining_edges(car):
+            cars = self.edge_index.get(edge)
+            if cars is None:
+                self.edge_index[edge] = {car.car_id}
+            else:
+                cars.add(car.car_id)
+
+    def _unindex_route(self, car: Car):
+        """Removes the car from the reverse index."""
+        for edge in self._remaining_edges(car):
+            self._unindex_edge(edge, car.car_id)
+
+    def _unindex_edge(self, edge: Tuple, car_id: int):
+        cars = self.edge_index.get(edge)
+        if cars is not None:
+            cars.discard(car_id)
+            if not cars:
+                del self.edge_index[edge]
+
+    def handle_roads_removed(self, edges: Iterable[Tuple[Tuple[int, int], Tuple[int, int]]]):
+        """
+        Marks the cars whose remaining path uses any of the removed segments for re-routing.
+
+        The affected cars are looked up through the reverse index and re-routed together at the
+        start of the next update, so any number of edits between two ticks costs one batched search
+        per destination.
+
+        Args:
+            edges: Removed road segments as (start, end) tuples.
+        """
+        for edge in edges:
+            cars = self.edge_index.pop(edge, None)
+            if cars:
+                self._pending_reroute.update(cars)
+
+    def handle_roads_added(self):
+        """Schedules a route search for stranded cars, since a new road may reconnect them."""
+        if self.stranded_cars:
+            self._retry_stranded = True
+
+    def _reroute(self, cars: Iterable[Car]) -> List[Car]:
+        """
+        Re-routes cars from their current positions, one search per distinct destination.
+
+        Returns:
+            The cars for which no route exists anymore.
+        """
+        by_destination: Dict[Tuple[int, int], List[Car]] = {}
+        for car in cars:
+            by_destination.setdefault(car.destination, []).append(car)
+
+        unreachable = []
+        for destination, group in by_destination.items():
+            paths = self.road_network.find_paths_to(destination, {car.position for car in group})
+            for car in group:
+                path = paths.get(car.position)
+                if path is None:
+                    unreachable.append(car)
+                    continue
+                self._unindex_route(car)
+                car.reroute(path)
+                self._encode_route(car)
+                self._index_route(car)
+                if self.segment_queues:
+                    self._rehold(car)
+                    self._wake(car.car_id)
+        return unreachable
+
+    def _process_route_changes(self):
+        """Re-routes cars affected by road edits since the last tick and tracks stranded ones."""
+        if not self._pending_reroute and not self._retry_stranded:
+            return
+
+        car_ids = self._pending_reroute
+        if self._retry_stranded:
+            car_ids = car_ids | self.stranded_cars
+        self._pending_reroute = set()
+        self._retry_stranded = False
+
+        cars = [self.cars[car_id] for car_id in car_ids if car_id in self.cars and self.cars[car_id].active]
+        if self.segment_queues:
+            for car in cars:
+                self._wake(car.car_id)  # Stranded or not, their blockers may be gone
+        stranded = {car.car_id for car in self._reroute(cars)}
+        self.newly_stranded.extend(sorted(stranded - self.stranded_cars))
+        self.stranded_cars = (self.stranded_cars - car_ids) | stranded
 
     def spawn_car(self, start: Tuple[int, int], destination: Tuple[int, int]) -> bool:
         """
@@ -43,177 +276,688 @@ class TrafficFlowManager:
         if path is None:
             return False  # No path exists for this car, vehicle cannot spawn
 
-        # Create a new car and add it to the manager
-        car_id = f"spawned_{len(self.cars)}"
-        new_car = Car(car_id=car_id, start=start, destination=destination, path=path)
-        self.cars[car_id] = new_car
+        # Take a car from the pool and add it to the manager
+        self.add_car_to_simulation(self.acquire_car(start, destination, path))
         return True
 
     def update(self):
         """
         Updates all cars by moving them along their respective paths, considering traffic and directions.
+
+        Tiles are flat integer indices and directions small integer codes, both precomputed with
+        each route (see Route), so the blocking checks below are integer comparisons and lookups.
+        A car at path_index i stands on tiles[i - 1] (tiles[0] when i == 0) and its next step
+        heads in direction dirs[i].
+
+        By default every car is evaluated each tick (_update_all). With segment_queues, blocked
+        cars wait in the queue of whatever blocks them and only the cars that can move are
+        evaluated (_update_queues).
+
+        A tick is move_cars() followed by end_tick(); callers that exchange cars with other
+        regions (see nm_core.simulation.partition) admit and hand off cars in between.
         """
-        cars_to_remove = []
-        
-        # We need a snapshot of where cars are and where they want to go
-        # to make movement decisions without partial updates affecting other cars in the same step.
-        
-        # (position, next_position) -> car_id
-        # This represents the segment a car is CURRENTLY occupying.
-        current_segments = {}
+        self.move_cars()
+        self.end_tick()
+
+    def move_cars(self):
+        """
+        First part of a tick: re-routes the cars affected by road edits, then moves the cars.
+
+        Cars that finished their trip stay in self.cars until end_tick(). With a region set,
+        cars whose next tile lies outside it hold position and are listed in departures.
+        """
+        self._process_route_changes()
+        if self.segment_queues:
+            self._finished = self._update_queues()
+        else:
+            self._finished = self._update_all()
+        self._admission = None
+
+    def end_tick(self, handed_over: Iterable[int] = ()):
+        """
+        Last part of a tick: removes the cars that finished their trip and the ones handed
+        over to another region, then runs gridlock detection and the congestion refresh.
+
+        Args:
+            handed_over: Ids of departing cars another region admitted.
+        """
+        cars_to_remove, self._finished = self._finished, []
+        cars_to_remove.extend(handed_over)
+        self._finish_tick(cars_to_remove)
+
+    def admit_car(self, car_id: int, route, destination: Tuple[int, int], origin: Tuple[int, int],
+                  color_id: int, state: str) -> Optional[int]:
+        """
+        Lets a car coming from another region take its next step onto a tile of this one.
+
+        Call between move_cars() and end_tick(), in an order that does not depend on timing:
+        each car is checked against the occupancy left by the tick's moves and the cars
+        admitted before it, with the movement rules of the default engine.
+
+        Args:
+            car_id: Id of the car, kept across regions.
+            route: Remaining route, starting at the tile the car stands on.
+            destination: Destination of the trip.
+            origin: Location of the car's house.
+            color_id: Color of the car.
+            state: Trip state ('ToShoppingCenter' or 'ReturningHome').
+
+        Returns:
+            None if the car moved in, otherwise the id of the car that kept it out.
+        """
+        if self._admission is None:
+            self._admission = self._occupancy()
+        occupied_segments, tile_occupied_by = self._admission
+
+        car = self.acquire_car(route[0], destination, route, car_id)
+        car.reroute(route)
+        self._encode_route(car)
+        car.origin = origin
+        car.color_id = color_id
+        car.state = state
+        blocked = self._find_blocker(car, occupied_segments, tile_occupied_by, self.tile_claims)
+        if blocked is not None:
+            self._car_pool.append(car)
+            return blocked[0]
+
+        self.add_car_to_simulation(car)
+        self.tile_claims[car.path_tiles[car.path_index]] = car_id
+        self._advance(car)
+        if not car.active:
+            tile_occupied_by.pop(self._position_keys(car)[1], None)
+            self._handle_arrival(car, self._finished)
+        if car.active:
+            segment, tile = self._position_keys(car)
+            occupied_segments[segment] = car_id
+            tile_occupied_by[tile] = car_id
+        return None
+
+    def hold_car(self, car_id: int, blocker_id: Optional[int] = None):
+        """
+        Records a tick of waiting for a departing car that could not leave the region.
+
+        Args:
+            car_id: The departing car.
+            blocker_id: The car that kept it out of the other region; None if it was held
+                back for another reason (e.g. a full mailbox).
+        """
+        self._block(self.cars[car_id], car_id if blocker_id is None else blocker_id)
+
+    def _occupancy(self) -> Tuple[Dict[int, int], Dict[int, int]]:
+        """
+        Returns:
+            ({segment key: car_id}, {tile: car_id}) of the active cars.
+        """
+        occupied_segments = {}
+        tile_occupied_by = {}
         for car_id, car in self.cars.items():
             if car.active:
-                next_pos = car.get_next_position()
-                current_segments[(car.position, next_pos)] = car_id
+                segment, tile = self._position_keys(car)
+                occupied_segments[segment] = car_id
+                tile_occupied_by[tile] = car_id
+        return occupied_segments, tile_occupied_by
+
+    def _update_all(self) -> List[int]:
+        """
+        Evaluates every car against a snapshot of occupancy taken at the start of the tick.
+
+        Returns:
+            Ids of the cars that finished their trip.
+        """
+        # We need a snapshot of where cars are and where they want to go
+        # to make movement decisions without partial updates affecting other cars in the same step.
+
+        # Segment key (tile * SEGMENT_CODES + direction of the next step) -> car_id of the car
+        # CURRENTLY occupying it, and tile -> car_id of the car standing on it
+        occupied_segments, tile_occupied_by = self._occupancy()
 
         # To ensure fairness and avoid fixed-priority deadlocks, randomize processing order
-        import random
         car_ids = list(self.cars.keys())
         random.shuffle(car_ids)
 
-        # tile_claims: next_pos -> car_id (who is allowed to enter this tile this step)
+        # tile_claims: next tile -> car_id (who is allowed to enter this tile this step)
         tile_claims = {}
-        
-        # moved_cars: car_ids that have successfully moved this step
-        moved_cars = set()
-
-        # We might need multiple passes if a car moving frees up space for another car
-        # BUT in this simulation, if car A moves from tile 1 to tile 2, car B can move from tile 0 to tile 1
-        # in the SAME step. This is handled by checking if the TARGET segment is occupied.
-        # If car A is at (1,1) moving to (1,2), its current segment is ((1,1), (1,2)).
-        # If car B is at (1,0) moving to (1,1), its target segment is ((1,1), (1,2)).
-        # Wait, that's not right. 
-        # If car A moves, ((1,1), (1,2)) becomes its new current segment.
-        # Car B's target segment is ((1,1), (something)).
-        
-        # Let's simplify: 
-        # A car at `pos` moving to `next_pos` wants to occupy segment `(next_pos, next_next_pos)`.
-        # It is blocked if:
-        # 1. Someone is already in `(next_pos, next_next_pos)`.
-        # 2. Someone is at `next_pos` and NOT moving out in the same step (or moving opposite).
-        
-        # Actually, the sequential update with `occupied` mutation was almost correct for fluid movement, 
-        # but the order and the collision logic were flawed.
-        
-        # Let's use the current positions but be careful about intersections.
-        
-        occupied_segments = current_segments.copy()
-        tile_occupied_by = {car.position: car_id for car_id, car in self.cars.items() if car.active}
-
+        cars_to_remove = []
+        cars = self.cars
+        region = self.region
+        departures = self.departures = []
         for car_id in car_ids:
-            car = self.cars[car_id]
+            car = cars[car_id]
             if not car.active:
                 continue
+            if car_id in self.stranded_cars:
+                car.waiting = True
+                self.gridlock.clear_wait(car_id)
+                continue
 
-            next_pos = car.get_next_position()
-            if next_pos:
-                next_next_pos = None
-                if car.path_index + 1 < len(car.path):
-                    next_next_pos = car.path[car.path_index + 1]
-                
-                target_segment = (next_pos, next_next_pos)
-                my_dir = (next_pos[0] - car.position[0], next_pos[1] - car.position[1])
-                
-                is_blocked = False
-                
-                # 1. Segment occupancy (Queueing)
-                # If someone is in our target segment, we are blocked.
-                if target_segment in occupied_segments:
-                    is_blocked = True
-                
-                # 2. Tile occupancy (Intersection / Entry)
-                if not is_blocked and next_pos in tile_occupied_by:
-                    other_car_id = tile_occupied_by[next_pos]
-                    other_car = self.cars[other_car_id]
-                    other_next = other_car.get_next_position()
-                    
-                    if other_next is None:
-                        # They are at their destination
-                        is_blocked = True
-                    else:
-                        other_dir = (other_next[0] - next_pos[0], other_next[1] - next_pos[1])
-                        # Opposite check
-                        if my_dir != (-other_dir[0], -other_dir[1]):
-                            is_blocked = True
-                
-                # 3. Conflict with others wanting the same tile
-                if not is_blocked and next_pos in tile_claims:
-                    other_car_id = tile_claims[next_pos]
-                    other_car = self.cars[other_car_id]
-                    other_dir = (next_pos[0] - other_car.position[0], next_pos[1] - other_car.position[1])
-                    if my_dir != (-other_dir[0], -other_dir[1]):
-                        is_blocked = True
-
-                if not is_blocked:
-                    # SUCCESS! Move the car
-                    tile_claims[next_pos] = car_id
-                    
-                    # Update tracking
-                    old_pos = car.position
-                    old_segment = (old_pos, next_pos)
-                    
-                    if old_segment in occupied_segments:
-                        del occupied_segments[old_segment]
-                    if old_pos in tile_occupied_by:
-                        del tile_occupied_by[old_pos]
-                    
-                    car.move()
-                    car.waiting = False
-                    
-                    # New state
-                    new_next = car.get_next_position()
-                    occupied_segments[(car.position, new_next)] = car.car_id
-                    tile_occupied_by[car.position] = car.car_id
+            if car.path_index < len(car.path_tiles):
+                if region is not None and not region[car.path_tiles[car.path_index]]:
+                    departures.append(car_id)
+                    continue
+                blocked = self._find_blocker(car, occupied_segments, tile_occupied_by, tile_claims)
+                if blocked is None:
+                    # SUCCESS! Move the car and update tracking
+                    tile_claims[car.path_tiles[car.path_index]] = car_id
+                    segment, tile = self._position_keys(car)
+                    occupied_segments.pop(segment, None)
+                    tile_occupied_by.pop(tile, None)
+                    self._advance(car)
+                    segment, tile = self._position_keys(car)
+                    occupied_segments[segment] = car_id
+                    tile_occupied_by[tile] = car_id
                 else:
-                    car.waiting = True
+                    self._block(car, blocked[0])
             else:
                 # Car reached destination tile in its current path
-                # Despawn/State change handled below
-                car.move() # active=False
                 # Update tracking so someone can move into the tile we just vacated (if we were at destination)
-                # Wait, car.move() here sets car.active = False.
-                # We should probably clear it from tile_occupied_by if it was there.
-                if car.position in tile_occupied_by:
-                     del tile_occupied_by[car.position]
-            
-            # Post-move logic (Arrivals)
+                tile_occupied_by.pop(self._position_keys(car)[1], None)
+                car.move() # active=False
+
             if not car.active:
-                if car.state == "ToShoppingCenter":
-                    # Car arrived at shopping center, fulfill pin and return home
-                    for sc in self.shopping_centers:
-                        # Match location AND color
-                        if sc.location == car.destination and sc.color == car.color:
-                            if sc.fulfill_pin():
-                                # We can't easily return score here, but we can have a callback or just increment a counter in sc
-                                pass
-                            break
-                    
-                    # Set route back home
-                    home_path = self.road_network.find_path(car.position, car.origin)
-                    if home_path:
-                        car.set_route(home_path)
-                        car.destination = car.origin
-                        car.state = "ReturningHome"
-                        car.active = True
-                    else:
-                        # Cannot find path back home, just remove it (should not happen in good road network)
-                        cars_to_remove.append(car_id)
-                
-                elif car.state == "ReturningHome":
-                    # Car arrived back at house
-                    for house in self.houses:
-                        if house.location == car.position:
-                            house.return_car(car)
-                            break
-                    cars_to_remove.append(car_id)
+                self._handle_arrival(car, cars_to_remove)
+        self.tile_claims = tile_claims
+        return cars_to_remove
+
+    def _update_queues(self) -> List[int]:
+        """
+        Evaluates the cars in the order of _update_all, skipping the ones that sleep.
+
+        Cars are shuffled exactly like in _update_all, so both engines draw the same random
+        numbers and decide in the same order, against occupancy maps that change the same way.
+        A blocked car sleeps in the FIFOs of the segment and the tile it wants to enter and is
+        woken (in queue order) whenever either changes. Until then it would be blocked by the
+        same car again, so it is skipped at its turn; a car woken after its turn moves on the
+        next tick, as a car evaluated before the one ahead of it does. Skipped cars cost a
+        lookup, and their wait counters are added in bulk by _account_sleepers.
+
+        Returns:
+            Ids of the cars that finished their trip.
+        """
+        self._settle_keys()
+        for car_id in self._yielding:
+            self._wake(car_id)
+
+        occupied_segments = self._occupied_segments
+        tile_occupied_by = self._tile_occupied_by
+        # To ensure fairness and avoid fixed-priority deadlocks, randomize processing order
+        car_ids = list(self.cars.keys())
+        random.shuffle(car_ids)
+
+        tick = self._queue_tick = self._queue_tick + 1
+        tile_claims = {}
+        cars_to_remove = []
+        cars = self.cars
+        asleep = self._asleep
+        self.departures = []
+        self._running = True
+        for car_id in car_ids:
+            entry = asleep.get(car_id)
+            if entry is not None:
+                entry[5] = tick  # Slept through its turn
+                continue
+            car = cars[car_id]
+            if not car.active:
+                continue
+            if car_id in self.stranded_cars:
+                car.waiting = True
+                self.gridlock.clear_wait(car_id)
+                continue
+
+            if car.path_index < len(car.path_tiles):
+                blocked = self._find_blocker(car, occupied_segments, tile_occupied_by, tile_claims)
+                if blocked is None:
+                    tile_claims[car.path_tiles[car.path_index]] = car_id
+                    self._leave(car_id)
+                    self._advance(car)
+                    self._enter(car)
                 else:
-                    # Generic spawned car reached destination
-                    cars_to_remove.append(car_id)
+                    blocker_id, waiters, _ = blocked
+                    self._block(car, blocker_id)
+                    # Blocked by a claim made this tick (or by itself): try again next tick
+                    if waiters is not None and blocker_id != car_id:
+                        self._sleep(car)
+            else:
+                # Like _update_all, the tile frees up at once while the segment stays taken until the tick ends
+                self._drop_occupant(self._tile_occupied_by, self._tile_holders, self._tile_waiters,
+                                    self._dirty_tiles, self._car_keys[car_id][1], 1)
+                car.move() # active=False
+
+            if not car.active:
+                self._handle_arrival(car, cars_to_remove)
+                if car.active:
+                    self._rehold(car)  # Heading home on a new route
+        self._running = False
+        self.tile_claims = tile_claims
+        self._account_sleepers()
+        return cars_to_remove
+
+    @staticmethod
+    def _position_keys(car: Car) -> Tuple[int, int]:
+        """
+        Returns:
+            (segment key, tile) the car currently occupies.
+        """
+        pi = car.path_index
+        dirs = car.path_dirs
+        tile = car.path_tiles[pi - 1 if pi else 0]
+        return tile * SEGMENT_CODES + (dirs[pi] if pi < len(dirs) else END_OF_ROUTE), tile
+
+    def _find_blocker(self, car: Car, occupied_segments: Dict[int, int], tile_occupied_by: Dict[int, int],
+                      tile_claims: Dict[int, int]) -> Optional[Tuple[int, Optional[Dict], Optional[int]]]:
+        """
+        Decides whether a car with a next step on its path can take it.
+
+        A car moving from `pos` into `next_pos` wants to occupy segment `(next_pos, next_next_pos)`.
+        It is blocked if:
+        1. Someone is already in `(next_pos, next_next_pos)`.
+        2. Someone is at `next_pos` and NOT moving out in the same step (or moving opposite).
+        3. Someone else already entered `next_pos` this step.
+
+        Returns:
+            None if the car may move, otherwise (blocker_id, waiters, key): the car in the way
+            and the wait queues (segment or tile) plus the key a queued car waits under.
+            waiters is None for claims made this tick.
+        """
+        pi = car.path_index
+        dirs = car.path_dirs
+        next_tile = car.path_tiles[pi]
+        my_dir = dirs[pi]
+        target_segment = next_tile * SEGMENT_CODES + (dirs[pi + 1] if pi + 1 < len(dirs) else END_OF_ROUTE)
+
+        blocked = None
+        # 1. Segment occupancy (Queueing)
+        blocker_id = occupied_segments.get(target_segment)
+        if blocker_id is not None:
+            blocked = (blocker_id, self._segment_waiters, target_segment)
+        else:
+            # 2. Tile occupancy (Intersection / Entry)
+            other_car_id = tile_occupied_by.get(next_tile)
+            if other_car_id is not None:
+                other_car = self.cars[other_car_id]
+                other_pi = other_car.path_index
+                # Blocked if they are at their destination, unless they head straight towards us
+                # (only then can the two cars be swapped)
+                if (not other_car.active or other_pi >= len(other_car.path_dirs)
+                        or my_dir != OPPOSITE_DIRECTION[other_car.path_dirs[other_pi]]):
+                    blocked = (other_car_id, self._tile_waiters, next_tile)
+
+            # 3. Conflict with others wanting the same tile
+            # The claimant has already moved onto the tile, so it has no direction relative to it
+            if blocked is None and my_dir != NO_DIRECTION:
+                claimant = tile_claims.get(next_tile)
+                if claimant is not None:
+                    blocked = (claimant, None, None)
+
+        # Gridlock resolution: a yielding car squeezes past whatever blocks it
+        if blocked is not None and car.car_id in self._yielding:
+            return None
+        return blocked
+
+    def _advance(self, car: Car):
+        """Moves an unblocked car one step and updates the reverse index and counters."""
+        car_id = car.car_id
+        pi = car.path_index
+        my_dir = car.path_dirs[pi]
+        old_pos = car.position
+        car.move()
+        car.waiting = False
+        self.gridlock.clear_wait(car_id)
+        if my_dir != NO_DIRECTION:
+            self._unindex_edge((old_pos, car.position), car_id)
+            if self.analytics is not None:
+                tiles = car.path_tiles
+                self.analytics.record_move(tiles[pi - 1 if pi else 0] * SEGMENT_CODES + my_dir, tiles[pi])
+
+        new_pi = car.path_index
+        if self.congestion_routing and new_pi < len(car.path_dirs):
+            segment = (car.position, car.path[new_pi])
+            self._segment_load[segment] = self._segment_load.get(segment, 0.0) + CONGESTION_OCCUPANCY_WEIGHT
+
+    def _block(self, car: Car, blocker_id: int):
+        """Records one tick of a car held up by blocker_id."""
+        pi = car.path_index
+        car.waiting = True
+        if blocker_id != car.car_id:
+            self.gridlock.set_wait(car.car_id, blocker_id)
+        if self.analytics is not None:
+            self.analytics.record_wait(car.path_tiles[pi - 1 if pi else 0] * SEGMENT_CODES + car.path_dirs[pi])
+
+        if self.congestion_routing and car.path_dirs[pi] != NO_DIRECTION:
+            segment = (car.position, car.path[pi])
+            self._segment_load[segment] = (
+                self._segment_load.get(segment, 0.0) + CONGESTION_OCCUPANCY_WEIGHT + CONGESTION_WAIT_WEIGHT
+            )
+
+    def _handle_arrival(self, car: Car, cars_to_remove: List[int]):
+        """Post-move logic for a car that reached the end of its path."""
+        car_id = car.car_id
+        if car.state == "ToShoppingCenter":
+            # Car arrived at shopping center, fulfill pin and return home
+            # Match location AND color
+            sc = self.shopping_center_at.get((car.destination, car.color_id))
+            if sc is not None:
+                # The center counts fulfilled pins itself, which is where the score comes from
+                sc.fulfill_pin()
+
+            # Set route back home
+            home_path = self.road_network.find_path(car.position, car.origin)
+            if home_path:
+                car.set_route(home_path)
+                self._encode_route(car)
+                self._index_route(car)
+                car.destination = car.origin
+                car.state = "ReturningHome"
+                car.active = True
+            else:
+                # Cannot find path back home, just remove it (should not happen in good road network)
+                cars_to_remove.append(car_id)
 
-        # Remove inactive cars
+        elif car.state == "ReturningHome":
+            # Car arrived back at house
+            house = self.house_at.get(car.position)
+            if house is not None:
+                house.return_car(car)
+            cars_to_remove.append(car_id)
+        else:
+            # Generic spawned car reached destination
+            cars_to_remove.append(car_id)
+
+    def _finish_tick(self, cars_to_remove: List[int]):
+        """Removes finished cars, then runs gridlock detection and the congestion refresh."""
         for car_id in cars_to_remove:
             if car_id in self.cars:
-                del self.cars[car_id]
+                self._unindex_route(self.cars[car_id])
+                self.stranded_cars.discard(car_id)
+                self.gridlock.clear_wait(car_id)
+                if self.segment_queues:
+                    self._forget(car_id)
+                self._car_pool.append(self.cars.pop(car_id))
+
+        if self.analytics is not None:
+            self.analytics.flush()
+
+        cycles = self.gridlock.detect()
+        self._yielding = set()
+        if self.gridlock_policy == 'yield':
+            # Break each cycle deterministically at its lowest car id
+            self._yielding = {min(cycle) for cycle in cycles}
+
+        if self.congestion_routing:
+            self._ticks_since_refresh += 1
+            if self._ticks_since_refresh >= self.congestion_update_interval:
+                self._refresh_congestion()
+
+    def _hold(self, car_id: int, segment: int, tile: int):
+        """Records that a car stands on a segment and tile (segment-queue engine)."""
+        self._car_keys[car_id] = (segment, tile)
+        self._segment_holders.setdefault(segment, set()).add(car_id)
+        self._tile_holders.setdefault(tile, set()).add(car_id)
+
+    def _unhold(self, car_id: int) -> Optional[Tuple[int, int]]:
+        """Forgets where a car stands; returns its (segment key, tile), if it had any."""
+        keys = self._car_keys.pop(car_id, None)
+        if keys is None:
+            return None
+        for holders, key in ((self._segment_holders, keys[0]), (self._tile_holders, keys[1])):
+            cars = holders[key]
+            cars.discard(car_id)
+            if not cars:
+                del holders[key]
+        return keys
+
+    def _leave(self, car_id: int):
+        """Takes a moving car off its segment and tile the way _update_all does (whoever is registered there)."""
+        segment, tile = self._unhold(car_id)
+        self._drop_occupant(self._occupied_segments, self._segment_holders, self._segment_waiters,
+                            self._dirty_segments, segment, 0)
+        self._drop_occupant(self._tile_occupied_by, self._tile_holders, self._tile_waiters, self._dirty_tiles, tile, 1)
+
+    def _enter(self, car: Car):
+        """Registers a car that just moved on its new segment and tile."""
+        car_id = car.car_id
+        segment, tile = self._position_keys(car)
+        self._hold(car_id, segment, tile)
+        for occupants, holders, waiters, dirty, key, slot in (
+            (self._occupied_segments, self._segment_holders, self._segment_waiters, self._dirty_segments, segment, 0),
+            (self._tile_occupied_by, self._tile_holders, self._tile_waiters, self._dirty_tiles, tile, 1),
+        ):
+            occupants[key] = car_id
+            if len(holders[key]) > 1:
+                dirty.add(key)  # Shared with a car _update_all could not see; settled at the next tick start
+            self._wake_queue(waiters, key, slot)
+
+    def _drop_occupant(self, occupants: Dict[int, int], holders: Dict[int, Set[int]],
+                       waiters: Dict[int, Deque[int]], dirty: Set[int], key: int, slot: int):
+        occupants.pop(key, None)
+        if key in holders:
+            dirty.add(key)  # Someone still stands there and shows up again at the next tick start
+        self._wake_queue(waiters, key, slot)
+
+    def _rehold(self, car: Car):
+        """
+        Re-registers a car whose keys changed other than by a move (spawn, new route, arrival).
+
+        _update_all only notices such changes when it rebuilds its occupancy maps at the start
+        of the next tick, so the keys involved are settled then (see _settle_keys).
+        """
+        keys = self._unhold(car.car_id)
+        if keys is not None:
+            self._dirty_segments.add(keys[0])
+            self._dirty_tiles.add(keys[1])
+        segment, tile = self._position_keys(car)
+        self._hold(car.car_id, segment, tile)
+        self._dirty_segments.add(segment)
+        self._dirty_tiles.add(tile)
+
+    def _settle_keys(self):
+        """
+        Gives every key touched outside plain moves the occupant _update_all's rebuild would:
+        of the cars standing on it, the one added to self.cars last.
+        """
+        order = self._insertion.__getitem__
+        for occupants, holders, waiters, dirty, slot in (
+            (self._occupied_segments, self._segment_holders, self._segment_waiters, self._dirty_segments, 0),
+            (self._tile_occupied_by, self._tile_holders, self._tile_waiters, self._dirty_tiles, 1),
+        ):
+            for key in dirty:
+                cars = holders.get(key)
+                if cars:
+                    occupants[key] = max(cars, key=order)
+                else:
+                    occupants.pop(key, None)
+                self._wake_queue(waiters, key, slot)
+            dirty.clear()
+
+    def _sleep(self, car: Car):
+        """Parks a blocked car in the FIFOs of the segment and the tile it wants to enter."""
+        car_id = car.car_id
+        pi = car.path_index
+        dirs = car.path_dirs
+        next_tile = car.path_tiles[pi]
+        target_segment = next_tile * SEGMENT_CODES + (dirs[pi + 1] if pi + 1 < len(dirs) else END_OF_ROUTE)
+        tile = segment = -1
+        width, height = self.grid_size
+        x, y = car.position
+        if 0 <= x < width and 0 <= y < height:
+            tile = y * width + x
+            direction = dirs[pi]
+            if direction < len(DIRECTIONS):
+                segment = tile * len(DIRECTIONS) + direction
+        # [segment key, tile it waits for, flat tile, flat segment, counted in the bulk wait counters, last tick skipped]
+        self._asleep[car_id] = [target_segment, next_tile, tile, segment, False, 0]
+        for waiters, key in ((self._segment_waiters, target_segment), (self._tile_waiters, next_tile)):
+            queue = waiters.get(key)
+            if queue is None:
+                waiters[key] = deque((car_id,))
+            else:
+                queue.append(car_id)
+        self._new_sleepers.append(car_id)
+
+    def _wake(self, car_id: int):
+        """Makes a sleeping car eligible for evaluation again."""
+        entry = self._asleep.pop(car_id, None)
+        if entry is None or not entry[4]:
+            return
+        if self._running and entry[5] == self._queue_tick:
+            self._woken_late.append(entry)  # It slept through this tick, which still counts as waiting
+        else:
+            self._count_sleeper(entry, -1)
+
+    def _wake_queue(self, waiters: Dict[int, Deque[int]], key: int, slot: int):
+        """Wakes the cars queued under key, front first (slot: 0 for segment queues, 1 for tile queues)."""
+        queue = waiters.pop(key, None)
+        if not queue:
+            return
+        asleep = self._asleep
+        for car_id in queue:
+            # Cars woken for another reason may have left, or be queued elsewhere by now
+            entry = asleep.get(car_id)
+            if entry is not None and entry[slot] == key:
+                self._wake(car_id)
+
+    def _forget(self, car_id: int):
+        """Drops a car leaving the simulation from the segment-queue engine."""
+        self._wake(car_id)
+        keys = self._unhold(car_id)
+        if keys is not None:
+            self._dirty_segments.add(keys[0])
+            self._dirty_tiles.add(keys[1])
+        self._insertion.pop(car_id, None)
+
+    def _count_sleeper(self, entry: List, delta: int):
+        tile, segment = entry[2], entry[3]
+        if tile >= 0:
+            self._sleep_tiles[tile] += delta
+        if segment >= 0:
+            self._sleep_segments[segment] += delta
+        self._counted_sleepers += delta
+
+    def _account_sleepers(self):
+        """
+        Adds one tick of waiting for every car that slept through the tick.
+
+        Sleepers are kept as per-tile / per-segment counts, so the wait counters of analytics
+        and congestion routing are updated with a few array additions instead of per car.
+        Cars that went to sleep this tick were already counted by _block and join the
+        counts afterwards.
+        """
+        if self._counted_sleepers:
+            if self.analytics is not None:
+                self.analytics.record_waits(self._sleep_tiles, self._sleep_segments)
+            if self.congestion_routing:
+                self._sleep_load += self._sleep_segments
+        for entry in self._woken_late:
+            self._count_sleeper(entry, -1)
+        self._woken_late = []
+        for car_id in self._new_sleepers:
+            entry = self._asleep.get(car_id)
+            if entry is not None and not entry[4]:
+                entry[4] = True
+                self._count_sleeper(entry, 1)
+        self._new_sleepers = []
+
+    def _refresh_congestion(self):
+        """
+        Folds the load counted since the last refresh into smoothed edge costs,
+        then re-routes the next batch of cars against the new costs.
+        """
+        alpha = CONGESTION_SMOOTHING
+        ticks = self._ticks_since_refresh
+        if self.segment_queues and self._sleep_load.any():
+            self._add_sleeper_load()
+
+        penalties = {edge: value * (1.0 - alpha) for edge, value in self._smoothed_penalty.items()}
+        for edge, load in self._segment_load.items():
+            penalties[edge] = penalties.get(edge, 0.0) + alpha * load / ticks
+
+        # Drop negligible penalties so edges that emptied out stop being tracked
+        self._smoothed_penalty = {edge: value for edge, value in penalties.items() if value > 1e-3}
+        self._segment_load = {}
+        self._ticks_since_refresh = 0
+
+        self.road_network.apply_congestion(self._smoothed_penalty)
+        self._reroute_batch()
+
+    def _add_sleeper_load(self):
+        """Folds the car-ticks of sleeping cars (segment-queue engine) into the segment load."""
+        width = self.grid_size[0]
+        weight = CONGESTION_OCCUPANCY_WEIGHT + CONGESTION_WAIT_WEIGHT
+        for index in np.flatnonzero(self._sleep_load).tolist():
+            tile, direction = divmod(index, len(DIRECTIONS))
+            y, x = divmod(tile, width)
+            dx, dy = DIRECTIONS[direction]
+            segment = ((x, y), (x + dx, y + dy))
+            self._segment_load[segment] = self._segment_load.get(segment, 0.0) + weight * int(self._sleep_load[index])
+        self._sleep_load.fill(0)
+
+    def _reroute_batch(self):
+        """
+        Re-routes up to reroute_batch_size cars, cycling through the fleet across refreshes.
+        """
+        car_ids = list(self.cars)
+        if not car_ids:
+            return
+
+        start = self._reroute_cursor % len(car_ids)
+        batch = car_ids[start:start + self.reroute_batch_size]
+        self._reroute_cursor = start + len(batch)
+
+        # Only cars already on the road with tiles left to cover are re-routed
+        cars = [self.cars[car_id] for car_id in batch]
+        self._reroute([
+            car for car in cars
+            if car.active and 0 < car.path_index < len(car.path) and car.car_id not in self.stranded_cars
+        ])
+
+    def reset(self):
+        """
+        Clears all traffic state for a new episode.
+
+        Cars still on the road go back to the pool, and every index and counter is emptied in
+        place, so an episode restart allocates nothing new.
+        """
+        self._car_pool.extend(self.cars.values())
+        self.cars.clear()
+        self.houses.clear()
+        self.shopping_centers.clear()
+        self.house_at.clear()
+        self.shopping_center_at.clear()
+        self.houses_by_color.clear()
+        self._segment_load = {}
+        self._smoothed_penalty = {}
+        self._ticks_since_refresh = 0
+        self._reroute_cursor = 0
+        self.edge_index.clear()
+        self._pending_reroute = set()
+        self.stranded_cars = set()
+        self._retry_stranded = False
+        self.newly_stranded = []
+        self.gridlock.reset()
+        self._yielding = set()
+        if self.analytics is not None:
+            self.analytics.reset()
+        self._occupied_segments.clear()
+        self._tile_occupied_by.clear()
+        self._car_keys.clear()
+        self._segment_holders.clear()
+        self._tile_holders.clear()
+        self._dirty_segments.clear()
+        self._dirty_tiles.clear()
+        self._insertion.clear()
+        self._insertions = 0
+        self._asleep.clear()
+        self._segment_waiters.clear()
+        self._tile_waiters.clear()
+        self._woken_late = []
+        self._new_sleepers = []
+        self._counted_sleepers = 0
+        self._sleep_tiles.fill(0)
+        self._sleep_segments.fill(0)
+        self._sleep_load.fill(0)
+        self.departures = []
+        self.tile_claims = {}
+        self._finished = []
+        self._admission = None
 
     def get_cars(self) -> List[Dict]:
         """
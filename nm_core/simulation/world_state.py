@@ -1,4 +1,4 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 import numpy as np
 
@@ -10,7 +10,8 @@ class WorldState:
                  destinations: List[Dict],
                  score: int,
                  time_elapsed: float,
-                 is_game_over: bool):
+                 is_game_over: bool,
+                 traffic_heatmaps: Optional[Dict[str, np.ndarray]] = None):
         """
         Args:
             map_data: 2D NumPy array representing the tile grid for the map.
@@ -19,10 +20,12 @@ class WorldState:
             score: Current game score.
             time_elapsed: Elapsed time in the game simulation.
             is_game_over: Boolean indicating if the game has ended.
+            traffic_heatmaps: Optional live per-tile traffic counters (see TrafficAnalytics).
         """
         self.map_data = map_data
         self.cars = cars
         self.destinations = destinations
         self.score = score
         self.time_elapsed = time_elapsed
-        self.is_game_over = is_game_over
\ No newline at end of file
+        self.is_game_over = is_game_over
+        self.traffic_heatmaps = traffic_heatmaps
\ No newline at end of file
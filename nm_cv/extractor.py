@@ -0,0 +1,262 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from nm_common.constants import COLOR_MAP, COLOR_NAMES, DIRECTIONS, GRID_SIZE, MAX_PINS_LIMIT
+from nm_core.simulation.map import CELL_DTYPE, HOUSE, NO_BUILDING, SHOPPING_CENTER
+from nm_core.simulation.world_state import WorldState
+
+# Pixel classes of the palette lookup table
+UNKNOWN = 0
+BACKGROUND = 1
+ROAD = 2
+WHITE = 3
+COLOR_CLASS = 4  # COLOR_CLASS + color id: building / car color
+DARK_CLASS = COLOR_CLASS + len(COLOR_NAMES)  # DARK_CLASS + color id: color of a waiting car
+GRID_LINE_COLOR = (210, 210, 200)
+
+_LUT_BITS = 5  # Bits kept per channel when indexing the lookup table
+
+
+def build_palette_lut(palette: Dict[str, Tuple[int, int, int]] = COLOR_MAP, tolerance: float = 24.0) -> np.ndarray:
+    """
+    Builds a lookup table from quantized RGB to pixel class.
+
+    Every cell of the quantized color cube gets the class of the nearest palette color,
+    or UNKNOWN if none lies within `tolerance`, so classifying a frame is one table lookup
+    per pixel.
+
+    Args:
+        palette: Color names to RGB, with the keys of COLOR_MAP.
+        tolerance: Largest RGB distance from a palette color.
+
+    Returns:
+        uint8 array of 2 ** (3 * 5) classes, indexed by (r >> 3) << 10 | (g >> 3) << 5 | b >> 3.
+    """
+    colors = [(palette["bg"], BACKGROUND), (GRID_LINE_COLOR, BACKGROUND),
+              (palette["gray"], ROAD), (palette["white"], WHITE)]
+    for color_id, name in enumerate(COLOR_NAMES):
+        rgb = palette[name]
+        colors.append((rgb, COLOR_CLASS + color_id))
+        colors.append((tuple(max(0, c - 50) for c in rgb), DARK_CLASS + color_id))  # See draw_world
+    rgbs = np.array([rgb for rgb, _ in colors], dtype=np.float64)
+    classes = np.array([label for _, label in colors], dtype=np.uint8)
+
+    levels = (np.arange(1 << _LUT_BITS) << (8 - _LUT_BITS)) + (1 << (7 - _LUT_BITS))  # Cell centers
+    cube = np.stack(np.meshgrid(levels, levels, levels, indexing='ij'), axis=-1).reshape(-1, 1, 3)
+    distances = np.sqrt(((cube - rgbs) ** 2).sum(axis=-1))
+    nearest = distances.argmin(axis=1)
+    lut = classes[nearest]
+    lut[distances[np.arange(len(nearest)), nearest] > tolerance] = UNKNOWN
+    return lut
+
+
+def label_components(mask: np.ndarray) -> Tuple[int, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Labels the 4-connected components of a boolean image.
+
+    Works on horizontal runs instead of pixels: runs are found with one diff per row,
+    runs overlapping in consecutive rows are linked, and the links are merged by min-label
+    propagation with pointer jumping, all in NumPy.
+
+    Args:
+        mask: (height, width) boolean image.
+
+    Returns:
+        (count, run_labels, run_rows, run_starts, run_ends): number of components and, for
+        each run, its component label (0..count - 1), row and [start, end) columns.
+    """
+    height, width = mask.shape
+    padded = np.zeros((height, width + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    start_rows, starts = np.nonzero(edges == 1)
+    end_rows, ends = np.nonzero(edges == -1)  # Both come out sorted by row, then column
+    if not len(starts):
+        return 0, starts, start_rows, starts, ends
+
+    # Runs of row r + 1 overlap the contiguous range of runs of row r found by binary search
+    stride = width + 1
+    start_keys = start_rows * stride + starts
+    end_keys = start_rows * stride + ends
+    first = np.searchsorted(end_keys, (start_rows - 1) * stride + starts, side='right')
+    last = np.searchsorted(start_keys, (start_rows - 1) * stride + ends, side='left')
+    counts = np.maximum(last - first, 0)
+    below = np.repeat(np.arange(len(starts)), counts)
+    above = np.repeat(first, counts) + (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts))
+
+    labels = np.arange(len(starts))
+    while True:
+        linked = np.minimum(labels[below], labels[above])
+        updated = labels.copy()
+        np.minimum.at(updated, below, linked)
+        np.minimum.at(updated, above, linked)
+        updated = updated[updated]
+        if np.array_equal(updated, labels):
+            break
+        labels = updated
+    roots, labels = np.unique(labels, return_inverse=True)
+    return len(roots), labels, start_rows, starts, ends
+
+
+class FrameExtractor:
+    def __init__(self, width: int, height: int, tile_size: int = GRID_SIZE,
+                 palette: Dict[str, Tuple[int, int, int]] = COLOR_MAP):
+        """
+        Recovers a WorldState from RGB frames drawn like nm_clone.renderer.draw_world.
+
+        Each frame is classified with a palette lookup table, then decoded per tile by
+        sampling grid-aligned probe pixels (buildings, roads, pins), and cars are found as
+        connected components of car colored pixels. There are no per-pixel Python loops.
+
+        Recovered: tile types (road / building), undirected road segments, building kind
+        and color, pins per shopping center, and cars with their color, waiting state and
+        heading. Frames show neither road direction nor cars inside building tiles (they are
+        drawn over a building of the same color), and score and time are not read.
+
+        Args:
+            width: Width of the map in tiles.
+            height: Height of the map in tiles.
+            tile_size: Pixels per tile of the frames.
+            palette: Color names to RGB, with the keys of COLOR_MAP.
+        """
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        self.lut = build_palette_lut(palette)
+        # Last extraction, laid out like GameMap.cells
+        self.cells = np.zeros((height, width), dtype=CELL_DTYPE)
+
+        def scaled(size):
+            return max(1, round(size * tile_size / GRID_SIZE))
+
+        half = tile_size // 2
+        self._corner_probe = tile_size - scaled(2)  # Inside a shopping center, clear of pins, houses and roads
+        self._house_probe = tile_size - scaled(4) - scaled(3)  # Inside a house, clear of its text and cars
+        self._road_reach = half - scaled(2)  # From the tile center towards each neighbour
+        car_size = scaled(10)
+        self._car_offset = scaled(6)
+        self._car_center = half - car_size // 2 + (car_size - 1) / 2  # Of a car without offset, within its tile
+        self._min_car_area = max(1, (car_size // 2) ** 2)
+        pin_spacing, pin_offset = scaled(10), scaled(5)
+        self._pin_probes = np.array([((i // 3) * pin_spacing + pin_offset, (i % 3) * pin_spacing + pin_offset)
+                                     for i in range(MAX_PINS_LIMIT)])
+
+        ys, xs = np.mgrid[0:height, 0:width] * tile_size + half
+        self._road_probe_ys = np.stack([ys + dy * self._road_reach for _, dy in DIRECTIONS], axis=-1)
+        self._road_probe_xs = np.stack([xs + dx * self._road_reach for dx, _ in DIRECTIONS], axis=-1)
+
+    def classify(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Args:
+            frame: (rows, columns, 3) uint8 RGB image (any strides, e.g. a surfarray view).
+
+        Returns:
+            (rows, columns) uint8 pixel classes.
+        """
+        shift = 8 - _LUT_BITS
+        index = (frame[..., 0] >> shift).astype(np.uint16) << (2 * _LUT_BITS)
+        index |= (frame[..., 1] >> shift).astype(np.uint16) << _LUT_BITS
+        index |= frame[..., 2] >> shift
+        return self.lut[index]
+
+    def extract(self, frame: np.ndarray) -> WorldState:
+        """
+        Decodes one frame.
+
+        Args:
+            frame: (rows, columns, 3) uint8 RGB image with the map in its top-left corner.
+
+        Returns:
+            WorldState with map_data set to the tile layer of `cells` (a live view).
+        """
+        t = self.tile_size
+        classes = self.classify(frame[:self.height * t, :self.width * t])
+        tiles = classes.reshape(self.height, t, self.width, t)
+        cells = self.cells
+        cells.fill(0)
+
+        # Buildings: shopping centers fill their corners, houses are inset squares
+        corner = tiles[:, self._corner_probe, :, self._corner_probe]
+        inner = tiles[:, self._house_probe, :, self._house_probe]
+        is_center = (corner >= COLOR_CLASS) & (corner < DARK_CLASS)
+        is_house = ~is_center & (inner >= COLOR_CLASS) & (inner < DARK_CLASS)
+        kind = cells['kind']
+        kind[is_house] = HOUSE
+        kind[is_center] = SHOPPING_CENTER
+        cells['color'] = np.where(is_center, corner, np.where(is_house, inner, COLOR_CLASS)) - COLOR_CLASS
+        buildings = kind != NO_BUILDING
+        cells['building'][is_house] = np.arange(1, is_house.sum() + 1)
+        cells['building'][is_center] = np.arange(1, is_center.sum() + 1)
+
+        # Roads: a segment shows as road pixels on the way from either tile center to the other
+        seen = classes[self._road_probe_ys.clip(0, classes.shape[0] - 1),
+                       self._road_probe_xs.clip(0, classes.shape[1] - 1)] == ROAD
+        roads = np.zeros((self.height, self.width, len(DIRECTIONS)), dtype=bool)
+        for d, (dx, dy) in enumerate(DIRECTIONS):
+            opposite = (d + 2) % len(DIRECTIONS)
+            ys = slice(max(0, -dy), self.height - max(0, dy))
+            xs = slice(max(0, -dx), self.width - max(0, dx))
+            neighbour_ys = slice(max(0, dy), self.height + min(0, dy))
+            neighbour_xs = slice(max(0, dx), self.width + min(0, dx))
+            roads[ys, xs, d] = seen[ys, xs, d] | seen[neighbour_ys, neighbour_xs, opposite]
+        cells['roads'] = (roads * (1 << np.arange(len(DIRECTIONS)))).sum(axis=-1)
+        cells['tile'][roads.any(axis=-1)] = 1
+        cells['tile'][buildings] = 2
+
+        # Pins: white dots at fixed spots of each shopping center
+        center_ys, center_xs = np.nonzero(is_center)
+        pin_pixels = classes[center_ys[:, None] * t + self._pin_probes[:, 0], center_xs[:, None] * t + self._pin_probes[:, 1]]
+        pins = (pin_pixels == WHITE).sum(axis=1)
+        destinations = [
+            {'id': i, 'location': (x, y), 'pins': count}
+            for i, (x, y, count) in enumerate(zip(center_xs.tolist(), center_ys.tolist(), pins.tolist()))
+        ]
+
+        return WorldState(
+            map_data=cells['tile'],
+            cars=self._extract_cars(classes, tiles, buildings),
+            destinations=destinations,
+            score=0,
+            time_elapsed=0.0,
+            is_game_over=False,
+        )
+
+    def _extract_cars(self, classes: np.ndarray, tiles: np.ndarray, buildings: np.ndarray) -> List[Dict]:
+        """Finds cars as connected components of car colored pixels outside building tiles."""
+        t = self.tile_size
+        colored = tiles >= COLOR_CLASS
+        colored &= ~buildings[:, None, :, None]
+        count, labels, rows, starts, ends = label_components(colored.reshape(classes.shape))
+        if not count:
+            return []
+
+        # Per-component area, centroid and color, accumulated over runs
+        lengths = (ends - starts).astype(np.float64)
+        area = np.bincount(labels, lengths, minlength=count)
+        mean_x = np.bincount(labels, lengths * (starts + ends - 1) / 2.0, minlength=count) / area
+        mean_y = np.bincount(labels, lengths * rows, minlength=count) / area
+        run_class = classes[rows, starts].astype(np.int64)
+        dark = np.bincount(labels, lengths * (run_class >= DARK_CLASS), minlength=count) > area / 2
+        color_ids = np.zeros(count, dtype=np.int64)
+        color_ids[labels] = (run_class - COLOR_CLASS) % len(COLOR_NAMES)
+
+        cars = []
+        for car_id, component in enumerate(np.flatnonzero(area >= self._min_car_area).tolist()):
+            x, y = int(mean_x[component] // t), int(mean_y[component] // t)
+            # Cars drive offset to the right of their heading (dx, dy): offset = (-dy, dx) * car_offset
+            offset_x = (mean_x[component] - (x * t + self._car_center)) / self._car_offset
+            offset_y = (mean_y[component] - (y * t + self._car_center)) / self._car_offset
+            dx, dy = int(round(offset_y)), int(round(-offset_x))
+            heading = (dx, dy) if abs(dx) + abs(dy) == 1 else None
+            cars.append({
+                'car_id': car_id,
+                'position': (x, y),
+                'previous_position': None,
+                'next_position': (x + dx, y + dy) if heading else None,
+                'destination': None,
+                'active': True,
+                'color': COLOR_NAMES[color_ids[component]],
+                'waiting': bool(dark[component]),
+            })
+        return cars
@@ -0,0 +1,203 @@
+import asyncio
+import multiprocessing
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+class AsyncEnvironment(ABC):
+    """
+    Asynchronous counterpart of nm_common.interface.Environment.
+
+    The agent awaits reset/step while the simulation runs elsewhere (an executor or a worker
+    process), so one inference process can keep many simulations busy.
+    """
+
+    @abstractmethod
+    async def reset(self) -> Any:
+        """Resets the environment and returns the initial observation."""
+        pass
+
+    @abstractmethod
+    async def step(self, action: Any) -> Tuple[Any, float, bool, Dict]:
+        """Executes an action and returns (observation, reward, done, info)."""
+        pass
+
+    async def close(self):
+        """Releases the resources behind the environment."""
+        pass
+
+
+class ExecutorEnvironment(AsyncEnvironment):
+    def __init__(self, env: Any, executor: Optional[Executor] = None):
+        """
+        Runs a synchronous environment's reset/step in a thread executor.
+
+        The calls run on the executor's threads, so they only run in parallel with other work
+        if the environment releases the GIL (the Python simulation does not). To simulate on
+        another core, use SubprocessEnvironment. Calls on one environment are serialized.
+
+        Args:
+            env: Object with reset() and step(action) methods.
+            executor: Thread executor to run the calls in. None uses the event loop's default executor.
+
+        Raises:
+            ValueError: If executor is a process pool, which would pickle the environment on
+                every call and lose its state.
+        """
+        if isinstance(executor, ProcessPoolExecutor):
+            raise ValueError("ExecutorEnvironment needs a thread executor; use SubprocessEnvironment for processes")
+        self.env = env
+        self.executor = executor
+        self._lock = asyncio.Lock()
+
+    async def _call(self, method: Callable, *args):
+        async with self._lock:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, method, *args)
+
+    async def reset(self) -> Any:
+        return await self._call(self.env.reset)
+
+    async def step(self, action: Any) -> Tuple[Any, float, bool, Dict]:
+        return await self._call(self.env.step, action)
+
+
+def _worker(conn, env_factory: Callable[[], Any], observe: Optional[Callable[[Any], Any]]):
+    """Subprocess loop: owns one environment and serves (command, argument) requests in order."""
+    env = env_factory()
+    while True:
+        try:
+            command, argument = conn.recv()
+        except EOFError:
+            break
+        try:
+            if command == 'step':
+                observation, reward, done, info = env.step(argument)
+                if observe is not None:
+                    observation = observe(observation)
+                result = (observation, reward, done, info)
+            elif command == 'reset':
+                result = env.reset()
+                if observe is not None:
+                    result = observe(result)
+            elif command == 'call':
+                name, args = argument
+                result = getattr(env, name)(*args)
+            elif command == 'close':
+                conn.send(('ok', None))
+                break
+            else:
+                raise ValueError(f"Unknown command: {command}")
+            conn.send(('ok', result))
+        except Exception as error:  # Report instead of killing the worker
+            conn.send(('error', error))
+    conn.close()
+
+
+class SubprocessEnvironment(AsyncEnvironment):
+    def __init__(self, env_factory: Callable[[], Any], observe: Optional[Callable[[Any], Any]] = None,
+                 context: Optional[str] = None):
+        """
+        Runs a synchronous environment in its own process.
+
+        Requests are pipelined: step_send() returns immediately and the worker starts simulating,
+        then step_recv() collects the result. Observation preparation (e.g. tensor encoding)
+        happens in the worker through `observe`, so it overlaps with the agent's inference too.
+
+        Args:
+            env_factory: Picklable callable building the environment inside the worker.
+            observe: Optional picklable callable applied to every observation in the worker.
+            context: multiprocessing start method ('fork', 'spawn', ...). None uses the default.
+        """
+        ctx = multiprocessing.get_context(context)
+        self._conn, child_conn = ctx.Pipe()
+        self._process = ctx.Process(target=_worker, args=(child_conn, env_factory, observe), daemon=True)
+        self._process.start()
+        child_conn.close()
+        self._pending = 0  # Requests sent whose replies were not received yet
+        self._lock = asyncio.Lock()
+
+    def _send(self, command: str, argument: Any = None):
+        self._conn.send((command, argument))
+        self._pending += 1
+
+    async def _recv(self) -> Any:
+        async with self._lock:
+            if not self._conn.poll():
+                await self._wait_readable()
+            status, payload = self._conn.recv()
+            self._pending -= 1
+        if status == 'error':
+            raise payload
+        return payload
+
+    async def _wait_readable(self):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def on_readable():
+            if not future.done():
+                future.set_result(None)
+
+        fd = self._conn.fileno()
+        try:
+            loop.add_reader(fd, on_readable)
+        except NotImplementedError:
+            # Event loops without reader support (e.g. Windows proactor): block in a thread instead
+            await loop.run_in_executor(None, self._conn.poll, None)
+            return
+        try:
+            await future
+        finally:
+            loop.remove_reader(fd)
+
+    def step_send(self, action: Any):
+        """Starts a step in the worker without waiting for it."""
+        self._send('step', action)
+
+    async def step_recv(self) -> Tuple[Any, float, bool, Dict]:
+        """Waits for the oldest outstanding step_send."""
+        return await self._recv()
+
+    async def reset(self) -> Any:
+        self._send('reset')
+        return await self._recv()
+
+    async def step(self, action: Any) -> Tuple[Any, float, bool, Dict]:
+        self.step_send(action)
+        return await self.step_recv()
+
+    async def call(self, name: str, *args) -> Any:
+        """Calls any other method of the environment in the worker."""
+        self._send('call', (name, args))
+        return await self._recv()
+
+    async def close(self):
+        if self._process.is_alive():
+            while self._pending:
+                await self._recv()
+            self._send('close')
+            await self._recv()
+        self._conn.close()
+        self._process.join(timeout=5)
+
+
+async def reset_all(envs: Sequence[AsyncEnvironment]) -> List[Any]:
+    """Resets many environments concurrently."""
+    return await asyncio.gather(*(env.reset() for env in envs))
+
+
+async def step_all(envs: Sequence[AsyncEnvironment], actions: Sequence[Any]) -> List[Tuple[Any, float, bool, Dict]]:
+    """
+    Steps many environments concurrently and returns their results in order.
+
+    Subprocess environments get all their actions sent before any result is awaited,
+    so every worker simulates in parallel.
+    """
+    for env, action in zip(envs, actions):
+        if isinstance(env, SubprocessEnvironment):
+            env.step_send(action)
+    return await asyncio.gather(*(
+        env.step_recv() if isinstance(env, SubprocessEnvironment) else env.step(action)
+        for env, action in zip(envs, actions)
+    ))
@@ -0,0 +1,227 @@
+import json
+import os
+import queue
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+COLUMNS = ('observation', 'action', 'reward', 'done')
+INDEX_FILE = 'index.json'
+
+
+class TrajectoryWriter:
+    def __init__(self, directory: str, shard_size: int = 65536, background: bool = True):
+        """
+        Streams transitions into columnar .npy shards plus a JSON index.
+
+        Transitions are copied into preallocated shard buffers. A full shard is handed to a
+        flusher thread that writes one .npy file per column and then rewrites the index, so
+        the index only ever lists complete shards and can be read while writing goes on.
+        Two sets of buffers alternate, so collection stalls only if the disk falls behind
+        by more than a shard.
+
+        Column shapes and dtypes come from the first transition. Actions must have a fixed
+        shape, e.g. flat action indices (see NeuroMotorwaysEnv.encode_index) or padded rows.
+
+        Args:
+            directory: Output directory (created if missing).
+            shard_size: Transitions per shard.
+            background: If False, shards are written synchronously (for debugging).
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.shard_size = shard_size
+        self.shards: List[Dict] = []  # Index entries of the shards written so far
+        self.count = 0  # Transitions added
+        self._columns: Optional[Dict[str, Dict]] = None
+        self._buffers: Optional[Dict[str, np.ndarray]] = None
+        self._fill = 0
+        self._spare: "queue.Queue[Dict[str, np.ndarray]]" = queue.Queue()
+        self._pending: "queue.Queue[Optional[Tuple[int, Dict[str, np.ndarray], int]]]" = queue.Queue(maxsize=1)
+        self._error: Optional[BaseException] = None
+        self._thread = None
+        if background:
+            self._thread = threading.Thread(target=self._flush_loop, daemon=True)
+            self._thread.start()
+
+    def add(self, observation, action, reward: float, done: bool):
+        """
+        Appends one transition.
+
+        Args:
+            observation: Observation the action was taken in (copied).
+            action: Action taken.
+            reward: Reward received.
+            done: Whether the episode ended with this transition.
+        """
+        if self._buffers is None:
+            self._start(observation, action)
+        fill = self._fill
+        buffers = self._buffers
+        buffers['observation'][fill] = observation
+        buffers['action'][fill] = action
+        buffers['reward'][fill] = reward
+        buffers['done'][fill] = done
+        self._fill = fill + 1
+        self.count += 1
+        if self._fill == self.shard_size:
+            self._submit()
+
+    def _start(self, observation, action):
+        observation, action = np.asarray(observation), np.asarray(action)
+        self._columns = {
+            'observation': {'shape': list(observation.shape), 'dtype': observation.dtype.str},
+            'action': {'shape': list(action.shape), 'dtype': action.dtype.str},
+            'reward': {'shape': [], 'dtype': np.dtype(np.float32).str},
+            'done': {'shape': [], 'dtype': np.dtype(bool).str},
+        }
+        self._buffers = self._allocate()
+        self._spare.put(self._allocate())
+
+    def _allocate(self) -> Dict[str, np.ndarray]:
+        return {name: np.empty((self.shard_size, *spec['shape']), dtype=spec['dtype'])
+                for name, spec in self._columns.items()}
+
+    def _submit(self):
+        """Hands the filled buffers to the flusher and continues in the spare set."""
+        self._raise_flush_error()
+        job = (len(self.shards), self._buffers, self._fill)
+        self.shards.append({'name': f'shard_{job[0]:05d}', 'length': self._fill})
+        if self._thread is None:
+            self._write(*job)
+            self._spare.put(job[1])
+        else:
+            self._pending.put(job)
+        self._buffers = self._spare.get()
+        self._fill = 0
+
+    def _flush_loop(self):
+        while True:
+            job = self._pending.get()
+            if job is None:
+                break
+            try:
+                self._write(*job)
+            except BaseException as error:  # Surfaced by the next add() or close()
+                self._error = error
+            self._spare.put(job[1])
+
+    def _write(self, shard: int, buffers: Dict[str, np.ndarray], length: int):
+        name = f'shard_{shard:05d}'
+        for column, buffer in buffers.items():
+            np.save(os.path.join(self.directory, f'{name}_{column}.npy'), buffer[:length])
+        self._write_index(self.shards[:shard + 1])
+
+    def _write_index(self, shards: List[Dict]):
+        index = {'columns': self._columns or {}, 'shards': shards, 'count': sum(shard['length'] for shard in shards)}
+        path = os.path.join(self.directory, INDEX_FILE)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(index, f, indent=1)
+        os.replace(path + '.tmp', path)  # Readers never see a partial index
+
+    def _raise_flush_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def close(self):
+        """Writes the last partial shard and waits for the flusher; an empty writer still leaves an index."""
+        if self._buffers is not None and self._fill:
+            self._submit()
+        if self._thread is not None:
+            self._pending.put(None)
+            self._thread.join()
+            self._thread = None
+        self._raise_flush_error()
+        if not self.shards:
+            self._write_index([])
+
+    def __enter__(self) -> "TrajectoryWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class TrajectoryDataset:
+    def __init__(self, directory: str):
+        """
+        Random access over the shards of a TrajectoryWriter, memory-mapped.
+
+        Nothing is loaded up front: every column of every shard is an np.memmap, and a
+        minibatch only touches the pages of the rows it gathers, so datasets can be far
+        larger than RAM.
+
+        Args:
+            directory: Directory written by TrajectoryWriter.
+        """
+        with open(os.path.join(directory, INDEX_FILE)) as f:
+            index = json.load(f)
+        self.directory = directory
+        self.columns: Dict[str, Dict] = index['columns']
+        self.shards: List[Dict[str, np.ndarray]] = [
+            {column: np.load(os.path.join(directory, f"{shard['name']}_{column}.npy"), mmap_mode='r')
+             for column in self.columns}
+            for shard in index['shards']
+        ]
+        lengths = [shard['length'] for shard in index['shards']]
+        self.offsets = np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)])  # First row of each shard
+
+    def __len__(self) -> int:
+        return int(self.offsets[-1])
+
+    def get(self, indices, columns=COLUMNS) -> Dict[str, np.ndarray]:
+        """
+        Gathers rows by global index.
+
+        Rows are read shard by shard in ascending order, so each shard's pages are visited once.
+
+        Args:
+            indices: Integer array of row indices.
+            columns: Columns to gather.
+
+        Returns:
+            {column: array of len(indices) rows}, in the order of `indices`.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        if len(indices) and (indices.min() < 0 or indices.max() >= len(self)):
+            raise IndexError("Transition index out of range")
+        order = np.argsort(indices, kind='stable')
+        ordered = indices[order]
+        shard_of = np.searchsorted(self.offsets, ordered, side='right') - 1
+        bounds = np.searchsorted(shard_of, np.arange(len(self.shards) + 1))
+
+        batch = {}
+        for column in columns:
+            spec = self.columns[column]
+            out = np.empty((len(indices), *spec['shape']), dtype=spec['dtype'])
+            for shard, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+                if start < end:
+                    out[order[start:end]] = self.shards[shard][column][ordered[start:end] - self.offsets[shard]]
+            batch[column] = out
+        return batch
+
+    def sample(self, batch_size: int, rng: Optional[np.random.Generator] = None,
+               next_observations: bool = False) -> Dict[str, np.ndarray]:
+        """
+        Draws a uniform random minibatch of transitions.
+
+        Args:
+            batch_size: Transitions to draw (with replacement).
+            rng: Random generator, None for a fresh default one.
+            next_observations: Also gather 'next_observation', the following row's observation.
+                The last row is then never drawn, and the value is meaningless where done is set.
+
+        Returns:
+            {column: array}.
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        high = len(self) - 1 if next_observations else len(self)
+        if high <= 0:
+            raise ValueError("Not enough transitions to sample from")
+        indices = rng.integers(0, high, batch_size)
+        batch = self.get(indices)
+        if next_observations:
+            batch['next_observation'] = self.get(indices + 1, ('observation',))['observation']
+        return batch
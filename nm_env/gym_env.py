@@ -0,0 +1,255 @@
+import random
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+
+from nm_clone.game import MiniMotorwaysGame
+from nm_common.actions import Action, decode_action, ACTION_OPS
+from nm_common.constants import DIRECTIONS, GRID_SIZE, SCREEN_HEIGHT, SCREEN_WIDTH, Color
+from nm_common.interface import Environment
+from nm_core.simulation.map import HOUSE, NO_BUILDING, SHOPPING_CENTER
+from nm_core.simulation.world_state import WorldState
+
+# Planes of the tensor observation, in channel order
+OBSERVATION_CHANNELS = (
+    'roads',            # Outgoing road segments of the tile / 4
+    'houses',           # 1 on house tiles
+    'shopping_centers', # 1 on shopping center tiles
+    'building_color',   # (color + 1) / number of colors on building tiles
+    'pins',             # Pending pins / pin limit on shopping center tiles
+    'cars',             # 1 on tiles holding a car
+    'waiting_cars',     # 1 on tiles holding a blocked car
+)
+
+# Value of the roads plane for each road bitmask of GameMap.cells
+_ROAD_DEGREE = np.array([bin(bits).count('1') / len(DIRECTIONS) for bits in range(256)], dtype=np.float32)
+
+# Road actions in the flat action space: index 0 is a no-op, then (op, y, x, direction) in C order
+ACTION_TYPES = tuple(ACTION_OPS)
+
+
+class NeuroMotorwaysEnv(Environment):
+    def __init__(self, width: int = SCREEN_WIDTH // GRID_SIZE, height: int = SCREEN_HEIGHT // GRID_SIZE,
+                 difficulty: str = 'medium', ticks_per_step: int = 1, max_steps: Optional[int] = None,
+                 tensor_observations: bool = False, scenario=None, render_tile_size: int = 4):
+        """
+        Environment adapter over MiniMotorwaysGame for RL training.
+
+        The game is built once; reset() clears it in place. Observations are either WorldState
+        objects (the Environment contract) or a preallocated float32 tensor of shape
+        (len(OBSERVATION_CHANNELS), height, width) that is overwritten on every step,
+        so callers that keep observations must copy them.
+
+        Args:
+            width: Width of the map in tiles.
+            height: Height of the map in tiles.
+            difficulty: Growth difficulty passed to the game.
+            ticks_per_step: Logic ticks simulated per step (the action applies before the first).
+            max_steps: Episode length limit. Reaching it ends the episode with info['truncated'].
+            tensor_observations: If True, reset/step return the tensor instead of a WorldState.
+            scenario: Optional Scenario every episode starts from (its map size overrides width/height).
+            render_tile_size: Pixels per tile of render('rgb_array') frames.
+        """
+        if scenario is not None:
+            width, height = scenario.width, scenario.height
+        self.width = width
+        self.height = height
+        self.ticks_per_step = ticks_per_step
+        self.max_steps = max_steps
+        self.tensor_observations = tensor_observations
+        self.scenario = scenario
+        self.render_tile_size = render_tile_size
+        self._renderer = None  # Offscreen renderer, created by the first rgb_array render
+        self.game = MiniMotorwaysGame(width, height, difficulty=difficulty)
+        self.steps = 0
+        self._last_score = 0
+
+        self.observation = np.zeros((len(OBSERVATION_CHANNELS), height, width), dtype=np.float32)
+        self._map_changes = self.sim.changes.subscribe()  # Tiles/roads not yet written to the tensor
+        self._car_tiles = []  # Tiles marked in the car planes by the last encoding
+        self.observation_space = {
+            'shape': self.observation.shape,
+            'dtype': self.observation.dtype,
+            'low': 0.0,
+            'high': 1.0,
+            'channels': OBSERVATION_CHANNELS,
+        }
+        self.action_space = {
+            'n': 1 + len(ACTION_TYPES) * height * width * len(DIRECTIONS),
+            'shape': (len(ACTION_TYPES), height, width, len(DIRECTIONS)),
+            'action_types': ACTION_TYPES,
+            'directions': DIRECTIONS,
+        }
+
+    @property
+    def sim(self):
+        return self.game.sim
+
+    def encode_index(self, index: int) -> Optional[np.ndarray]:
+        """
+        Converts a flat action index into an (op, x, y, direction) row for SimulationCore.apply_actions.
+
+        Args:
+            index: 0 for no-op, otherwise 1 + ravelled (action type, y, x, direction).
+
+        Returns:
+            The encoded row, or None for the no-op and for segments leaving the map.
+        """
+        if index == 0:
+            return None
+        op, y, x, direction = np.unravel_index(index - 1, self.action_space['shape'])
+        dx, dy = DIRECTIONS[direction]
+        if not (0 <= x + dx < self.width and 0 <= y + dy < self.height):
+            return None
+        return np.array((ACTION_OPS[ACTION_TYPES[op]], x, y, direction), dtype=np.int32)
+
+    def action_masks(self) -> np.ndarray:
+        """
+        Returns:
+            Boolean validity of every flat action index. This is the simulation's live mask
+            (maintained incrementally), so it must not be modified and changes after each step.
+        """
+        self.sim.action_mask.refresh()
+        return self.sim.action_mask.flat
+
+    def decode_action(self, index: int) -> Optional[Action]:
+        """
+        Converts a flat action index into an Action (None for no-ops, see encode_index).
+        """
+        row = self.encode_index(index)
+        return None if row is None else decode_action(row)
+
+    def reset(self, seed: Optional[int] = None) -> Union[WorldState, np.ndarray]:
+        """
+        Starts a new episode on the existing game objects.
+
+        Args:
+            seed: Optional seed for the simulation's random number generator
+                (applied after the scenario's own seed).
+
+        Returns:
+            The initial observation.
+        """
+        if self.scenario is not None:
+            world_state = self.game.load_scenario(self.scenario)
+            if seed is not None:
+                random.seed(seed)
+        else:
+            if seed is not None:
+                random.seed(seed)
+            world_state = self.game.reset()
+        self.steps = 0
+        self._last_score = 0
+        return self._observe(world_state)
+
+    def step(self, action: Union[Action, np.ndarray, int, None]) -> Tuple[Union[WorldState, np.ndarray], float, bool, Dict]:
+        """
+        Applies an action and advances the simulation by ticks_per_step ticks.
+
+        Args:
+            action: An Action, an encoded (N, 4) batch of road edits, a flat action index
+                (see encode_index) or None.
+
+        Returns:
+            Observation, reward (pins fulfilled during the step), done and the simulation info.
+        """
+        if isinstance(action, (int, np.integer)):
+            action = self.encode_index(int(action))
+
+        info = {}
+        done = False
+        for _ in range(self.ticks_per_step):
+            _, _, done, tick_info = self.game.sim.step(action)
+            info.update(tick_info)
+            action = None
+            if done:
+                break
+        if done:
+            self.game.is_running = False
+        self.steps += 1
+
+        score = self.sim.score
+        reward = float(score - self._last_score)
+        self._last_score = score
+
+        if not done and self.max_steps is not None and self.steps >= self.max_steps:
+            done = True
+            info['truncated'] = True
+        return self._observe(self.sim.get_world_state()), reward, done, info
+
+    def _observe(self, world_state: WorldState) -> Union[WorldState, np.ndarray]:
+        return self.encode_observation() if self.tensor_observations else world_state
+
+    def encode_observation(self) -> np.ndarray:
+        """
+        Updates the preallocated observation tensor from the current simulation.
+
+        The road and building planes are decoded from the packed map cells with a few
+        vectorized operations, only when the change tracker reports edits; car planes are
+        cleared at the tiles the previous encoding marked.
+
+        Returns:
+            The observation buffer (reused by the next call).
+        """
+        obs = self.observation
+        sim = self.sim
+        roads, houses, centers, colors, pins, cars, waiting = obs
+
+        full, tiles, edges = self._map_changes.consume()
+        if full:
+            obs.fill(0.0)
+            self._car_tiles = []
+        if full or tiles or edges:
+            sim.map.refresh()
+            cells = sim.map.cells
+            kind = cells['kind']
+            np.take(_ROAD_DEGREE, cells['roads'], out=roads)
+            np.equal(kind, HOUSE, out=houses, casting='unsafe')
+            np.equal(kind, SHOPPING_CENTER, out=centers, casting='unsafe')
+            np.multiply(cells['color'] + 1, 1.0 / len(Color), out=colors, casting='unsafe')
+            colors[kind == NO_BUILDING] = 0.0
+        for sc in sim.shopping_centers:
+            x, y = sc.location
+            pins[y, x] = min(1.0, len(sc.pins) / sc.max_pins)
+
+        for x, y in self._car_tiles:
+            cars[y, x] = 0.0
+            waiting[y, x] = 0.0
+        car_tiles = []
+        for car in sim.traffic_manager.cars.values():
+            x, y = car.position
+            cars[y, x] = 1.0
+            if car.waiting:
+                waiting[y, x] = 1.0
+            car_tiles.append((x, y))
+        self._car_tiles = car_tiles
+        return obs
+
+    def render(self, mode: str = 'human') -> Union[str, np.ndarray, None]:
+        """
+        Draws the map as text: '#' road, 'H'/'S' house/shopping center, 'c' car, '.' empty.
+
+        Args:
+            mode: 'human' prints the map, 'ansi' returns it as a string and 'rgb_array' returns
+                an offscreen frame (a reused (height, width, 3) uint8 view, see OffscreenRenderer).
+        """
+        if mode == 'rgb_array':
+            if self._renderer is None:
+                from nm_clone.renderer import OffscreenRenderer  # pygame is only needed for pixels
+                self._renderer = OffscreenRenderer(self.width, self.height, self.render_tile_size)
+            return self._renderer.render(self.sim)
+        rows = [['.'] * self.width for _ in range(self.height)]
+        for x, y in self.sim.road_network.graph.nodes:
+            if 0 <= x < self.width and 0 <= y < self.height:
+                rows[y][x] = '#'
+        for car in self.sim.traffic_manager.cars.values():
+            rows[car.position[1]][car.position[0]] = 'c'
+        for house in self.sim.houses:
+            rows[house.location[1]][house.location[0]] = 'H'
+        for sc in self.sim.shopping_centers:
+            rows[sc.location[1]][sc.location[0]] = 'S'
+        text = '\n'.join(''.join(row) for row in rows)
+        if mode == 'ansi':
+            return text
+        print(text)
+        return None
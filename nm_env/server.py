@@ -0,0 +1,278 @@
+import argparse
+import asyncio
+import socket
+import struct
+import threading
+from functools import partial
+from typing import Callable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from nm_env.gym_env import NeuroMotorwaysEnv
+
+# Wire protocol. Every message is a little-endian uint32 body length followed by the body.
+# Requests start with (opcode u8, env index u16); replies with a status byte (0 ok, 1 error,
+# followed by a UTF-8 message). Replies come back in request order, so clients may pipeline.
+OP_INFO = 0        # -> (env count u16, channels u16, height u16, width u16, flat action count u32)
+OP_RESET = 1       # seed i64 (-1 for none) -> observation
+OP_STEP = 2        # N x (op, x, y, direction) int32 rows -> (reward f32, done u8, truncated u8, invalid u16) + observation
+OP_STEP_INDEX = 3  # flat action index i32 (see NeuroMotorwaysEnv.encode_index) -> as OP_STEP
+OP_MASK = 4        # -> flat action mask, one byte per action
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+_LENGTH = struct.Struct('<I')
+_REQUEST = struct.Struct('<BH')
+_INFO = struct.Struct('<BHHHHI')
+_SEED = struct.Struct('<q')
+_INDEX = struct.Struct('<i')
+_STEP = struct.Struct('<BfBBH')  # Status, reward, done, truncated, skipped invalid edits; pads the observation to 4 bytes
+_OK = bytes([STATUS_OK])
+
+Address = Union[str, Tuple[str, int]]
+
+
+class SimulationServer:
+    def __init__(self, env_factory: Optional[Callable[[], NeuroMotorwaysEnv]] = None, count: int = 1):
+        """
+        Hosts many simulations behind a length-prefixed binary protocol (see the OP_ constants).
+
+        Each connection's requests are answered in order as soon as they are parsed, and all
+        replies to the requests found in one read go out in a single write, so a pipelining
+        client pays the socket cost once per batch rather than once per step. Requests for
+        any environment may come from any connection.
+
+        Args:
+            env_factory: Builds one environment. It must produce tensor observations.
+                None builds default NeuroMotorwaysEnv instances.
+            count: Number of environments to host.
+        """
+        if env_factory is None:
+            env_factory = partial(NeuroMotorwaysEnv, tensor_observations=True)
+        self.envs: List[NeuroMotorwaysEnv] = [env_factory() for _ in range(count)]
+        if not all(env.tensor_observations for env in self.envs):
+            raise ValueError("Hosted environments must use tensor observations")
+        self.address: Optional[Address] = None  # Bound address, once serving
+        self.started = threading.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    def handle(self, body: bytes) -> bytes:
+        """
+        Answers one request.
+
+        Args:
+            body: Request body (without the length prefix).
+
+        Returns:
+            Reply body (without the length prefix).
+        """
+        try:
+            opcode, index = _REQUEST.unpack_from(body)
+            payload = memoryview(body)[_REQUEST.size:]
+            if opcode == OP_INFO:
+                env = self.envs[0]
+                channels, height, width = env.observation_space['shape']
+                return _INFO.pack(STATUS_OK, len(self.envs), channels, height, width, env.action_space['n'])
+            if not 0 <= index < len(self.envs):
+                raise ValueError(f"No environment {index}")
+            env = self.envs[index]
+            if opcode == OP_RESET:
+                seed, = _SEED.unpack(payload)
+                return _OK + env.reset(seed=None if seed < 0 else seed).tobytes()
+            if opcode == OP_STEP or opcode == OP_STEP_INDEX:
+                if opcode == OP_STEP:
+                    rows = np.frombuffer(payload, dtype='<i4').reshape(-1, 4)
+                    action = rows if len(rows) else None
+                else:
+                    action, = _INDEX.unpack(payload)
+                observation, reward, done, info = env.step(action)
+                invalid = min(len(info.get('invalid_actions', ())), 0xFFFF)
+                return _STEP.pack(STATUS_OK, reward, done, info.get('truncated', False), invalid) + observation.tobytes()
+            if opcode == OP_MASK:
+                return _OK + env.action_masks().tobytes()
+            raise ValueError(f"Unknown opcode {opcode}")
+        except Exception as error:  # Report instead of dropping the connection
+            return bytes([STATUS_ERROR]) + f"{type(error).__name__}: {error}".encode()
+
+    async def start(self, address: Address) -> asyncio.AbstractServer:
+        """
+        Starts listening on a Unix socket path or a (host, port) pair (port 0 picks a free one).
+        """
+        self._loop = asyncio.get_running_loop()
+        factory = partial(_Connection, self)
+        if isinstance(address, str):
+            self._server = await self._loop.create_unix_server(factory, address)
+            self.address = address
+        else:
+            self._server = await self._loop.create_server(factory, *address)
+            self.address = self._server.sockets[0].getsockname()[:2]
+        self.started.set()
+        return self._server
+
+    async def serve(self, address: Address):
+        """Serves until stop() is called."""
+        server = await self.start(address)
+        async with server:
+            try:
+                await server.serve_forever()
+            except asyncio.CancelledError:
+                pass
+
+    def serve_forever(self, address: Address):
+        """Blocking entry point, e.g. for a background thread (wait on `started`)."""
+        asyncio.run(self.serve(address))
+
+    def stop(self):
+        """Stops serving; safe to call from any thread."""
+        if self._loop is not None and self._server is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+
+
+class _Connection(asyncio.Protocol):
+    def __init__(self, server: SimulationServer):
+        self.server = server
+        self.transport = None
+        self.buffer = bytearray()
+
+    def connection_made(self, transport):
+        self.transport = transport
+        sock = transport.get_extra_info('socket')
+        if sock is not None and sock.family in (socket.AF_INET, socket.AF_INET6):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def data_received(self, data: bytes):
+        buffer = self.buffer
+        buffer += data
+        replies = []
+        offset = 0
+        while len(buffer) - offset >= _LENGTH.size:
+            length, = _LENGTH.unpack_from(buffer, offset)
+            end = offset + _LENGTH.size + length
+            if len(buffer) < end:
+                break
+            reply = self.server.handle(bytes(buffer[offset + _LENGTH.size:end]))
+            replies.append(_LENGTH.pack(len(reply)))
+            replies.append(reply)
+            offset = end
+        del buffer[:offset]
+        if replies:
+            self.transport.writelines(replies)
+
+
+class SimulationClient:
+    def __init__(self, address: Address, timeout: Optional[float] = None):
+        """
+        Blocking client for SimulationServer.
+
+        step_send() only writes the request, so many steps (on one or many environments) can be
+        in flight before step_recv() collects their replies in order.
+
+        Args:
+            address: Unix socket path or (host, port) pair.
+            timeout: Socket timeout in seconds, None to block.
+        """
+        if isinstance(address, str):
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._socket.settimeout(timeout)
+        self._socket.connect(address)
+        self._pending = 0
+        self._send(OP_INFO, 0)
+        self.env_count, channels, height, width, self.action_count = _INFO.unpack(self._recv())[1:]
+        self.observation_shape = (channels, height, width)
+
+    def _send(self, opcode: int, index: int, payload: bytes = b''):
+        self._socket.sendall(_LENGTH.pack(_REQUEST.size + len(payload)) + _REQUEST.pack(opcode, index) + payload)
+        self._pending += 1
+
+    def _recv_exact(self, size: int) -> bytearray:
+        data = bytearray(size)
+        view = memoryview(data)
+        received = 0
+        while received < size:
+            count = self._socket.recv_into(view[received:])
+            if not count:
+                raise ConnectionError("Server closed the connection")
+            received += count
+        return data
+
+    def _recv(self) -> bytearray:
+        """Reads the oldest pending reply; raises RuntimeError for error replies."""
+        length, = _LENGTH.unpack(self._recv_exact(_LENGTH.size))
+        body = self._recv_exact(length)
+        self._pending -= 1
+        if body[0] != STATUS_OK:
+            raise RuntimeError(body[1:].decode())
+        return body
+
+    def _observation(self, body: bytearray, offset: int) -> np.ndarray:
+        return np.frombuffer(body, dtype=np.float32, offset=offset).reshape(self.observation_shape)
+
+    def reset(self, index: int = 0, seed: Optional[int] = None) -> np.ndarray:
+        self._send(OP_RESET, index, _SEED.pack(-1 if seed is None else seed))
+        return self._observation(self._recv(), 1)
+
+    def step_send(self, index: int, action: Union[np.ndarray, int, None]):
+        """
+        Sends a step request without waiting for the reply.
+
+        Args:
+            index: Environment index.
+            action: (N, 4) road edit rows, a flat action index or None.
+        """
+        if isinstance(action, (int, np.integer)):
+            self._send(OP_STEP_INDEX, index, _INDEX.pack(int(action)))
+        else:
+            rows = b'' if action is None else np.ascontiguousarray(action, dtype='<i4').reshape(-1, 4).tobytes()
+            self._send(OP_STEP, index, rows)
+
+    def step_recv(self) -> Tuple[np.ndarray, float, bool, dict]:
+        """
+        Waits for the oldest outstanding step_send.
+
+        Returns:
+            (observation, reward, done, info); info only carries 'truncated' and
+            'invalid_action_count', the number of edits the environment skipped.
+        """
+        body = self._recv()
+        _, reward, done, truncated, invalid = _STEP.unpack_from(body)
+        info = {'truncated': True} if truncated else {}
+        if invalid:
+            info['invalid_action_count'] = invalid
+        return self._observation(body, _STEP.size), reward, bool(done), info
+
+    def step(self, index: int, action: Union[np.ndarray, int, None]) -> Tuple[np.ndarray, float, bool, dict]:
+        self.step_send(index, action)
+        return self.step_recv()
+
+    def action_masks(self, index: int = 0) -> np.ndarray:
+        self._send(OP_MASK, index)
+        return np.frombuffer(self._recv(), dtype=bool, offset=1)
+
+    def close(self):
+        self._socket.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve simulations over the binary protocol.")
+    parser.add_argument('--unix', help="Unix socket path (instead of TCP)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7345)
+    parser.add_argument('--envs', type=int, default=1)
+    parser.add_argument('--width', type=int, default=20)
+    parser.add_argument('--height', type=int, default=15)
+    parser.add_argument('--ticks-per-step', type=int, default=1)
+    args = parser.parse_args()
+
+    factory = partial(NeuroMotorwaysEnv, args.width, args.height, ticks_per_step=args.ticks_per_step,
+                      tensor_observations=True)
+    server = SimulationServer(factory, args.envs)
+    server.serve_forever(args.unix or (args.host, args.port))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,407 @@
+import argparse
+import contextlib
+import io
+import random
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from nm_common.actions import OP_ADD_ROAD, OP_REMOVE_ROAD
+from nm_common.constants import COLOR_NAMES, DIRECTIONS
+from nm_core.simulation.core import SimulationCore
+from nm_core.simulation.map import BUILDING_TILE
+from nm_core.simulation.scenario import Scenario
+
+EngineFactory = Callable[[int, int], SimulationCore]
+ActionStream = Dict[int, np.ndarray]  # Tick -> (N, 4) action rows applied before that tick
+
+
+def reference_engine(width: int, height: int) -> SimulationCore:
+    """The default engine everything else is compared against."""
+    return SimulationCore(width, height)
+
+
+# 'segment_queues' must match the reference tick for tick. 'congestion_routing' picks routes by
+# segment load, an accepted difference: fuzz it to locate where it parts ways, not to assert agreement.
+ENGINES: Dict[str, EngineFactory] = {
+    'reference': reference_engine,
+    'segment_queues': lambda width, height: SimulationCore(width, height, segment_queues=True),
+    'congestion_routing': lambda width, height: SimulationCore(width, height, congestion_routing=True),
+}
+
+
+def state_signature(sim: SimulationCore) -> Dict[str, Any]:
+    """
+    Returns:
+        The state compared between engines: cars (id, position, waiting), pins per center and score.
+    """
+    return {
+        'cars': sorted((car.car_id, car.position, car.waiting) for car in sim.traffic_manager.cars.values()),
+        'pins': [len(sc.pins) for sc in sim.shopping_centers],
+        'score': sim.score,
+    }
+
+
+class Repro:
+    def __init__(self, scenario: Scenario, actions: ActionStream, ticks: int):
+        """
+        A scenario, an action stream and a tick count that reproduce a divergence.
+
+        Args:
+            scenario: Starting position (its seed drives the simulation's random numbers).
+            actions: Action rows applied before given ticks.
+            ticks: Number of ticks to run.
+        """
+        self.scenario = scenario
+        self.actions = actions
+        self.ticks = ticks
+
+    def run(self, reference: EngineFactory, candidate: EngineFactory) -> Optional[Tuple[int, str, Any, Any]]:
+        """Replays the repro, see compare()."""
+        return compare(reference, candidate, self.scenario, self.actions, self.ticks)
+
+    def save(self, path: str):
+        """Writes the scenario and the action stream to one .npz file."""
+        ticks = sorted(self.actions)
+        rows = [np.asarray(self.actions[tick], dtype=np.int32).reshape(-1, 4) for tick in ticks]
+        self.scenario.save(
+            path,
+            repro_ticks=np.int64(self.ticks),
+            action_ticks=np.repeat(np.array(ticks, dtype=np.int64), [len(r) for r in rows]),
+            action_rows=np.concatenate(rows) if rows else np.zeros((0, 4), dtype=np.int32),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "Repro":
+        """Reads a repro written by save()."""
+        with np.load(path, allow_pickle=False) as data:
+            ticks = int(data['repro_ticks'])
+            action_ticks, action_rows = data['action_ticks'], data['action_rows']
+        actions = {tick: action_rows[action_ticks == tick] for tick in np.unique(action_ticks).tolist()}
+        return cls(Scenario.load(path), actions, ticks)
+
+    def describe(self) -> str:
+        return (f"{self.scenario.width}x{self.scenario.height} map, {len(self.scenario.road_edges())} road segments, "
+                f"{len(self.scenario.houses)} houses, {len(self.scenario.shopping_centers)} shopping centers, "
+                f"{sum(len(rows) for rows in self.actions.values())} actions, {self.ticks} ticks")
+
+
+class Divergence:
+    def __init__(self, tick: int, field: str, reference: Any, candidate: Any, repro: Repro):
+        """
+        The first tick at which two engines disagree.
+
+        Args:
+            tick: Ticks run when the states differed (0 is the loaded scenario).
+            field: Differing part of the state: 'cars', 'pins', 'score' or 'edits'.
+            reference: Value of the field in the reference engine.
+            candidate: Value of the field in the candidate engine.
+            repro: Smallest found scenario and action stream that still diverge.
+        """
+        self.tick = tick
+        self.field = field
+        self.reference = reference
+        self.candidate = candidate
+        self.repro = repro
+
+    def __str__(self) -> str:
+        reference, candidate = self.reference, self.candidate
+        if self.field == 'cars':
+            # Only the cars that differ
+            reference, candidate = sorted(set(reference) - set(candidate)), sorted(set(candidate) - set(reference))
+        return (f"Divergence at tick {self.tick} in {self.field}:\n"
+                f"  reference: {reference}\n"
+                f"  candidate: {candidate}\n"
+                f"  repro: {self.repro.describe()}")
+
+
+class _Run:
+    def __init__(self, factory: EngineFactory, scenario: Scenario):
+        """One engine with its own stream of the (global) random module."""
+        self.sim = factory(scenario.width, scenario.height)
+        scenario.apply(self.sim)
+        self.random_state = random.getstate()
+
+    def step(self, rows: Optional[np.ndarray]) -> int:
+        """
+        Applies the tick's actions, then advances one tick.
+
+        Returns:
+            Number of segments edited, or -1 if the batch was rejected.
+        """
+        random.setstate(self.random_state)
+        try:
+            edits = 0
+            if rows is not None:
+                try:
+                    edits = self.sim.apply_actions(rows)
+                except ValueError:
+                    edits = -1
+            self.sim.step(None)
+            return edits
+        finally:
+            self.random_state = random.getstate()
+
+
+def compare(reference: EngineFactory, candidate: EngineFactory, scenario: Scenario, actions: ActionStream,
+            ticks: int, quiet: bool = True) -> Optional[Tuple[int, str, Any, Any]]:
+    """
+    Runs two engines side by side from the same scenario and action stream.
+
+    Both engines see identical random number streams: each keeps its own state of the
+    random module, swapped in around its ticks.
+
+    Args:
+        reference: Factory of the reference engine.
+        candidate: Factory of the engine under test.
+        scenario: Starting position.
+        actions: Action rows applied before given ticks (rejected batches must be rejected by both).
+        ticks: Number of ticks to run.
+        quiet: Silence the simulation's prints.
+
+    Returns:
+        (tick, field, reference value, candidate value) of the first difference, or None.
+    """
+    saved_state = random.getstate()
+    output = contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext()
+    try:
+        with output:
+            runs = [_Run(reference, scenario), _Run(candidate, scenario)]
+            for tick in range(ticks + 1):
+                if tick:
+                    rows = actions.get(tick - 1)
+                    edits = [run.step(rows) for run in runs]
+                    if edits[0] != edits[1]:
+                        return tick, 'edits', edits[0], edits[1]
+                states = [state_signature(run.sim) for run in runs]
+                for field, value in states[0].items():
+                    if value != states[1][field]:
+                        return tick, field, value, states[1][field]
+            return None
+    finally:
+        random.setstate(saved_state)
+
+
+def _with_buildings(scenario: Scenario, houses: np.ndarray, centers: np.ndarray) -> Scenario:
+    grid = scenario.grid.copy()
+    for rows in (scenario.houses, scenario.shopping_centers):
+        grid[rows[:, 1], rows[:, 0]] = 0
+    for rows, keep in ((scenario.houses, houses), (scenario.shopping_centers, centers)):
+        grid[rows[keep, 1], rows[keep, 0]] = BUILDING_TILE
+    return Scenario(
+        grid, scenario.roads, scenario.houses[houses], scenario.shopping_centers[centers],
+        center_pin_rates=scenario.center_pin_rates[centers], seed=scenario.seed,
+        pin_generation_interval=scenario.pin_generation_interval,
+        growth_interval=scenario.growth_interval, difficulty=scenario.difficulty,
+    )
+
+
+def shrink(reference: EngineFactory, candidate: EngineFactory, repro: Repro, max_attempts: int = 200) -> Repro:
+    """
+    Greedily removes action batches and buildings while the engines still diverge.
+
+    Every accepted removal also cuts the tick count down to the new first divergence.
+
+    Args:
+        reference: Factory of the reference engine.
+        candidate: Factory of the engine under test.
+        repro: A diverging repro.
+        max_attempts: Replays allowed for shrinking.
+
+    Returns:
+        The smallest diverging repro found.
+    """
+    attempts = 0
+
+    def attempt(candidate_repro: Repro) -> Optional[Repro]:
+        nonlocal attempts
+        attempts += 1
+        divergence = candidate_repro.run(reference, candidate)
+        if divergence is None:
+            return None
+        actions = {tick: rows for tick, rows in candidate_repro.actions.items() if tick < divergence[0]}
+        return Repro(candidate_repro.scenario, actions, divergence[0])
+
+    for tick in sorted(repro.actions, reverse=True):
+        if attempts >= max_attempts:
+            return repro
+        if tick in repro.actions:
+            actions = {t: rows for t, rows in repro.actions.items() if t != tick}
+            repro = attempt(Repro(repro.scenario, actions, repro.ticks)) or repro
+
+    for layer in ('houses', 'shopping_centers'):
+        i = 0
+        while i < len(getattr(repro.scenario, layer)) and attempts < max_attempts:
+            houses = np.ones(len(repro.scenario.houses), dtype=bool)
+            centers = np.ones(len(repro.scenario.shopping_centers), dtype=bool)
+            (houses if layer == 'houses' else centers)[i] = False
+            smaller = attempt(Repro(_with_buildings(repro.scenario, houses, centers), repro.actions, repro.ticks))
+            if smaller is None:
+                i += 1
+            else:
+                repro = smaller
+    return repro
+
+
+def find_divergence(reference: EngineFactory, candidate: EngineFactory, scenario: Scenario,
+                    actions: ActionStream, ticks: int, minimize: bool = True) -> Optional[Divergence]:
+    """
+    Compares two engines and, if they disagree, packages the first divergence with a repro.
+
+    Args:
+        reference: Factory of the reference engine.
+        candidate: Factory of the engine under test.
+        scenario: Starting position.
+        actions: Action rows applied before given ticks.
+        ticks: Number of ticks to run.
+        minimize: Shrink the repro (see shrink()).
+
+    Returns:
+        The divergence, or None if the engines agreed on every tick.
+    """
+    found = compare(reference, candidate, scenario, actions, ticks)
+    if found is None:
+        return None
+    repro = Repro(scenario, {tick: rows for tick, rows in actions.items() if tick < found[0]}, found[0])
+    if minimize:
+        repro = shrink(reference, candidate, repro)
+        found = repro.run(reference, candidate)
+    return Divergence(*found, repro=repro)
+
+
+def random_scenario(width: int, height: int, rng: np.random.Generator, road_density: float = 0.7,
+                    one_way_fraction: float = 0.2, buildings: Optional[int] = None, colors: int = 3) -> Scenario:
+    """
+    Generates a random road network with buildings on it.
+
+    Each pair of adjacent tiles gets a road with probability road_density, one-way with
+    probability one_way_fraction. Buildings go on distinct tiles touched by roads.
+
+    Args:
+        width: Width of the map in tiles.
+        height: Height of the map in tiles.
+        rng: Random generator.
+        road_density: Fraction of adjacent tile pairs joined by a road.
+        one_way_fraction: Fraction of roads that are one-way.
+        buildings: Number of buildings (about one per 12 tiles by default); a quarter are shopping centers.
+        colors: Number of building colors.
+
+    Returns:
+        The Scenario (seeded from rng, with a random global pin interval and per-center rates).
+    """
+    roads = np.zeros((height, width), dtype=np.uint8)
+    up, right, down, left = (1 << d for d in range(len(DIRECTIONS)))
+    for forward, backward, shape, step in ((right, left, (height, width - 1), (0, 1)), (down, up, (height - 1, width), (1, 0))):
+        ys, xs = np.nonzero(rng.random(shape) < road_density)
+        direction = rng.random(len(xs))
+        forward_ok = direction >= one_way_fraction / 2  # Both ways, or forward only
+        backward_ok = (direction < one_way_fraction / 2) | (direction >= one_way_fraction)
+        roads[ys[forward_ok], xs[forward_ok]] |= forward
+        roads[ys[backward_ok] + step[0], xs[backward_ok] + step[1]] |= backward
+
+    connected = np.zeros_like(roads, dtype=bool)
+    connected |= roads > 0
+    connected[:-1, :] |= (roads[1:, :] & up) > 0
+    connected[1:, :] |= (roads[:-1, :] & down) > 0
+    connected[:, :-1] |= (roads[:, 1:] & left) > 0
+    connected[:, 1:] |= (roads[:, :-1] & right) > 0
+    ys, xs = np.nonzero(connected)
+    if buildings is None:
+        buildings = max(2, width * height // 12)
+    chosen = rng.choice(len(xs), size=min(buildings, len(xs)), replace=False)
+    xs, ys = xs[chosen], ys[chosen]
+    grid = np.zeros((height, width), dtype=np.int8)
+    grid[ys, xs] = BUILDING_TILE
+
+    building_colors = rng.integers(0, min(colors, len(COLOR_NAMES)), len(xs))
+    is_center = np.arange(len(xs)) < max(1, len(xs) // 4)
+    houses = np.column_stack([xs[~is_center], ys[~is_center], building_colors[~is_center],
+                              rng.integers(1, 4, (~is_center).sum())])
+    centers = np.column_stack([xs[is_center], ys[is_center], building_colors[is_center]])
+    pin_rates = np.where(rng.random(len(centers)) < 0.5, rng.uniform(0.02, 0.2, len(centers)), np.nan)
+    return Scenario(grid, roads, houses, centers, center_pin_rates=pin_rates, seed=int(rng.integers(2 ** 31)),
+                    pin_generation_interval=int(rng.integers(3, 15)))
+
+
+def random_actions(scenario: Scenario, ticks: int, rng: np.random.Generator, rate: float = 0.2,
+                   add_fraction: float = 0.7) -> ActionStream:
+    """
+    Generates random two-way road additions and removals.
+
+    Args:
+        scenario: Scenario whose map size bounds the edits.
+        ticks: Length of the stream.
+        rng: Random generator.
+        rate: Fraction of ticks with a batch of edits.
+        add_fraction: Fraction of edits that add roads.
+
+    Returns:
+        Batches of (op, x, y, direction) rows, each adding or removing both directions of a segment.
+    """
+    actions = {}
+    dx = np.array([dx for dx, _ in DIRECTIONS])
+    dy = np.array([dy for _, dy in DIRECTIONS])
+    for tick in np.flatnonzero(rng.random(ticks) < rate).tolist():
+        count = int(rng.integers(1, 4))
+        ops = np.where(rng.random(count) < add_fraction, OP_ADD_ROAD, OP_REMOVE_ROAD)
+        directions = rng.integers(0, len(DIRECTIONS), count)
+        xs = rng.integers(0, scenario.width, count)
+        ys = rng.integers(0, scenario.height, count)
+        forward = np.column_stack([ops, xs, ys, directions])
+        backward = np.column_stack([ops, xs + dx[directions], ys + dy[directions], (directions + 2) % len(DIRECTIONS)])
+        actions[tick] = np.concatenate([forward, backward]).astype(np.int32)
+    return actions
+
+
+def fuzz(reference: EngineFactory, candidate: EngineFactory, runs: int = 20, width: int = 24, height: int = 18,
+         ticks: int = 300, seed: int = 0, minimize: bool = True) -> Optional[Divergence]:
+    """
+    Compares two engines on random road networks and action streams.
+
+    Args:
+        reference: Factory of the reference engine.
+        candidate: Factory of the engine under test.
+        runs: Number of random scenarios.
+        width: Width of the maps in tiles.
+        height: Height of the maps in tiles.
+        ticks: Ticks per scenario.
+        seed: Seed of the fuzzer.
+        minimize: Shrink the repro of a divergence.
+
+    Returns:
+        The first divergence found, or None.
+    """
+    rng = np.random.default_rng(seed)
+    for _ in range(runs):
+        scenario = random_scenario(width, height, rng)
+        divergence = find_divergence(reference, candidate, scenario, random_actions(scenario, ticks, rng), ticks, minimize)
+        if divergence is not None:
+            return divergence
+    return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare a traffic engine against the reference on fuzzed scenarios.")
+    parser.add_argument('candidate', choices=sorted(ENGINES))
+    parser.add_argument('--reference', choices=sorted(ENGINES), default='reference')
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--width', type=int, default=24)
+    parser.add_argument('--height', type=int, default=18)
+    parser.add_argument('--ticks', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save', help="Write the repro of a divergence to this .npz file")
+    args = parser.parse_args(argv)
+
+    divergence = fuzz(ENGINES[args.reference], ENGINES[args.candidate], args.runs, args.width, args.height,
+                      args.ticks, args.seed)
+    if divergence is None:
+        print(f"No divergence in {args.runs} runs of {args.ticks} ticks")
+        return 0
+    print(divergence)
+    if args.save:
+        divergence.repro.save(args.save)
+    return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
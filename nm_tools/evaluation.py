@@ -0,0 +1,315 @@
+import argparse
+import contextlib
+import importlib
+import io
+import math
+import multiprocessing
+import os
+import random
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from nm_clone.game import MiniMotorwaysGame
+from nm_common.constants import FAILURE_THRESHOLD_SECONDS
+from nm_core.simulation.core import SimulationCore
+
+Policy = Callable[[SimulationCore], object]  # Returns road edits for apply_actions, or None
+
+# Why an episode ended
+SURVIVED = 'survived'                  # Reached max_ticks
+CENTER_FAILED = 'center_failed'        # A shopping center stayed overloaded for too long
+GRIDLOCK = 'gridlock'                  # Gridlock termination (SimulationCore.gridlock_termination_ticks)
+INVALID_ACTION = 'invalid_action'      # The policy returned edits apply_actions rejected
+
+
+class EpisodeResult:
+    __slots__ = ('policy', 'seed', 'score', 'ticks', 'seconds', 'cause')
+
+    def __init__(self, policy: str, seed: int, score: int, ticks: int, seconds: float, cause: str):
+        """
+        Outcome of one evaluation episode.
+
+        Args:
+            policy: Name of the evaluated policy.
+            seed: Episode seed.
+            score: Final score (pins fulfilled).
+            ticks: Logic ticks survived.
+            seconds: Simulated seconds survived.
+            cause: Why the episode ended (SURVIVED, CENTER_FAILED, GRIDLOCK or INVALID_ACTION).
+        """
+        self.policy = policy
+        self.seed = seed
+        self.score = score
+        self.ticks = ticks
+        self.seconds = seconds
+        self.cause = cause
+
+    def __repr__(self) -> str:
+        return f"EpisodeResult({self.policy!r}, seed={self.seed}, score={self.score}, ticks={self.ticks}, cause={self.cause!r})"
+
+
+def run_episode(policy: Policy, seed: int, name: str = 'policy', width: int = 20, height: int = 15,
+                difficulty: str = 'medium', max_ticks: int = 9000, decision_interval: int = 15,
+                scenario=None, gridlock_termination_ticks: Optional[int] = None, quiet: bool = True) -> EpisodeResult:
+    """
+    Plays one headless episode.
+
+    The policy sees the simulation every decision_interval ticks; in between, the game runs
+    through SimulationCore.fast_forward, which jumps over stretches with no car on the road.
+
+    Args:
+        policy: Called with the SimulationCore; returns road edits or None.
+        seed: Seed of the episode (applied after the scenario's own seed, as in NeuroMotorwaysEnv).
+        name: Policy name recorded in the result.
+        width: Width of the map in tiles (ignored with a scenario).
+        height: Height of the map in tiles (ignored with a scenario).
+        difficulty: Growth difficulty.
+        max_ticks: Episode length limit.
+        decision_interval: Ticks between policy calls.
+        scenario: Optional Scenario the episode starts from.
+        gridlock_termination_ticks: End the episode (cause GRIDLOCK) after this many consecutive
+            gridlocked ticks (see SimulationCore.gridlock_termination_ticks). None never does.
+        quiet: Silence the simulation's prints.
+    """
+    if scenario is not None:
+        width, height = scenario.width, scenario.height
+    output = contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext()
+    with output:
+        game = MiniMotorwaysGame(width, height, difficulty=difficulty)
+        if scenario is not None:
+            game.load_scenario(scenario)
+            random.seed(seed)
+        else:
+            random.seed(seed)
+            game.reset()
+        sim = game.sim
+        sim.gridlock_termination_ticks = gridlock_termination_ticks
+
+        ticks = 0
+        cause = SURVIVED
+        while ticks < max_ticks and not sim.is_game_over:
+            action = policy(sim)
+            if action is not None:
+                try:
+                    sim.apply_actions(action)
+                except ValueError:
+                    cause = INVALID_ACTION
+                    break
+            ticks += sim.fast_forward(min(decision_interval, max_ticks - ticks))
+
+    if sim.is_game_over:
+        if gridlock_termination_ticks and sim.traffic_manager.gridlock.gridlock_ticks >= gridlock_termination_ticks:
+            cause = GRIDLOCK
+        elif any(sc.failure_timer >= FAILURE_THRESHOLD_SECONDS for sc in sim.shopping_centers):
+            cause = CENTER_FAILED
+    return EpisodeResult(name, seed, sim.score, ticks, ticks * sim.tick_duration, cause)
+
+
+def _t_within(t: float, df: int) -> float:
+    """P(|T| <= t) for Student's t with integer df (Abramowitz & Stegun 26.7.3-4)."""
+    theta = math.atan(t / math.sqrt(df))
+    cos2 = math.cos(theta) ** 2
+    if df % 2:
+        if df == 1:
+            return 2.0 * theta / math.pi
+        term = total = math.cos(theta)
+        for i in range(1, (df - 1) // 2):
+            term *= cos2 * (2 * i) / (2 * i + 1)
+            total += term
+        return 2.0 / math.pi * (theta + math.sin(theta) * total)
+    term = total = 1.0
+    for i in range(1, df // 2):
+        term *= cos2 * (2 * i - 1) / (2 * i)
+        total += term
+    return math.sin(theta) * total
+
+
+def t_critical(confidence: float, df: int) -> float:
+    """Two-sided critical value of Student's t, by bisection (no SciPy needed)."""
+    low, high = 0.0, 1.0
+    while _t_within(high, df) < confidence:
+        high *= 2.0
+    for _ in range(60):
+        middle = (low + high) / 2.0
+        if _t_within(middle, df) < confidence:
+            low = middle
+        else:
+            high = middle
+    return high
+
+
+class Summary:
+    __slots__ = ('count', 'mean', 'std', 'low', 'high')
+
+    def __init__(self, values: Sequence[float], confidence: float = 0.95):
+        """
+        Mean of a sample with its Student-t confidence interval.
+
+        Args:
+            values: Sample (an interval needs at least two values, otherwise it is unbounded).
+            confidence: Two-sided confidence level.
+        """
+        self.count = len(values)
+        self.mean = sum(values) / self.count if values else math.nan
+        if self.count < 2:
+            self.std = math.nan
+            self.low, self.high = -math.inf, math.inf
+            return
+        self.std = math.sqrt(sum((value - self.mean) ** 2 for value in values) / (self.count - 1))
+        half_width = t_critical(confidence, self.count - 1) * self.std / math.sqrt(self.count)
+        self.low, self.high = self.mean - half_width, self.mean + half_width
+
+    def __repr__(self) -> str:
+        return f"{self.mean:.2f} [{self.low:.2f}, {self.high:.2f}] (n={self.count})"
+
+
+class Evaluation:
+    def __init__(self, results: Dict[str, List[EpisodeResult]], confidence: float, stopped_early: bool):
+        """
+        Episodes of every policy, over a common prefix of the seed list.
+
+        Args:
+            results: {policy name: results in seed order}.
+            confidence: Confidence level of the summaries.
+            stopped_early: Whether the intervals separated before the seed list ran out.
+        """
+        self.results = results
+        self.confidence = confidence
+        self.stopped_early = stopped_early
+
+    def summary(self, metric: str = 'score') -> Dict[str, Summary]:
+        """Mean and confidence interval of an EpisodeResult field ('score', 'ticks', 'seconds') per policy."""
+        return {name: Summary([getattr(result, metric) for result in results], self.confidence)
+                for name, results in self.results.items()}
+
+    def causes(self) -> Dict[str, Dict[str, int]]:
+        """Episode end causes per policy, counted."""
+        counts = {}
+        for name, results in self.results.items():
+            counts[name] = {}
+            for result in results:
+                counts[name][result.cause] = counts[name].get(result.cause, 0) + 1
+        return counts
+
+    def report(self) -> str:
+        lines = []
+        scores, seconds, causes = self.summary('score'), self.summary('seconds'), self.causes()
+        for name in self.results:
+            lines.append(f"{name}: score {scores[name]}, survived {seconds[name]} s, causes {causes[name]}")
+        if self.stopped_early:
+            lines.append("Stopped early: the score intervals separated")
+        return '\n'.join(lines)
+
+
+def intervals_separate(summaries: Sequence[Summary]) -> bool:
+    """True if no two confidence intervals overlap."""
+    ordered = sorted(summaries, key=lambda summary: summary.low)
+    return all(a.high < b.low for a, b in zip(ordered, ordered[1:]))
+
+
+def evaluate(policies: Dict[str, Policy], seeds: Sequence[int], workers: Optional[int] = None,
+             confidence: float = 0.95, min_episodes: int = 5, early_stopping: bool = True,
+             metric: str = 'score', context: Optional[str] = None, **episode_settings) -> Evaluation:
+    """
+    Runs every policy on every seed, spread over a process pool.
+
+    Episodes are submitted seed by seed, with a bounded number in flight. Whenever a seed
+    is finished for all policies, the intervals of `metric` over the finished seed prefix
+    are compared; once every policy has min_episodes and no two intervals overlap, the
+    remaining episodes are cancelled. Results always cover a common prefix of `seeds`, so
+    the outcome does not depend on the order in which workers finish.
+
+    Args:
+        policies: {name: policy}. Policies must be picklable (e.g. module-level functions).
+        seeds: Episode seeds, shared by all policies (paired comparison).
+        workers: Worker processes; None uses the CPU count and 0 runs inline.
+        confidence: Two-sided confidence level of the intervals.
+        min_episodes: Seeds every policy plays before early stopping is considered.
+        early_stopping: Stop once the intervals separate (needs at least two policies).
+        metric: EpisodeResult field the stopping rule compares.
+        context: multiprocessing start method ('fork', 'spawn', ...). None uses the default.
+        **episode_settings: Further run_episode arguments (width, height, max_ticks, ...).
+
+    Returns:
+        The Evaluation.
+    """
+    names = list(policies)
+    jobs = [(name, seed) for seed in seeds for name in names]
+    done: Dict[Tuple[str, int], EpisodeResult] = {}
+    finished_seeds = 0
+
+    def check() -> bool:
+        """Advances the finished seed prefix; True if evaluation can stop."""
+        nonlocal finished_seeds
+        while finished_seeds < len(seeds) and all((name, seeds[finished_seeds]) in done for name in names):
+            finished_seeds += 1
+        if not early_stopping or len(names) < 2 or finished_seeds < max(min_episodes, 2):
+            return False
+        prefix = seeds[:finished_seeds]
+        return intervals_separate([
+            Summary([getattr(done[name, seed], metric) for seed in prefix], confidence) for name in names
+        ])
+
+    stopped = False
+    if workers == 0:
+        for name, seed in jobs:
+            done[name, seed] = run_episode(policies[name], seed, name, **episode_settings)
+            if check():
+                stopped = True
+                break
+    else:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context(context)) as pool:
+            limit = 2 * workers  # In flight, so stopping early wastes little work
+            pending: Dict[Future, Tuple[str, int]] = {}
+            next_job = 0
+            while next_job < len(jobs) or pending:
+                while next_job < len(jobs) and len(pending) < limit:
+                    name, seed = jobs[next_job]
+                    pending[pool.submit(run_episode, policies[name], seed, name, **episode_settings)] = (name, seed)
+                    next_job += 1
+                completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    done[pending.pop(future)] = future.result()
+                if check():
+                    stopped = True
+                    for future in pending:
+                        future.cancel()
+                    break
+
+    prefix = seeds[:finished_seeds]
+    results = {name: [done[name, seed] for seed in prefix] for name in names}
+    return Evaluation(results, confidence, stopped and finished_seeds < len(seeds))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate policies over many seeds in parallel.")
+    parser.add_argument('policies', nargs='+', help="name=module:function")
+    parser.add_argument('--seeds', type=int, default=100, help="Evaluate seeds 0..N-1")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--width', type=int, default=20)
+    parser.add_argument('--height', type=int, default=15)
+    parser.add_argument('--max-ticks', type=int, default=9000)
+    parser.add_argument('--decision-interval', type=int, default=15)
+    parser.add_argument('--gridlock-ticks', type=int, default=None,
+                        help="End episodes after this many consecutive gridlocked ticks")
+    parser.add_argument('--confidence', type=float, default=0.95)
+    parser.add_argument('--no-early-stopping', action='store_true')
+    args = parser.parse_args()
+
+    policies = {}
+    for spec in args.policies:
+        name, target = spec.split('=', 1)
+        module, function = target.split(':', 1)
+        policies[name] = getattr(importlib.import_module(module), function)
+    evaluation = evaluate(
+        policies, list(range(args.seeds)), workers=args.workers, confidence=args.confidence,
+        early_stopping=not args.no_early_stopping, width=args.width, height=args.height,
+        max_ticks=args.max_ticks, decision_interval=args.decision_interval,
+        gridlock_termination_ticks=args.gridlock_ticks,
+    )
+    print(evaluation.report())
+
+
+if __name__ == '__main__':
+    main()
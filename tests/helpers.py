@@ -0,0 +1,32 @@
+from nm_core.entities.car import Car
+
+RING = [(0, 0), (1, 0), (1, 1), (0, 1)]
+
+
+def build_ring_deadlock(sim):
+    # One-way ring fully packed: every car's target segment holds the next car
+    for i, tile in enumerate(RING):
+        sim.road_network.add_road(tile, RING[(i + 1) % 4])
+    for i in range(4):
+        path = [RING[(i + k) % 4] for k in range(4)]
+        car = Car(car_id=sim.traffic_manager.allocate_car_id(), start=path[0], destination=path[-1], path=path)
+        car.path_index = 1
+        sim.traffic_manager.add_car_to_simulation(car)
+
+
+def build_crossroad_jam(sim):
+    # The crossroad of test_traffic_jam.py: four flows through one intersection
+    for x in range(1, 18):
+        sim.road_network.add_road((x, 5), (x + 1, 5))
+        sim.road_network.add_road((x + 1, 5), (x, 5))
+    for y in range(1, 10):
+        sim.road_network.add_road((8, y), (8, y + 1))
+        sim.road_network.add_road((8, y + 1), (8, y))
+    sim.add_house((2, 5), color="red", car_limit=10)
+    sim.add_shopping_center((15, 5), color="red")
+    sim.add_house((16, 5), color="blue", car_limit=10)
+    sim.add_shopping_center((1, 5), color="blue")
+    sim.add_house((8, 2), color="green", car_limit=10)
+    sim.add_shopping_center((8, 9), color="green")
+    sim.add_house((8, 8), color="yellow", car_limit=10)
+    sim.add_shopping_center((8, 1), color="yellow")
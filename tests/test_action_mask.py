@@ -0,0 +1,63 @@
+import random
+
+import numpy as np
+
+from nm_common.actions import OP_ADD_ROAD, OP_NOOP, OP_REMOVE_ROAD
+from nm_core.simulation.action_mask import ActionMask
+from nm_core.simulation.core import SimulationCore
+
+
+def fresh_mask(sim):
+    mask = ActionMask(sim.map, sim.road_network)
+    mask.close()
+    return mask.flat
+
+
+def test_initial_mask_excludes_off_map_segments():
+    sim = SimulationCore(4, 3)
+    add, remove = sim.action_mask.mask
+    assert sim.action_mask.flat[0]
+    assert not remove.any()
+    assert not add[0, :, 0].any()  # Up from the top row
+    assert not add[:, 3, 1].any()  # Right from the last column
+    assert add[1, 1].all()
+
+
+def test_incremental_mask_matches_full_rebuild():
+    random.seed(0)
+    sim = SimulationCore(8, 6)
+    for _ in range(200):
+        if random.random() < 0.1:
+            sim.map.add_tile(random.randrange(8), random.randrange(6), random.choice((0, 2)))
+            continue
+        op = random.choice((OP_ADD_ROAD, OP_REMOVE_ROAD))
+        row = (op, random.randrange(8), random.randrange(6), random.randrange(4))
+        if sim.action_mask.is_valid(op, *row[1:]):
+            assert sim.apply_actions([row]) == 1
+        sim.action_mask.refresh()
+        np.testing.assert_array_equal(sim.action_mask.flat, fresh_mask(sim))
+
+
+def test_building_pairs_and_reset():
+    sim = SimulationCore(5, 5)
+    sim.map.add_tile(1, 1, 2)
+    sim.map.add_tile(2, 1, 2)
+    assert not sim.action_mask.is_valid(OP_ADD_ROAD, 1, 1, 1)
+    assert sim.action_mask.is_valid(OP_ADD_ROAD, 1, 1, 2)
+
+    sim.apply_actions([(OP_ADD_ROAD, 1, 1, 2)])
+    assert sim.action_mask.is_valid(OP_REMOVE_ROAD, 1, 1, 2) and not sim.action_mask.is_valid(OP_ADD_ROAD, 1, 1, 2)
+
+    sim.reset()
+    sim.action_mask.refresh()
+    np.testing.assert_array_equal(sim.action_mask.flat, fresh_mask(sim))
+    assert sim.action_mask.is_valid(OP_ADD_ROAD, 1, 1, 1)
+
+
+def test_is_valid_takes_op_codes():
+    sim = SimulationCore(5, 5)
+    mask = sim.action_mask
+    assert mask.is_valid(OP_ADD_ROAD, 1, 1, 1) and not mask.is_valid(OP_REMOVE_ROAD, 1, 1, 1)
+    sim.apply_actions([(OP_ADD_ROAD, 1, 1, 1)])
+    assert not mask.is_valid(OP_ADD_ROAD, 1, 1, 1) and mask.is_valid(OP_REMOVE_ROAD, 1, 1, 1)
+    assert not mask.is_valid(OP_NOOP, 1, 1, 1) and not mask.is_valid(3, 1, 1, 1)
@@ -0,0 +1,78 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from nm_core.simulation.core import SimulationCore
+from nm_env.async_env import ExecutorEnvironment, SubprocessEnvironment, reset_all, step_all
+
+
+class CorridorEnv:
+    """Minimal synchronous environment over SimulationCore."""
+
+    def __init__(self):
+        self.sim = None
+
+    def reset(self):
+        self.sim = SimulationCore(10, 10)
+        self.sim.pin_generation_interval = 0
+        for x in range(9):
+            self.sim.road_network.add_road((x, 5), (x + 1, 5))
+        self.sim.spawn_car((0, 5), (9, 5))
+        world_state, _, _, _ = self.sim.step(None, dt=0.0)  # Observe without running a tick
+        return world_state
+
+    def step(self, action):
+        world_state, reward, done, info = self.sim.step(action)
+        return world_state, reward, done, info
+
+
+def car_positions(world_state):
+    return [car['position'] for car in world_state.cars]
+
+
+def test_subprocess_envs_step_in_parallel():
+    async def run():
+        envs = [SubprocessEnvironment(CorridorEnv, observe=car_positions) for _ in range(3)]
+        try:
+            assert await reset_all(envs) == [[(0, 5)]] * 3
+            for _ in range(3):
+                results = await step_all(envs, [None] * len(envs))
+            return results, await envs[0].call('reset')
+        finally:
+            for env in envs:
+                await env.close()
+
+    results, reset_value = asyncio.run(run())
+    assert [observation for observation, _, _, _ in results] == [[(2, 5)]] * 3
+    assert reset_value.time_elapsed == 0.0
+
+
+def test_pipelined_steps_return_in_order():
+    async def run():
+        env = SubprocessEnvironment(CorridorEnv, observe=car_positions)
+        try:
+            await env.reset()
+            for _ in range(4):
+                env.step_send(None)
+            return [(await env.step_recv())[0] for _ in range(4)]
+        finally:
+            await env.close()
+
+    observations = asyncio.run(run())
+    assert observations == [[(0, 5)], [(1, 5)], [(2, 5)], [(3, 5)]]
+
+
+def test_executor_env_matches_direct_stepping():
+    async def run():
+        env = ExecutorEnvironment(CorridorEnv())
+        await env.reset()
+        results = await step_all([env], [None])
+        return car_positions(results[0][0])
+
+    assert asyncio.run(run()) == [(0, 5)]
+
+
+def test_executor_env_rejects_process_pools():
+    with ProcessPoolExecutor(1) as pool, pytest.raises(ValueError, match="SubprocessEnvironment"):
+        ExecutorEnvironment(CorridorEnv(), pool)
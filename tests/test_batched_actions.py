@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from nm_common.actions import (
+    Action, encode_action, encode_actions, decode_action, OP_NOOP, OP_ADD_ROAD, OP_REMOVE_ROAD
+)
+from nm_clone.game import MiniMotorwaysGame
+from nm_core.simulation.core import SimulationCore
+
+
+def corridor_rows(y, x_start, x_end):
+    # Two-way road along row y, as (op, x, y, direction) rows (direction 1 = right, 3 = left)
+    rows = []
+    for x in range(x_start, x_end):
+        rows.append((OP_ADD_ROAD, x, y, 1))
+        rows.append((OP_ADD_ROAD, x + 1, y, 3))
+    return np.array(rows, dtype=np.int32)
+
+
+def test_encoding_round_trip():
+    action = Action(action_type='remove_road', params={'start': (3, 4), 'end': (3, 3)})
+    row = encode_action(action)
+    assert row.tolist() == [OP_REMOVE_ROAD, 3, 4, 0]
+
+    decoded = decode_action(row)
+    assert decoded.action_type == 'remove_road' and decoded.params == action.params
+    assert decode_action((OP_NOOP, 0, 0, 0)) is None
+
+    with pytest.raises(ValueError):
+        encode_action(Action(action_type='add_road', params={'start': (0, 0), 'end': (2, 0)}))
+
+
+def test_batch_applies_with_one_version_bump_and_no_tick():
+    sim = SimulationCore(10, 8)
+    version = sim.road_network.version
+
+    assert sim.apply_actions(corridor_rows(5, 1, 8)) == 14
+    assert sim.road_network.version == version + 1
+    assert sim.time_elapsed == 0
+    assert sim.road_network.find_path((1, 5), (8, 5)) is not None
+
+    # Rows apply in order: an add followed by a remove of the same edge cancels out
+    rows = encode_actions([
+        Action(action_type='add_road', params={'start': (2, 2), 'end': (2, 3)}),
+        Action(action_type='remove_road', params={'start': (2, 2), 'end': (2, 3)}),
+    ])
+    assert sim.apply_actions(rows) == 0
+    assert sim.road_network.version == version + 1
+
+
+def test_invalid_row_rejects_the_whole_batch():
+    sim = SimulationCore(10, 8)
+    rows = corridor_rows(5, 1, 4).tolist() + [[OP_ADD_ROAD, 9, 5, 1]]  # Leaves the map
+
+    with pytest.raises(ValueError):
+        sim.apply_actions(rows)
+    assert not sim.road_network.roads
+
+
+def test_step_skips_invalid_edits_and_reports_them():
+    sim = SimulationCore(10, 8)
+    rows = corridor_rows(5, 1, 4).tolist() + [[OP_ADD_ROAD, 9, 5, 1]]
+
+    _, _, done, info = sim.step(rows)
+    assert not done and info['invalid_actions'] == [[OP_ADD_ROAD, 9, 5, 1]]
+    assert sim.road_network.find_path((1, 5), (4, 5)) is not None
+
+    jump = Action(action_type='add_road', params={'start': (0, 0), 'end': (2, 0)})
+    _, _, _, info = sim.step(jump)
+    assert info['invalid_actions'] == [jump]
+    assert 'invalid_actions' not in sim.step(corridor_rows(6, 1, 2))[3]
+
+
+def test_batched_removal_reroutes_cars():
+    sim = SimulationCore(10, 8)
+    sim.pin_generation_interval = 0
+    sim.apply_actions(np.concatenate([corridor_rows(1, 1, 6), corridor_rows(3, 1, 6)]))
+    sim.apply_actions([(OP_ADD_ROAD, 1, 1, 2), (OP_ADD_ROAD, 1, 2, 2), (OP_ADD_ROAD, 6, 3, 0), (OP_ADD_ROAD, 6, 2, 0)])
+    sim.spawn_car((1, 1), (6, 1))
+    sim.step(None)
+
+    sim.step([(OP_REMOVE_ROAD, 3, 1, 1), (OP_REMOVE_ROAD, 4, 1, 1)])
+    car = next(iter(sim.traffic_manager.cars.values()))
+    assert (1, 2) in car.path
+
+    for _ in range(20):
+        sim.step(None)
+    assert not sim.traffic_manager.cars
+
+
+def test_game_drag_between_buildings_is_refused():
+    game = MiniMotorwaysGame(10, 8)
+    for position in ((2, 2), (3, 2)):
+        game.sim.add_house(position)
+        game.sim.map.add_tile(*position, 2)  # Building tile, as growth places it
+
+    assert not game.add_road((2, 2), (3, 2))
+    assert not game.add_road((3, 2), (5, 2))
+    assert game.add_road((3, 2), (3, 3)) and game.remove_road((3, 2), (3, 3))
+    assert not game.sim.road_network.roads
@@ -0,0 +1,42 @@
+from nm_core.simulation.core import SimulationCore
+
+
+def build_street(sim, y, x_end):
+    for x in range(x_end):
+        sim.road_network.add_road((x, y), (x + 1, y))
+        sim.road_network.add_road((x + 1, y), (x, y))
+
+
+def test_indexes_follow_added_buildings():
+    sim = SimulationCore(10, 6)
+    sim.add_house((1, 1), color="red")
+    sim.add_house((2, 1), color="blue")
+    sim.add_house((3, 1), color="red")
+    sim.add_shopping_center((8, 1), color="blue")
+
+    manager = sim.traffic_manager
+    assert manager.house_at[(2, 1)] is sim.houses[1]
+    assert [house.location for house in manager.houses_by_color[sim.houses[0].color_id]] == [(1, 1), (3, 1)]
+    assert manager.shopping_center_at[((8, 1), sim.shopping_centers[0].color_id)] is sim.shopping_centers[0]
+
+    sim.reset()
+    assert not manager.house_at and not manager.houses_by_color and not manager.shopping_center_at
+
+
+def test_round_trips_use_the_matching_buildings():
+    sim = SimulationCore(10, 6)
+    sim.pin_generation_interval = 0
+    build_street(sim, 2, 9)
+    sim.add_house((0, 2), color="red", car_limit=1)
+    sim.add_house((1, 2), color="blue", car_limit=1)
+    sim.add_shopping_center((8, 2), color="blue")
+    sim.add_shopping_center((9, 2), color="red")
+
+    for sc in sim.shopping_centers:
+        sc.generate_pin()
+    for _ in range(60):
+        sim.step(None)
+
+    assert [sc.fulfilled_counter for sc in sim.shopping_centers] == [1, 1]
+    assert [house.idle_count for house in sim.houses] == [1, 1]
+    assert not sim.traffic_manager.cars
@@ -0,0 +1,40 @@
+from nm_core.simulation.core import SimulationCore
+
+
+def build_corridor():
+    sim = SimulationCore(12, 8)
+    sim.pin_generation_interval = 0
+    for x in range(2, 10):
+        sim.road_network.add_road((x, 5), (x + 1, 5))
+        sim.road_network.add_road((x + 1, 5), (x, 5))
+    sim.add_house((2, 5), color="red", car_limit=1)
+    sim.add_shopping_center((10, 5), color="red")
+    return sim
+
+
+def test_routes_are_shared_until_roads_change():
+    sim = build_corridor()
+    route = sim.road_network.find_path((2, 5), (10, 5))
+    assert sim.road_network.find_path((2, 5), (10, 5)) is route
+
+    sim.road_network.add_road((5, 5), (5, 6))
+    assert sim.road_network.find_path((2, 5), (10, 5)) is not route
+
+
+def test_round_trips_recycle_the_same_car():
+    sim = build_corridor()
+    house = sim.houses[0]
+    seen = set()
+
+    for _ in range(3):
+        sim.shopping_centers[0].generate_pin()
+        sim.step(None)
+        assert house.idle_count == 0
+        seen.update(id(car) for car in sim.traffic_manager.cars.values())
+        for _ in range(40):
+            sim.step(None)
+        assert house.idle_count == 1
+        assert len(house.idle_cars) == 1
+
+    assert len(seen) == 1
+    assert sim.shopping_centers[0].fulfilled_counter == 3
@@ -0,0 +1,68 @@
+import random
+
+import numpy as np
+
+from nm_common.actions import OP_ADD_ROAD, OP_REMOVE_ROAD
+from nm_core.simulation.changes import ChangeTracker
+from nm_core.simulation.core import SimulationCore
+from nm_core.simulation.road_network import RoadNetworkManager
+from nm_env.gym_env import NeuroMotorwaysEnv
+
+
+def test_subscribers_consume_independently():
+    sim = SimulationCore(6, 4)
+    first = sim.changes.subscribe()
+    second = sim.changes.subscribe()
+    assert first.consume()[0]  # A new subscriber starts fully dirty
+    second.consume()
+
+    tile_version, road_version = sim.changes.tile_version, sim.changes.road_version
+    sim.map.add_tile(1, 1, 2)
+    sim.apply_actions([(OP_ADD_ROAD, 2, 2, 1), (OP_ADD_ROAD, 3, 2, 3)])
+    assert sim.changes.tile_version == tile_version + 1
+    assert sim.changes.road_version == road_version + 1
+
+    full, tiles, edges = first.consume()
+    assert not full and tiles == {(1, 1)} and edges == {((2, 2), (3, 2)), ((3, 2), (2, 2))}
+    assert not first.dirty
+
+    sim.map.remove_tile(0, 0)
+    assert second.consume()[1] == {(1, 1), (0, 0)}
+
+    sim.reset()
+    assert first.consume()[0]
+
+
+def test_removed_roads_only_drop_routes_through_them():
+    network = RoadNetworkManager(ChangeTracker())
+    for x in range(4):
+        network.add_road((x, 0), (x + 1, 0))
+        network.add_road((x, 1), (x + 1, 1))
+    upper = network.find_path((0, 0), (4, 0))
+    lower = network.find_path((0, 1), (4, 1))
+
+    network.remove_road((2, 0), (3, 0))
+    assert network.find_path((0, 1), (4, 1)) is lower
+    assert network.find_path((0, 0), (4, 0)) is None
+
+    network.add_road((2, 0), (3, 0))
+    assert network.find_path((0, 0), (4, 0)) == upper
+
+
+def test_incremental_observation_matches_full_encoding():
+    random.seed(4)
+    env = NeuroMotorwaysEnv(10, 8, tensor_observations=True)
+    env.reset(seed=4)
+    reference = NeuroMotorwaysEnv(10, 8)
+    for _ in range(60):
+        op = random.choice((OP_ADD_ROAD, OP_REMOVE_ROAD))
+        row = (op, random.randrange(10), random.randrange(8), random.randrange(4))
+        if env.sim.action_mask.is_valid(op, *row[1:]):
+            env.sim.apply_actions([row])
+        obs = env.step(None)[0]
+
+        # Encode the same simulation from scratch
+        reference.game = env.game
+        reference._map_changes = env.sim.changes.subscribe()
+        np.testing.assert_array_equal(obs, reference.encode_observation())
+        env.sim.changes.unsubscribe(reference._map_changes)
@@ -0,0 +1,66 @@
+from nm_core.simulation.core import SimulationCore
+from nm_core.simulation.road_network import RoadNetworkManager
+
+
+def add_bi_road(network, p1, p2):
+    network.add_road(p1, p2)
+    network.add_road(p2, p1)
+
+
+def build_two_route_network(network=None):
+    # Short route along y=0 and a longer detour through y=2
+    if network is None:
+        network = RoadNetworkManager()
+    for x in range(4):
+        add_bi_road(network, (x, 0), (x + 1, 0))
+    add_bi_road(network, (0, 0), (0, 1))
+    add_bi_road(network, (0, 1), (0, 2))
+    for x in range(4):
+        add_bi_road(network, (x, 2), (x + 1, 2))
+    add_bi_road(network, (4, 2), (4, 1))
+    add_bi_road(network, (4, 1), (4, 0))
+    return network
+
+
+def test_find_paths_to_matches_find_path():
+    network = build_two_route_network()
+    sources = [(0, 0), (2, 2), (4, 1)]
+    paths = network.find_paths_to((4, 0), sources)
+
+    for source in sources:
+        assert paths[source][0] == source
+        assert paths[source][-1] == (4, 0)
+        assert len(paths[source]) == len(network.find_path(source, (4, 0)))
+
+
+def test_congestion_costs_divert_routes():
+    network = build_two_route_network()
+    network.set_congestion_routing(True)
+    assert network.find_path((0, 0), (4, 0))[1] == (1, 0)
+
+    # Heavy load on the short route makes the detour cheaper
+    network.apply_congestion({((1, 0), (2, 0)): 10.0})
+    assert network.find_path((0, 0), (4, 0))[1] == (0, 1)
+
+    # Once the load disappears the short route is restored
+    network.apply_congestion({})
+    assert network.find_path((0, 0), (4, 0))[1] == (1, 0)
+
+
+def test_congestion_refresh_reroutes_cars():
+    sim = SimulationCore(6, 4, congestion_routing=True)
+    sim.pin_generation_interval = 0
+    build_two_route_network(sim.road_network)
+    sim.traffic_manager.congestion_update_interval = 1
+
+    for _ in range(3):
+        sim.spawn_car((0, 0), (4, 0))
+
+    peak_cost = 0.0
+    for _ in range(20):
+        sim.step(None)
+        peak_cost = max(peak_cost, sim.road_network.graph.edges[(1, 0), (2, 0)]['cost'])
+
+    # Every car still reaches its destination and the busy segment was penalised on the way
+    assert not sim.traffic_manager.cars
+    assert peak_cost > sim.road_network.graph.edges[(1, 0), (2, 0)]['weight']
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from nm_env.dataset import TrajectoryDataset, TrajectoryWriter
+from nm_env.gym_env import NeuroMotorwaysEnv
+
+
+def test_written_transitions_read_back_through_mmap(tmp_path):
+    observations = np.arange(250 * 6, dtype=np.float32).reshape(250, 2, 3)
+    with TrajectoryWriter(str(tmp_path), shard_size=100) as writer:
+        for t in range(250):
+            writer.add(observations[t], t * 2, reward=t / 10, done=t % 50 == 49)
+    assert len(writer.shards) == 3 and writer.shards[-1]['length'] == 50
+
+    dataset = TrajectoryDataset(str(tmp_path))
+    assert len(dataset) == 250
+    assert isinstance(dataset.shards[1]['observation'], np.memmap)
+
+    batch = dataset.get([249, 0, 120, 99, 100])
+    assert np.array_equal(batch['observation'], observations[[249, 0, 120, 99, 100]])
+    assert batch['action'].tolist() == [498, 0, 240, 198, 200]
+    assert batch['done'].tolist() == [True, False, False, True, False]
+    assert np.allclose(batch['reward'], [24.9, 0.0, 12.0, 9.9, 10.0])
+
+    sample = dataset.sample(64, np.random.default_rng(0), next_observations=True)
+    rows = sample['observation'][:, 0, 0].astype(int) // 6
+    assert np.array_equal(sample['action'], rows * 2)
+    assert np.array_equal(sample['next_observation'], observations[rows + 1])
+
+
+def test_empty_writer_leaves_an_empty_dataset(tmp_path):
+    TrajectoryWriter(str(tmp_path)).close()
+    dataset = TrajectoryDataset(str(tmp_path))
+    assert len(dataset) == 0 and not dataset.shards
+    with pytest.raises(ValueError):
+        dataset.sample(4)
+
+
+def test_env_rollout_to_dataset(tmp_path):
+    env = NeuroMotorwaysEnv(10, 8, tensor_observations=True, max_steps=20)
+    observation = env.reset(seed=2).copy()  # The env reuses its observation buffer
+    with TrajectoryWriter(str(tmp_path), shard_size=8, background=False) as writer:
+        done = False
+        while not done:
+            next_observation, reward, done, _ = env.step(0)
+            writer.add(observation, 0, reward, done)
+            observation = next_observation.copy()
+    dataset = TrajectoryDataset(str(tmp_path))
+    assert len(dataset) == 20 and dataset.columns['observation']['shape'] == [7, 8, 10]
+    assert dataset.get([19])['done'][0]
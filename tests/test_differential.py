@@ -0,0 +1,40 @@
+import numpy as np
+
+from nm_common.actions import OP_REMOVE_ROAD
+from nm_core.simulation.core import SimulationCore
+from nm_tools.differential import (
+    ENGINES, Repro, find_divergence, fuzz, random_actions, random_scenario, reference_engine
+)
+
+
+class IgnoresRemovals(SimulationCore):
+    def apply_actions(self, batch):
+        rows = np.asarray(batch).reshape(-1, 4)
+        return super().apply_actions(rows[rows[:, 0] != OP_REMOVE_ROAD])
+
+
+def test_identical_engines_agree():
+    assert fuzz(reference_engine, reference_engine, runs=2, width=12, height=10, ticks=100) is None
+
+
+def test_queue_engine_matches_the_reference():
+    assert fuzz(reference_engine, ENGINES['segment_queues'], runs=4, width=16, height=12, ticks=200) is None
+
+
+def test_first_divergence_comes_with_a_shrunk_repro(tmp_path):
+    rng = np.random.default_rng(4)
+    scenario = random_scenario(14, 10, rng)
+    actions = random_actions(scenario, 150, rng, rate=0.3)
+    divergence = find_divergence(reference_engine, IgnoresRemovals, scenario, actions, 150)
+
+    assert divergence is not None and divergence.field == 'edits'
+    repro = divergence.repro
+    assert repro.ticks == divergence.tick
+    assert len(repro.actions) < len(actions)
+    assert OP_REMOVE_ROAD in repro.actions[max(repro.actions)][:, 0]
+    assert 'Divergence at tick' in str(divergence)
+
+    repro.save(tmp_path / "repro.npz")
+    loaded = Repro.load(tmp_path / "repro.npz")
+    assert loaded.run(reference_engine, IgnoresRemovals)[:2] == (divergence.tick, divergence.field)
+
@@ -0,0 +1,83 @@
+import pytest
+
+from nm_common.actions import OP_ADD_ROAD
+from nm_common.constants import DIRECTION_INDEX
+from tests.helpers import build_ring_deadlock
+from nm_tools.evaluation import (
+    CENTER_FAILED, GRIDLOCK, Summary, evaluate, intervals_separate, run_episode, t_critical
+)
+
+SETTINGS = dict(width=12, height=10, max_ticks=1500, decision_interval=30)
+
+
+def idle_policy(sim):
+    return None
+
+
+def connect_policy(sim):
+    """Lays two-way L-shaped roads from every house to the shopping centers of its color."""
+    rows = []
+    for house in sim.houses:
+        for sc in sim.shopping_centers:
+            if sc.color_id != house.color_id:
+                continue
+            (x, y), (tx, ty) = house.location, sc.location
+            path = [(x, y)]
+            while x != tx:
+                x += 1 if tx > x else -1
+                path.append((x, y))
+            while y != ty:
+                y += 1 if ty > y else -1
+                path.append((x, y))
+            for a, b in zip(path, path[1:]):
+                for start, end in ((a, b), (b, a)):
+                    direction = DIRECTION_INDEX[end[0] - start[0], end[1] - start[1]]
+                    if sim.action_mask.is_valid(OP_ADD_ROAD, *start, direction):
+                        rows.append((OP_ADD_ROAD, *start, direction))
+    return rows or None
+
+
+def deadlock_policy(sim):
+    """Packs a one-way ring with cars that all wait for each other."""
+    if not sim.road_network.roads:
+        build_ring_deadlock(sim)
+    return None
+
+
+def test_student_t_intervals():
+    assert t_critical(0.95, 1) == pytest.approx(12.706, abs=1e-3)
+    assert t_critical(0.95, 10) == pytest.approx(2.228, abs=1e-3)
+    summary = Summary([1.0, 2.0, 3.0])
+    assert summary.mean == 2.0 and summary.low == pytest.approx(2 - 4.303 / 3 ** 0.5, abs=1e-3)
+    assert intervals_separate([Summary([1, 2, 3]), Summary([10, 11, 12])])
+    assert not intervals_separate([Summary([1, 2, 3]), Summary([2, 3, 4])])
+
+
+def test_episode_reports_score_survival_and_cause():
+    idle = run_episode(idle_policy, seed=1, **SETTINGS)
+    assert idle.score == 0 and idle.cause == CENTER_FAILED and idle.ticks < SETTINGS['max_ticks']
+    connected = run_episode(connect_policy, seed=1, **SETTINGS)
+    assert connected.score > 0 and connected.ticks > idle.ticks
+    assert run_episode(connect_policy, seed=1, **SETTINGS).score == connected.score
+
+
+def test_gridlock_termination_is_reported():
+    result = run_episode(deadlock_policy, seed=1, gridlock_termination_ticks=10, **SETTINGS)
+    assert result.cause == GRIDLOCK and result.ticks == 10
+    assert run_episode(deadlock_policy, seed=1, **SETTINGS).cause == CENTER_FAILED
+
+
+def test_pool_evaluation_stops_once_intervals_separate():
+    policies = {'idle': idle_policy, 'connect': connect_policy}
+    seeds = list(range(40))
+    evaluation = evaluate(policies, seeds, workers=2, min_episodes=3, **SETTINGS)
+    assert evaluation.stopped_early
+    played = len(evaluation.results['idle'])
+    assert 3 <= played < len(seeds) and len(evaluation.results['connect']) == played
+    scores = evaluation.summary()
+    assert scores['idle'].high < scores['connect'].low
+    assert evaluation.causes()['idle'] == {CENTER_FAILED: played}
+
+    # The finished seed prefix decides, so an inline run stops at the same point
+    inline = evaluate(policies, seeds, workers=0, min_episodes=3, **SETTINGS)
+    assert [r.score for r in inline.results['connect']] == [r.score for r in evaluation.results['connect']]
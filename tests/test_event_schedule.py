@@ -0,0 +1,81 @@
+import random
+
+from nm_clone.game import MiniMotorwaysGame
+from nm_core.simulation.core import SimulationCore
+from nm_core.simulation.events import EventScheduler
+
+
+def test_scheduler_orders_and_cancels_events():
+    scheduler = EventScheduler()
+    fired = []
+    scheduler.schedule(5, fired.append, 'late')
+    scheduler.schedule(1, fired.append, 'first')
+    scheduler.schedule(1, fired.append, 'second')
+    scheduler.schedule(3, fired.append, 'cancelled').cancel()
+
+    assert scheduler.run_due(0) == 0
+    assert scheduler.run_due(3) == 2
+    assert fired == ['first', 'second']
+    assert scheduler.next_time() == 5
+
+
+def test_global_interval_matches_tick_count():
+    sim = SimulationCore(10, 10)
+    sim.add_shopping_center((5, 5), color="red")
+    for _ in range(25):
+        sim.step(None)
+    # Pins at ticks 10 and 20
+    assert sim.shopping_centers[0].pin_counter == 2
+
+
+def test_poisson_centers_leave_the_global_interval():
+    random.seed(3)
+    sim = SimulationCore(10, 10)
+    sim.add_shopping_center((2, 2), color="red")
+    sim.add_shopping_center((7, 7), color="blue", pin_rate=0.5)
+    for _ in range(40):
+        sim.step(None)
+
+    assert sim.shopping_centers[0].pin_counter == 3  # Every global pin went to the interval center
+    assert sim.shopping_centers[1].pin_counter > 5
+
+
+def test_fast_forward_matches_stepping():
+    def build():
+        random.seed(7)
+        sim = SimulationCore(10, 10)
+        sim.add_shopping_center((2, 2), color="red")
+        sim.add_shopping_center((7, 7), color="blue", pin_rate=0.05)
+        return sim
+
+    stepped = build()
+    for _ in range(600):
+        stepped.step(None)
+
+    skipped = build()
+    assert skipped.fast_forward(600) == 600
+
+    assert skipped.time_elapsed == stepped.time_elapsed
+    for a, b in zip(skipped.shopping_centers, stepped.shopping_centers):
+        assert a.pin_counter == b.pin_counter
+        assert abs(a.failure_timer - b.failure_timer) < 1e-6
+
+
+def test_fast_forward_stops_at_failure_deadline():
+    sim = SimulationCore(10, 10)
+    sim.pin_generation_interval = 0
+    sim.add_shopping_center((2, 2), color="red")
+    for _ in range(6):
+        sim.shopping_centers[0].generate_pin()
+
+    advanced = sim.fast_forward(100000)
+    assert sim.is_game_over
+    assert advanced < 100000
+
+
+def test_growth_spawns_are_scheduled():
+    random.seed(1)
+    game = MiniMotorwaysGame(20, 15)
+    buildings = len(game.sim.houses) + len(game.sim.shopping_centers)
+    game.sim.fast_forward(int(game.growth_manager.growth_interval * 15) + 1)
+    assert len(game.sim.houses) + len(game.sim.shopping_centers) > buildings
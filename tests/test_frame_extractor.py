@@ -0,0 +1,63 @@
+import random
+
+import numpy as np
+
+from nm_clone.renderer import OffscreenRenderer
+from nm_common.constants import DIRECTIONS, GRID_SIZE
+from nm_core.simulation.core import SimulationCore
+from nm_cv.extractor import FrameExtractor, label_components
+from tests.helpers import build_crossroad_jam
+
+
+def test_label_components_merges_runs_across_rows():
+    mask = np.array([
+        [1, 0, 1, 0, 0],
+        [1, 1, 1, 0, 1],
+        [0, 0, 0, 1, 0],  # Touches (4, 1) only diagonally
+        [1, 1, 0, 1, 0],
+    ], dtype=bool)
+    count, labels, rows, starts, ends = label_components(mask)
+    assert count == 4
+    sizes = sorted(np.bincount(labels, ends - starts).tolist())
+    assert sizes == [1, 2, 2, 5]
+    assert label_components(np.zeros((3, 3), dtype=bool))[0] == 0
+
+
+def test_extractor_recovers_the_rendered_world():
+    random.seed(1)
+    sim = SimulationCore(20, 12)
+    sim.pin_generation_interval = 0
+    build_crossroad_jam(sim)
+    for sc in sim.shopping_centers:
+        for _ in range(4):
+            sc.generate_pin()
+    for _ in range(40):
+        sim.step(None)
+    sim.shopping_centers[0].generate_pin()
+
+    frame = OffscreenRenderer(20, 12, tile_size=GRID_SIZE).render(sim)
+    extractor = FrameExtractor(20, 12)
+    world_state = extractor.extract(frame)
+
+    sim.map.refresh()
+    truth = sim.map.cells
+    assert np.array_equal(extractor.cells['kind'], truth['kind'])
+    buildings = truth['kind'] > 0
+    assert np.array_equal(extractor.cells['color'][buildings], truth['color'][buildings])
+
+    # Frames show roads without their direction
+    for d, (dx, dy) in enumerate(DIRECTIONS):
+        for x, y in zip(*np.nonzero(truth['roads'] & (1 << d))[::-1]):
+            assert extractor.cells['roads'][y, x] & (1 << d)
+            assert extractor.cells['roads'][y + dy, x + dx] & (1 << (d + 2) % 4)
+    assert world_state.map_data[5, 3] == 1 and world_state.map_data[5, 2] == 2
+
+    pins = {d['location']: d['pins'] for d in world_state.destinations}
+    assert pins == {sc.location: len(sc.pins) for sc in sim.shopping_centers}
+
+    def describe(cars):
+        return sorted((car['position'], car['color'], car['waiting'], car['next_position']) for car in cars)
+
+    on_road = [car for car in sim.get_world_state().cars if not buildings[car['position'][1], car['position'][0]]]
+    assert len(on_road) >= 5
+    assert describe(world_state.cars) == describe(on_road)
@@ -0,0 +1,47 @@
+from nm_core.simulation.core import SimulationCore
+from nm_core.simulation.gridlock import GridlockDetector
+from tests.helpers import build_ring_deadlock
+
+
+def test_detector_finds_cycles_and_ignores_chains():
+    detector = GridlockDetector()
+    detector.set_wait('a', 'b')
+    detector.set_wait('b', 'c')
+    detector.set_wait('c', 'a')
+    detector.set_wait('d', 'a')  # Queued behind the cycle, but not part of it
+    detector.set_wait('e', 'f')
+
+    cycles = detector.detect()
+    assert len(cycles) == 1
+    assert sorted(cycles[0]) == ['a', 'b', 'c']
+    assert detector.metrics()['deadlocked_cars'] == 3
+
+    detector.clear_wait('b')
+    assert detector.detect() == []
+    assert detector.gridlock_ticks == 0
+
+
+def test_ring_deadlock_is_reported_and_terminates_episode():
+    sim = SimulationCore(4, 4)
+    sim.pin_generation_interval = 0
+    sim.gridlock_termination_ticks = 5
+    build_ring_deadlock(sim)
+
+    _, _, done, info = sim.step(None)
+    assert info['gridlock'] == {'deadlocked_cars': 4, 'cycle_sizes': [4], 'gridlock_ticks': 1}
+    assert not done
+
+    for _ in range(4):
+        _, _, done, _ = sim.step(None)
+    assert done
+
+
+def test_yield_policy_breaks_deadlock():
+    sim = SimulationCore(4, 4)
+    sim.pin_generation_interval = 0
+    sim.traffic_manager.gridlock_policy = 'yield'
+    build_ring_deadlock(sim)
+
+    for _ in range(20):
+        sim.step(None)
+    assert not sim.traffic_manager.cars
@@ -0,0 +1,53 @@
+import numpy as np
+
+from nm_common.interface import Environment
+from nm_env.gym_env import NeuroMotorwaysEnv, OBSERVATION_CHANNELS
+
+
+def test_reset_reuses_simulation_objects():
+    env = NeuroMotorwaysEnv(10, 8)
+    sim = env.sim
+    road_network = sim.road_network
+    traffic_manager = sim.traffic_manager
+
+    env.reset(seed=1)
+    sim.road_network.add_road((1, 1), (2, 1))
+    for _ in range(30):
+        env.step(None)
+    env.reset(seed=1)
+
+    assert isinstance(env, Environment)
+    assert env.sim is sim
+    assert sim.road_network is road_network and sim.traffic_manager is traffic_manager
+    assert not road_network.roads
+    assert sim.time_elapsed == 0
+    assert sim.shopping_centers and sim.houses
+
+
+def test_seeded_resets_replay_the_same_episode():
+    env = NeuroMotorwaysEnv(10, 8)
+    layouts = []
+    for _ in range(2):
+        env.reset(seed=7)
+        layouts.append([b.location for b in env.sim.houses + env.sim.shopping_centers])
+    assert layouts[0] == layouts[1]
+
+
+def test_tensor_observation_and_flat_actions():
+    env = NeuroMotorwaysEnv(10, 8, tensor_observations=True, max_steps=3)
+    obs = env.reset(seed=3)
+    assert obs.shape == env.observation_space['shape'] == (len(OBSERVATION_CHANNELS), 8, 10)
+    assert obs[OBSERVATION_CHANNELS.index('shopping_centers')].sum() == 1
+
+    # add_road from (4, 2) going right
+    index = 1 + np.ravel_multi_index((0, 2, 4, 1), env.action_space['shape'])
+    obs, reward, done, info = env.step(index)
+    assert env.sim.road_network.is_connected((4, 2), (5, 2))
+    assert env.action_masks().shape == (env.action_space['n'],)
+    assert not env.action_masks()[index]
+    assert obs[OBSERVATION_CHANNELS.index('roads'), 2, 4] == 0.25
+    assert env.decode_action(1 + np.ravel_multi_index((0, 0, 0, 0), env.action_space['shape'])) is None
+
+    env.step(0)
+    _, _, done, info = env.step(0)
+    assert done and info['truncated']
@@ -0,0 +1,44 @@
+import pickle
+
+import numpy as np
+
+from nm_core.simulation.core import SimulationCore
+from nm_core.simulation.map import CELL_DTYPE, HOUSE, SHOPPING_CENTER
+
+
+def test_cells_pack_tiles_roads_and_buildings():
+    sim = SimulationCore(6, 4)
+    sim.add_house((1, 1), color="blue")
+    sim.add_shopping_center((4, 1), color="red")
+    sim.map.add_tile(1, 1, 2)
+    sim.road_network.add_road((1, 1), (2, 1))
+    sim.road_network.add_road((2, 1), (1, 1))
+    sim.road_network.add_road((2, 1), (2, 2))
+
+    cells = sim.map.snapshot()
+    assert cells.dtype == CELL_DTYPE and cells.dtype.itemsize == 6
+    assert sim.map.grid.base is not None and sim.map.grid[1, 1] == 2
+    assert cells['roads'][1, 2] == (1 << 3) | (1 << 2)  # Left and down
+    assert cells['roads'][1, 1] == 1 << 1
+    assert cells['kind'][1, 1] == HOUSE and cells['building'][1, 1] == 1
+    assert cells['kind'][1, 4] == SHOPPING_CENTER and cells['color'][1, 4] == sim.shopping_centers[0].color_id
+
+    sim.road_network.remove_road((2, 1), (2, 2))
+    sim.map.remove_tile(1, 1)
+    sim.map.refresh()
+    assert sim.map.cells['roads'][1, 2] == 1 << 3
+    assert sim.map.cells['kind'][1, 1] == 0 and sim.map.grid[1, 1] == 0
+
+    # Snapshots are independent copies that ship as plain bytes
+    restored = np.frombuffer(pickle.loads(pickle.dumps(cells.tobytes())), dtype=CELL_DTYPE).reshape(cells.shape)
+    assert np.array_equal(restored, cells)
+    assert not np.array_equal(restored, sim.map.cells)
+
+
+def test_reset_clears_every_layer():
+    sim = SimulationCore(5, 5)
+    sim.add_house((2, 2))
+    sim.road_network.add_road((2, 2), (3, 2))
+    sim.reset()
+    sim.map.refresh()
+    assert not sim.map.cells.view(np.uint8).any()
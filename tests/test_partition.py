@@ -0,0 +1,92 @@
+import numpy as np
+
+from nm_core.simulation.partition import PartitionedSimulation, neighbour_pairs, partition_grid
+from nm_core.simulation.road_network import RoadNetworkManager
+from nm_core.simulation.scenario import Scenario, generate_city
+from nm_core.simulation.traffic import TrafficFlowManager
+
+
+def test_partition_grid_and_mailbox_pairs():
+    owner = partition_grid(5, 4, 2, 2)
+    assert owner.shape == (4, 5)
+    assert owner[0, 0] == 0 and owner[0, 4] == 1 and owner[3, 0] == 2 and owner[3, 4] == 3
+    # Diagonal partitions share no edge, so they get no mailbox
+    assert neighbour_pairs(owner) == [(0, 1), (0, 2), (1, 0), (1, 3), (2, 0), (2, 3), (3, 1), (3, 2)]
+
+
+def crossing_scenario() -> Scenario:
+    """4x4 empty map with a road from the left and one from the top meeting at (2, 2)."""
+    roads = np.zeros((4, 4), dtype=np.uint8)
+    roads[2, 1] |= 1 << 1  # (1, 2) -> (2, 2)
+    roads[2, 2] |= 1 << 1  # (2, 2) -> (3, 2)
+    roads[1, 2] |= 1 << 2  # (2, 1) -> (2, 2)
+    roads[2, 2] |= 1 << 2  # (2, 2) -> (2, 3)
+    return Scenario(np.zeros((4, 4)), roads, [], [], pin_generation_interval=0)
+
+
+def place_car(ps, car_id, path):
+    """Puts a car on the road at path[0], about to step to path[1]."""
+    partition = ps._partitions[ps.owner[path[0][1], path[0][0]]]
+    route = partition.road_network.make_route(path)
+    car = partition.traffic.acquire_car(path[0], path[-1], route, car_id)
+    car.reroute(route)
+    partition.traffic.add_car_to_simulation(car)
+
+
+def test_cars_hand_off_between_regions():
+    left, right = [], []
+    for region, side in ((0, left), (1, right)):
+        network = RoadNetworkManager(tile_stride=4)
+        network.bulk_add_roads([((0, 0), (1, 0)), ((1, 0), (2, 0)), ((2, 0), (3, 0))])
+        traffic = TrafficFlowManager(network)
+        traffic.region = np.array([x // 2 == region for x in range(4)])
+        side.extend((network, traffic))
+    network, traffic = left
+    path = [(0, 0), (1, 0), (2, 0), (3, 0)]
+    traffic.add_car_to_simulation(traffic.acquire_car((0, 0), (3, 0), network.make_route(path), car_id=7))
+
+    for _ in range(2):  # Onto the road, then to (1, 0)
+        traffic.update()
+    traffic.move_cars()
+    assert traffic.departures == [7]
+    car = traffic.cars[7]
+    route = right[0].make_route(path[car.path_index - 1:])
+    assert right[1].admit_car(7, route, (3, 0), (0, 0), car.color_id, car.state) is None
+    traffic.end_tick(handed_over=[7])
+    right[1].end_tick()
+    assert not traffic.cars and right[1].cars[7].position == (2, 0)
+
+
+def test_border_conflicts_resolve_by_car_id():
+    for from_left, from_top in ((5, 3), (3, 5)):
+        with PartitionedSimulation(crossing_scenario(), 2, 2, processes=False) as ps:
+            place_car(ps, from_left, [(1, 2), (2, 2), (3, 2)])
+            place_car(ps, from_top, [(2, 1), (2, 2), (2, 3)])
+            _, _, info = ps.step()
+            cars = {car['car_id']: car for car in ps.get_cars()}
+
+        winner, loser = min(from_left, from_top), max(from_left, from_top)
+        assert info['handoffs'] == 1
+        assert cars[winner]['position'] == (2, 2) and not cars[winner]['waiting']
+        assert cars[loser]['previous_position'] == cars[loser]['position'] and cars[loser]['waiting']
+
+
+def run_city(processes: bool, ticks: int = 150):
+    scenario = generate_city(32, 24, seed=3, pin_generation_interval=2)
+    with PartitionedSimulation(scenario, 2, 2, processes=processes) as ps:
+        handoffs = 0
+        for _ in range(ticks):
+            _, _, info = ps.step()
+            handoffs += info['handoffs']
+        cars = [(car['car_id'], car['position'], car['waiting']) for car in ps.get_cars()]
+        parked = sum(house.idle_count for house in ps.sim.houses)
+        fleet = sum(house.car_count for house in ps.sim.houses)
+        return ps.score, handoffs, cars, parked, fleet
+
+
+def test_processes_match_inline_run():
+    inline = run_city(processes=False)
+    score, handoffs, cars, parked, fleet = inline
+    assert score > 0 and handoffs > 0
+    assert len(cars) + parked == fleet  # Every car is on exactly one partition or parked
+    assert run_city(processes=True) == inline
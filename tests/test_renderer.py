@@ -0,0 +1,43 @@
+import numpy as np
+
+from nm_clone.renderer import BatchRenderer, OffscreenRenderer
+from nm_common.constants import COLOR_MAP
+from nm_core.simulation.core import SimulationCore
+from nm_env.gym_env import NeuroMotorwaysEnv
+
+
+def build_sim(center):
+    sim = SimulationCore(6, 4)
+    sim.add_shopping_center(center, color="blue")
+    sim.add_house((0, 0), color="blue")
+    sim.road_network.add_road((0, 0), (1, 0))
+    return sim
+
+
+def test_offscreen_frame_is_a_reused_view():
+    renderer = OffscreenRenderer(6, 4, tile_size=4)
+    frame = renderer.render(build_sim((4, 2)))
+    assert frame.shape == (16, 24, 3) and frame.dtype == np.uint8
+    assert tuple(frame[9, 17]) == COLOR_MAP["blue"]  # Inside the shopping center tile
+    assert tuple(frame[14, 2]) == COLOR_MAP["bg"]
+
+    again = renderer.render(build_sim((1, 2)))
+    assert again is frame
+    assert tuple(frame[9, 17]) == COLOR_MAP["bg"]
+
+
+def test_batch_frames_share_one_surface():
+    renderer = BatchRenderer(3, 6, 4, tile_size=4)
+    frames = renderer.render([build_sim((4, 2)), build_sim((1, 2))])
+    assert frames.shape == (3, 16, 24, 3)
+    assert tuple(frames[0, 9, 17]) == COLOR_MAP["blue"] and tuple(frames[1, 9, 5]) == COLOR_MAP["blue"]
+    assert tuple(frames[1, 9, 17]) == COLOR_MAP["bg"]
+
+
+def test_env_rgb_array_render():
+    env = NeuroMotorwaysEnv(10, 8, render_tile_size=2)
+    env.reset(seed=0)
+    frame = env.render('rgb_array')
+    assert frame.shape == (16, 20, 3)
+    x, y = env.sim.shopping_centers[0].location
+    assert tuple(frame[y * 2, x * 2]) == COLOR_MAP[env.sim.shopping_centers[0].color]
@@ -0,0 +1,75 @@
+from nm_common.actions import Action
+from nm_core.simulation.core import SimulationCore
+
+
+def build_loop(sim):
+    # Square loop: top route (0,0)->(4,0) and bottom detour via y=2
+    for x in range(4):
+        sim.road_network.add_road((x, 0), (x + 1, 0))
+        sim.road_network.add_road((x, 2), (x + 1, 2))
+    sim.road_network.add_road((0, 0), (0, 1))
+    sim.road_network.add_road((0, 1), (0, 2))
+    sim.road_network.add_road((4, 2), (4, 1))
+    sim.road_network.add_road((4, 1), (4, 0))
+
+
+def remove(sim, start, end):
+    return sim.step(Action(action_type='remove_road', params={'start': start, 'end': end}))
+
+
+def test_reverse_index_tracks_remaining_edges():
+    sim = SimulationCore(6, 4)
+    sim.pin_generation_interval = 0
+    build_loop(sim)
+    sim.spawn_car((0, 0), (4, 0))
+    car_id = next(iter(sim.traffic_manager.cars))
+
+    assert car_id in sim.traffic_manager.edge_index[((3, 0), (4, 0))]
+
+    # Traversed segments leave the index as the car moves
+    for _ in range(3):
+        sim.step(None)
+    assert ((0, 0), (1, 0)) not in sim.traffic_manager.edge_index
+    assert car_id in sim.traffic_manager.edge_index[((2, 0), (3, 0))]
+
+
+def test_removed_road_reroutes_only_affected_cars():
+    sim = SimulationCore(6, 4)
+    sim.pin_generation_interval = 0
+    build_loop(sim)
+    sim.spawn_car((0, 0), (4, 0))
+    sim.step(None)
+
+    remove(sim, (2, 0), (3, 0))
+    car = next(iter(sim.traffic_manager.cars.values()))
+    assert (0, 1) in car.path
+
+    for _ in range(20):
+        sim.step(None)
+    assert not sim.traffic_manager.cars
+
+
+def test_unreachable_cars_are_reported_and_recovered():
+    sim = SimulationCore(6, 4)
+    sim.pin_generation_interval = 0
+    build_loop(sim)
+    sim.spawn_car((0, 0), (4, 0))
+    sim.step(None)
+    sim.step(None)
+
+    # Cut both routes: the car is stranded and holds its position
+    sim.road_network.remove_road((0, 1), (0, 2))
+    _, _, _, info = remove(sim, (2, 0), (3, 0))
+    car_id = next(iter(sim.traffic_manager.cars))
+    assert info['stranded_cars'] == [car_id]
+
+    position = sim.traffic_manager.cars[car_id].position
+    sim.step(None)
+    assert sim.traffic_manager.cars[car_id].position == position
+    assert sim.traffic_manager.cars[car_id].waiting
+
+    # Restoring a road lets the car continue
+    sim.step(Action(action_type='add_road', params={'start': (2, 0), 'end': (3, 0)}))
+    for _ in range(10):
+        sim.step(None)
+    assert not sim.traffic_manager.cars
@@ -0,0 +1,34 @@
+from nm_common.constants import DIRECTIONS, NO_DIRECTION, OPPOSITE_DIRECTION
+from nm_core.simulation.core import SimulationCore
+
+
+def test_routes_carry_flat_tiles_and_direction_codes():
+    sim = SimulationCore(6, 4)
+    for start, end in [((0, 0), (1, 0)), ((1, 0), (1, 1)), ((1, 1), (0, 1))]:
+        sim.road_network.add_road(start, end)
+
+    route = sim.road_network.find_path((0, 0), (0, 1))
+    assert route.tiles == (0, 1, 7, 6)
+    assert route.dirs == (NO_DIRECTION, 1, 2, 3)
+    assert sim.road_network.encode_route(list(route)) == (route.tiles, route.dirs)
+
+
+def test_opposite_direction_table():
+    for code, (dx, dy) in enumerate(DIRECTIONS):
+        assert DIRECTIONS[OPPOSITE_DIRECTION[code]] == (-dx, -dy)
+        assert OPPOSITE_DIRECTION[code] == code ^ 2
+    assert OPPOSITE_DIRECTION[NO_DIRECTION] == NO_DIRECTION
+
+
+def test_head_on_cars_swap_tiles():
+    sim = SimulationCore(6, 4)
+    sim.pin_generation_interval = 0
+    for x in range(4):
+        sim.road_network.add_road((x, 1), (x + 1, 1))
+        sim.road_network.add_road((x + 1, 1), (x, 1))
+    sim.spawn_car((0, 1), (4, 1))
+    sim.spawn_car((4, 1), (0, 1))
+
+    for _ in range(8):
+        sim.step(None)
+    assert not sim.traffic_manager.cars
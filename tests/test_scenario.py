@@ -0,0 +1,63 @@
+import numpy as np
+
+from nm_clone.game import MiniMotorwaysGame
+from nm_core.simulation.core import SimulationCore
+from nm_core.simulation.scenario import Scenario, generate_city
+
+
+def build_corridor():
+    sim = SimulationCore(12, 8)
+    for x in range(2, 10):
+        sim.road_network.add_road((x, 5), (x + 1, 5))
+        sim.road_network.add_road((x + 1, 5), (x, 5))
+    sim.add_house((2, 5), color="red", car_limit=3)
+    sim.add_shopping_center((10, 5), color="blue", pin_rate=0.05)
+    sim.map.add_tile(2, 5, 2)
+    sim.map.add_tile(10, 5, 2)
+    return sim
+
+
+def test_save_and_load_round_trip(tmp_path):
+    sim = build_corridor()
+    path = str(tmp_path / "corridor.npz")
+    Scenario.from_simulation(sim, seed=5, growth_interval=13.0).save(path)
+
+    loaded = SimulationCore(12, 8)
+    loaded.road_network.add_road((0, 0), (1, 0))  # Cleared by the load
+    scenario = Scenario.load(path)
+    scenario.apply(loaded)
+
+    assert scenario.seed == 5 and scenario.growth_interval == 13.0
+    assert sorted(loaded.road_network.roads) == sorted(sim.road_network.roads)
+    np.testing.assert_array_equal(loaded.map.grid, sim.map.grid)
+    house, center = loaded.houses[0], loaded.shopping_centers[0]
+    assert (house.location, house.color, house.car_count) == ((2, 5), "red", 3)
+    assert (center.location, center.color, center.pin_rate) == ((10, 5), "blue", 0.05)
+
+
+def test_generated_city_is_connected_and_playable():
+    scenario = generate_city(24, 17, seed=3, colors=2, pin_generation_interval=5)
+    sim = SimulationCore(24, 17)
+    scenario.apply(sim)
+
+    assert sim.houses and sim.shopping_centers
+    for building in sim.houses + sim.shopping_centers:
+        assert sim.map.get_tile(*building.location) == 2
+        assert sim.road_network.find_path(building.location, (0, 0)) is not None
+
+    for _ in range(300):
+        sim.step(None)
+    assert sim.score > 0
+
+
+def test_game_starts_from_scenario():
+    scenario = generate_city(20, 13, seed=1, growth_interval=2.0)
+    game = MiniMotorwaysGame(20, 13)
+    game.load_scenario(scenario)
+    buildings = len(game.sim.houses) + len(game.sim.shopping_centers)
+    assert buildings == len(scenario.houses) + len(scenario.shopping_centers)
+    assert set(game.growth_manager.active_colors) == set(scenario.active_colors())
+
+    for _ in range(2 * 15 + 1):
+        game.step(None, dt=None)
+    assert len(game.sim.houses) + len(game.sim.shopping_centers) > buildings
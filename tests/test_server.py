@@ -0,0 +1,68 @@
+import threading
+from functools import partial
+
+import numpy as np
+import pytest
+
+from nm_env.gym_env import NeuroMotorwaysEnv
+from nm_env.server import SimulationClient, SimulationServer
+
+make_env = partial(NeuroMotorwaysEnv, 10, 8, tensor_observations=True)
+
+
+def start_server(address, count=2):
+    server = SimulationServer(make_env, count)
+    thread = threading.Thread(target=server.serve_forever, args=(address,), daemon=True)
+    thread.start()
+    assert server.started.wait(5)
+    return server, thread
+
+
+def test_unix_socket_steps_match_local_env(tmp_path):
+    server, thread = start_server(str(tmp_path / 'sim.sock'))
+    client = SimulationClient(server.address, timeout=5)
+    try:
+        assert client.env_count == 2 and client.observation_shape == (7, 8, 10)
+        local = make_env()
+        assert np.array_equal(client.reset(1, seed=3), local.reset(seed=3))
+
+        road = np.array([[1, 4, 2, 1]], dtype=np.int32)  # add_road (4, 2) -> (5, 2)
+        observation, reward, done, _ = client.step(1, road)
+        expected, expected_reward, _, _ = local.step(road)
+        assert np.array_equal(observation, expected) and reward == expected_reward and not done
+        assert np.array_equal(client.action_masks(1), local.action_masks())
+
+        # Pipelined requests are answered in order
+        client.reset(0, seed=3)
+        for _ in range(5):
+            client.step_send(0, None)
+            client.step_send(1, 0)
+        results = [client.step_recv() for _ in range(10)]
+        for _ in range(5):
+            expected, _, _, _ = local.step(0)
+        assert np.array_equal(results[-1][0], expected)
+
+        # Invalid edits are skipped, errors are reported without closing the connection
+        assert client.step(0, np.array([[1, -1, 0, 0]]))[3] == {'invalid_action_count': 1}
+        with pytest.raises(RuntimeError, match="No environment"):
+            client.reset(5)
+        assert client.step(0, None)[0].shape == (7, 8, 10)
+    finally:
+        client.close()
+        server.stop()
+        thread.join(5)
+    assert not thread.is_alive()
+
+
+def test_tcp_clients_share_environments():
+    server, thread = start_server(('127.0.0.1', 0), count=1)
+    first, second = SimulationClient(server.address, timeout=5), SimulationClient(server.address, timeout=5)
+    try:
+        first.reset(0, seed=1)
+        first.step(0, np.array([[1, 1, 1, 1]]))
+        assert not second.action_masks(0)[1 + np.ravel_multi_index((0, 1, 1, 1), (2, 8, 10, 4))]
+    finally:
+        first.close()
+        second.close()
+        server.stop()
+        thread.join(5)
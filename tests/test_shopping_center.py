@@ -0,0 +1,35 @@
+from nm_core.simulation.core import SimulationCore
+
+
+def test_pins_are_fulfilled_oldest_first():
+    sim = SimulationCore(10, 10)
+    sim.add_shopping_center((5, 5), color="red")
+    sc = sim.shopping_centers[0]
+    for _ in range(3):
+        sc.generate_pin()
+
+    assert sc.fulfill_pin()
+    assert list(sc.pins) == [2, 3]
+
+
+def test_only_failing_centers_are_tracked_and_timed():
+    sim = SimulationCore(10, 10)
+    sim.pin_generation_interval = 0
+    sim.add_shopping_center((2, 2), color="red")
+    sim.add_shopping_center((7, 7), color="blue")
+    calm, busy = sim.shopping_centers
+
+    calm.generate_pin()
+    for _ in range(busy.max_pins // 2 + 1):
+        busy.generate_pin()
+    assert list(sim.failing_centers) == [busy.center_id]
+
+    for _ in range(15):
+        sim.step(None)
+    assert calm.failure_timer == 0.0
+    assert abs(busy.failure_timer - 1.0) < 1e-9
+
+    # Recovering drops the center from the index and resets its timer
+    busy.fulfill_pin()
+    assert not sim.failing_centers
+    assert busy.failure_timer == 0.0
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from nm_core.simulation.core import SimulationCore
+from nm_core.simulation.road_network import RoadNetworkManager
+from nm_core.simulation.traffic import TrafficFlowManager
+
+
+def test_counters_follow_car_movement():
+    sim = SimulationCore(10, 10)
+    sim.pin_generation_interval = 0
+    for x in range(9):
+        sim.road_network.add_road((x, 5), (x + 1, 5))
+
+    sim.spawn_car((0, 5), (9, 5))
+    sim.spawn_car((0, 5), (9, 5))
+    for _ in range(25):
+        world_state, _, _, _ = sim.step(None)
+
+    heatmaps = world_state.traffic_heatmaps
+    # Both cars crossed every tile after the start, heading right (direction index 1)
+    assert np.all(heatmaps['cars_passed'][5, 1:10] == 2)
+    assert heatmaps['segment_passed'][5, 0, 1] == 2
+    assert heatmaps['cars_passed'].sum() == 18
+
+    # The second car queued behind the first at the start
+    assert heatmaps['ticks_waited'][5, 0] >= 1
+    assert heatmaps['segment_waited'][5, 0].sum() <= heatmaps['ticks_waited'][5, 0]
+
+    arrays = sim.traffic_manager.analytics.as_arrays()
+    speed = arrays['average_speed']
+    assert speed[5, 5] == 1.0
+    assert speed[0, 0] == 0.0
+    assert arrays['cars_passed'] is not heatmaps['cars_passed']
+
+
+def test_counters_need_the_map_width_as_tile_stride():
+    with pytest.raises(ValueError, match="tile_stride"):
+        TrafficFlowManager(RoadNetworkManager(), grid_size=(10, 8))
+    assert TrafficFlowManager(RoadNetworkManager(tile_stride=10), grid_size=(10, 8)).analytics is not None